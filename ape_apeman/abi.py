@@ -0,0 +1,472 @@
+# compiled contract abi index
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+from eth_utils import (
+    event_abi_to_log_topic,
+    function_abi_to_4byte_selector,
+    to_hex,
+    to_normalized_address,
+)
+from ethpm_types.contract_type import ContractType
+from hexbytes import HexBytes
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+STORE_VERSION = 1
+STORE_SUFFIX = ".sqlite"
+STORE_FILE_SUFFIXES = [".sqlite", ".sqlite3", ".db"]
+DEFAULT_STORE_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS abis (
+    digest TEXT PRIMARY KEY,
+    abi TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS addresses (
+    address TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS functions (
+    selector TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    topic TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+
+def canonical_json(abi):
+    return json.dumps(abi, sort_keys=True, separators=(",", ":"))
+
+
+def abi_digest(abi):
+    """return the sha256 hex digest of the canonical json of abi"""
+    return hashlib.sha256(canonical_json(abi).encode()).hexdigest()
+
+
+def abi_entries(abi):
+    """return selector -> function and topic0 -> event maps of abi"""
+    functions = {}
+    events = {}
+    for entry in abi:
+        if entry.get("type") == "function":
+            selector = to_hex(function_abi_to_4byte_selector(entry))
+            functions[selector] = entry
+        elif entry.get("type") == "event" and not entry.get("anonymous"):
+            topic = to_hex(event_abi_to_log_topic(entry))
+            events[topic] = entry
+    return functions, events
+
+
+def file_digest(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as ifp:
+        for block in iter(lambda: ifp.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def store_path(path):
+    """return the SQLite store path for abi map file path"""
+    path = Path(path)
+    return path.with_name(path.name + STORE_SUFFIX)
+
+
+class ABIMapReader:
+    """iterate the address, abi members of a json object file, holding
+    only the current member in memory"""
+
+    def __init__(self, ifp, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.ifp = ifp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size):
+        chunk = self.ifp.read(size)
+        pos, self.pos = self.pos, 0
+        self.eof = not chunk
+        self.buffer = self.buffer[pos:] + chunk
+
+    def peek(self):
+        """skip whitespace, returning the next character or '' at the end"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ""
+            self.fill(self.chunk_size)
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"abi map: expected one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                end = None
+            # a value ending at the buffer end may be cut short
+            if end is not None and (end < len(self.buffer) or self.eof):
+                self.pos = end
+                return value
+            self.fill(size)
+            size *= 2
+
+    def __iter__(self):
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            address = self.value()
+            self.expect(":")
+            yield address, self.value()
+            if self.expect(",}") == "}":
+                return
+
+
+class ABIStore:
+    """contract abis by address in SQLite, read on demand
+
+    holds the same digest-deduplicated abis and selector and topic maps as
+    ABIIndex, so lookups cost a query rather than loading the whole map
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.executescript(STORE_SCHEMA)
+
+    def __len__(self):
+        return self.query("SELECT count(*) FROM addresses")
+
+    def query(self, sql, *args):
+        with self.lock:
+            row = self.db.execute(sql, args).fetchone()
+        return None if row is None else row[0]
+
+    def digest(self, address):
+        return self.query(
+            "SELECT digest FROM addresses WHERE address = ?",
+            to_normalized_address(address),
+        )
+
+    def abi(self, digest):
+        data = self.query("SELECT abi FROM abis WHERE digest = ?", digest)
+        return None if data is None else json.loads(data)
+
+    def function_digest(self, selector):
+        return self.query(
+            "SELECT digest FROM functions WHERE selector = ?", selector
+        )
+
+    def event_digest(self, topic):
+        return self.query("SELECT digest FROM events WHERE topic = ?", topic)
+
+    def addresses(self):
+        with self.lock:
+            rows = self.db.execute("SELECT address FROM addresses").fetchall()
+        return [address for (address,) in rows]
+
+    def meta(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT key, value FROM meta"))
+
+    def set_meta(self, **values):
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [(key, str(value)) for key, value in values.items()],
+            )
+
+    def add(self, address, abi):
+        """insert abi for address; the caller commits"""
+        data = canonical_json(abi)
+        digest = hashlib.sha256(data.encode()).hexdigest()
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO abis VALUES (?, ?)", (digest, data)
+        )
+        if cursor.rowcount:
+            functions, events = abi_entries(abi)
+            self.db.executemany(
+                "INSERT OR IGNORE INTO functions VALUES (?, ?)",
+                [(selector, digest) for selector in functions],
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO events VALUES (?, ?)",
+                [(topic, digest) for topic in events],
+            )
+        self.db.execute(
+            "INSERT OR REPLACE INTO addresses VALUES (?, ?)",
+            (to_normalized_address(address), digest),
+        )
+        return digest
+
+    def close(self):
+        self.db.close()
+
+    @classmethod
+    def build(cls, path, abi_file, chunk_size=DEFAULT_CHUNK_SIZE):
+        """stream abi map json file abi_file into a new store at path"""
+        path = Path(path)
+        stat = Path(abi_file).stat()
+        temp = path.with_name(f".tmp-{os.getpid()}-{path.name}")
+        temp.unlink(missing_ok=True)
+        store = cls(temp)
+        try:
+            with store.db, open(abi_file) as ifp:
+                for address, abi in ABIMapReader(ifp, chunk_size):
+                    store.add(address, abi)
+            store.set_meta(
+                version=STORE_VERSION,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                sha256=file_digest(abi_file),
+            )
+            store.close()
+            os.replace(temp, path)
+        except BaseException:
+            store.close()
+            temp.unlink(missing_ok=True)
+            raise
+        logger.debug(f"built abi store {path} from {abi_file}")
+        return cls(path)
+
+    @classmethod
+    def open(cls, abi_file):
+        """return the store kept next to abi map json file abi_file,
+        rebuilt when the file's mtime and size, and then its sha256,
+        differ from those it was built from"""
+        stat = Path(abi_file).stat()
+        key = (str(stat.st_mtime_ns), str(stat.st_size))
+        path = store_path(abi_file)
+        store = None
+        meta = {}
+        if path.is_file():
+            try:
+                store = cls(path)
+                meta = store.meta()
+            except sqlite3.DatabaseError as exc:
+                logger.debug(f"rebuilding abi store {path}: {exc!r}")
+        if meta.get("version") == str(STORE_VERSION):
+            if (meta["mtime_ns"], meta["size"]) == key:
+                return store
+            if meta["sha256"] == file_digest(abi_file):
+                store.set_meta(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                return store
+        if store is not None:
+            store.close()
+        return cls.build(path, abi_file)
+
+
+class ABIIndex:
+    """contract abis by address, parsed once per distinct abi
+
+    addresses sharing an abi share its digest, parsed ContractType and its
+    selector -> function and topic0 -> event maps; selectors and topics
+    also map across all indexed abis, first abi wins.  Addresses not added
+    in memory are looked up in stores and their abis parsed on first use
+    """
+
+    def __init__(self, abi_map=None, stores=None):
+        self.addresses = {}
+        self.abis = {}
+        self.contract_types = {}
+        self.functions = {}
+        self.events = {}
+        self.selectors = {}
+        self.topics = {}
+        self.stores = list(stores or [])
+        self.stored = {}
+        if abi_map:
+            self.update(abi_map)
+
+    def __len__(self):
+        return len(self.addresses) + sum(len(s) for s in self.stores)
+
+    def __contains__(self, address):
+        return self.digest(address) is not None
+
+    def add(self, address, abi):
+        """index abi for address, returning its digest"""
+        address = to_normalized_address(address)
+        digest = self.addresses.get(address)
+        if digest is not None and self.abis[digest] is abi:
+            # the same abi object passed again on each call
+            return digest
+        digest = abi_digest(abi)
+        if digest not in self.abis:
+            self.compile(digest, abi)
+        self.addresses[address] = digest
+        return digest
+
+    def update(self, abi_map):
+        for address, abi in abi_map.items():
+            self.add(address, abi)
+
+    def compile(self, digest, abi):
+        functions, events = abi_entries(abi)
+        self.abis[digest] = abi
+        self.contract_types[digest] = ContractType(abi=abi)
+        self.functions[digest] = functions
+        self.events[digest] = events
+        for selector, entry in functions.items():
+            self.selectors.setdefault(selector, entry)
+        for topic, entry in events.items():
+            self.topics.setdefault(topic, entry)
+
+    def merge(self, other):
+        """add the entries of another ABIIndex without re-parsing"""
+        for digest, abi in other.abis.items():
+            if digest not in self.abis:
+                self.abis[digest] = abi
+                self.contract_types[digest] = other.contract_types[digest]
+                self.functions[digest] = other.functions[digest]
+                self.events[digest] = other.events[digest]
+                for selector, entry in other.functions[digest].items():
+                    self.selectors.setdefault(selector, entry)
+                for topic, entry in other.events[digest].items():
+                    self.topics.setdefault(topic, entry)
+        self.addresses.update(other.addresses)
+        self.stored.update(other.stored)
+        self.stores.extend(other.stores)
+
+    def fetch(self, store, digest):
+        if digest is not None and digest not in self.abis:
+            self.compile(digest, store.abi(digest))
+        return digest
+
+    def digest(self, address):
+        """return the abi digest for address, or None"""
+        address = to_normalized_address(address)
+        digest = self.addresses.get(address) or self.stored.get(address)
+        if digest is None:
+            for store in self.stores:
+                digest = self.fetch(store, store.digest(address))
+                if digest is not None:
+                    self.stored[address] = digest
+                    break
+        return digest
+
+    def get_abi(self, address):
+        digest = self.digest(address)
+        return None if digest is None else self.abis[digest]
+
+    def get_contract_type(self, address):
+        digest = self.digest(address)
+        return None if digest is None else self.contract_types[digest]
+
+    def function(self, selector, address=None):
+        """return the function abi entry for a 4-byte selector"""
+        selector = HexBytes(selector)[:4].hex()
+        if address is not None:
+            digest = self.digest(address)
+            return (
+                None
+                if digest is None
+                else self.functions[digest].get(selector)
+            )
+        entry = self.selectors.get(selector)
+        if entry is None:
+            for store in self.stores:
+                digest = self.fetch(store, store.function_digest(selector))
+                if digest is not None:
+                    return self.functions[digest][selector]
+        return entry
+
+    def event(self, topic, address=None):
+        """return the event abi entry for a log topic0"""
+        topic = HexBytes(topic).hex()
+        if address is not None:
+            digest = self.digest(address)
+            return None if digest is None else self.events[digest].get(topic)
+        entry = self.topics.get(topic)
+        if entry is None:
+            for store in self.stores:
+                digest = self.fetch(store, store.event_digest(topic))
+                if digest is not None:
+                    return self.events[digest][topic]
+        return entry
+
+    @classmethod
+    def load_file(cls, path, cache=True, store=None):
+        """return the index of an abi map file
+
+        a SQLite file is used as a store; a json file is converted to a
+        store next to it, which caches it across processes, when store is
+        True, or when store is None and either cache is set or the file is
+        at least DEFAULT_STORE_THRESHOLD bytes; otherwise, or when the
+        store cannot be written, it is indexed in memory
+        """
+        path = Path(path)
+        if path.suffix in STORE_FILE_SUFFIXES:
+            return cls(stores=[ABIStore(path)])
+        if store is None:
+            store = cache or path.stat().st_size >= DEFAULT_STORE_THRESHOLD
+        if store:
+            try:
+                return cls(stores=[ABIStore.open(path)])
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning(
+                    f"abi store for {path} unavailable, indexing in memory: "
+                    f"{exc!r}"
+                )
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path):
+        """return the in-memory index of abi map json file path"""
+        return cls(json.loads(Path(path).read_bytes()))
+
+
+class ABIMap(Mapping):
+    """read-only address -> abi view of an ABIIndex"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __getitem__(self, address):
+        abi = self.index.get_abi(address)
+        if abi is None:
+            raise KeyError(address)
+        return abi
+
+    def __iter__(self):
+        addresses = dict.fromkeys(self.index.addresses)
+        for store in self.index.stores:
+            addresses.update(dict.fromkeys(store.addresses()))
+        return iter(addresses)
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -8,8 +8,18 @@ from secrets import token_hex
 from eth_account import Account
 from eth_utils import to_normalized_address
 
+from .metrics import metrics
+
 
 class KeyAccount:
+    """ape account for a private key
+
+    by default signs in memory with a KeySigner; keyfile=True writes an
+    encrypted keyfile to ape's accounts folder and loads it as a
+    KeyfileAccount instead
+    """
+
+    @metrics.timed("account.create")
     def __init__(
         self,
         *,
@@ -18,9 +28,19 @@ class KeyAccount:
         alias=None,
         password=None,
         autosign=False,
+        keyfile=False,
     ):
         self.ape = ape
         self.autosign = autosign
+        self.keyfile = None
+        if not keyfile:
+            from .signer import KeySigner
+
+            self.alias = alias
+            self.password = None
+            self.ape_account = KeySigner(private_key)
+            self.address = to_normalized_address(self.ape_account.address)
+            return
         self.alias = alias or token_hex(16)
         self.password = password or token_hex(32)
         account = Account.encrypt(private_key, self.password)
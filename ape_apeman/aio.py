@@ -0,0 +1,140 @@
+# asyncio interface for APE
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from eth_utils import to_checksum_address
+
+from .light import async_extra_data_middleware
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+
+class AsyncAPE:
+    """awaitable APE operations for asyncio services
+
+    plain JSON-RPC reads (balance, block, block number) go through a web3
+    AsyncHTTPProvider; operations that need ape (contracts, receipts, calls
+    and transactions) run one at a time on a single worker thread, since
+    the ape network context is process global and not thread-safe and
+    concurrent transactions from one key would race for nonces.  At most
+    max_concurrency operations are in flight at any time; the first
+    operation connects if connect() was not awaited.
+    """
+
+    def __init__(
+        self,
+        ape=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        rpc_url=None,
+        **ape_kwargs,
+    ):
+        if ape is None:
+            from .factory import APE
+
+            ape = APE(**ape_kwargs)
+        self.ape = ape
+        self.rpc_url = rpc_url
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="AsyncAPE"
+        )
+        self._semaphore = None
+        self.web3 = None
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _run(self, function, *args, **kwargs):
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(function, *args, **kwargs)
+            )
+
+    def _make_web3(self):
+        from web3 import AsyncHTTPProvider, Web3
+        from web3.eth import AsyncEth
+
+        rpc_url = self.rpc_url or self.ape.web3.provider.endpoint_uri
+        web3 = Web3(
+            AsyncHTTPProvider(rpc_url),
+            modules={"eth": (AsyncEth,)},
+            middlewares=[],
+        )
+        web3.middleware_onion.inject(
+            async_extra_data_middleware, "extra_data", layer=0
+        )
+        return web3
+
+    async def connect(self):
+        if self.web3 is None:
+            await self._run(self.ape.connect)
+            self.web3 = self._make_web3()
+        return self
+
+    async def disconnect(self):
+        if self.web3 is not None:
+            await self._run(self.ape.disconnect)
+            self.web3 = None
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *args, **kwargs):
+        await self.disconnect()
+        self.close()
+
+    async def get_web3(self):
+        if self.web3 is None:
+            await self.connect()
+        return self.web3
+
+    async def get_contract(self, contract_address, **kwargs):
+        await self.get_web3()
+        return await self._run(
+            self.ape.get_contract, contract_address, **kwargs
+        )
+
+    async def call_contract(
+        self, contract_address, function_name, *args, **kwargs
+    ):
+        """await APE.call_contract, returning a ContractCallResult"""
+        await self.get_web3()
+        return await self._run(
+            self.ape.call_contract,
+            contract_address,
+            function_name,
+            *args,
+            **kwargs,
+        )
+
+    async def get_receipt(self, txn_hash):
+        await self.get_web3()
+        return await self._run(self.ape.get_receipt, txn_hash)
+
+    async def get_balance(self, address, block_identifier=None):
+        web3 = await self.get_web3()
+        async with self.semaphore:
+            return await web3.eth.get_balance(
+                to_checksum_address(address), block_identifier
+            )
+
+    async def get_block(self, block_identifier, full_transactions=False):
+        web3 = await self.get_web3()
+        async with self.semaphore:
+            return await web3.eth.get_block(
+                block_identifier, full_transactions
+            )
+
+    async def get_block_number(self):
+        web3 = await self.get_web3()
+        async with self.semaphore:
+            return await web3.eth.block_number
@@ -0,0 +1,168 @@
+# persistent contract type cache
+
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from eth_utils import to_normalized_address
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_SWEEP_INTERVAL = 256
+
+
+def write_atomic(path, data, mode="w"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode) as ofp:
+            ofp.write(data)
+        os.replace(temp, path)
+    except BaseException:
+        Path(temp).unlink(missing_ok=True)
+        raise
+
+
+class ContractTypeCache:
+    """content-addressed on-disk contract type cache
+
+    contract type json is stored once per content hash under 'types/', and
+    an index file per (chain_id, address) under 'index/' holds the hash;
+    index file mtime is the last access time used for TTL and LRU eviction.
+
+    the entry count is kept in memory (counted once on the first store), so
+    stores only scan the index when it exceeds max_entries, trimming down to
+    7/8 of it, or every sweep_interval stores to drop expired entries
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        ttl=DEFAULT_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        sweep_interval=DEFAULT_SWEEP_INTERVAL,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.types_dir = self.cache_dir / "types"
+        self.index_dir = self.cache_dir / "index"
+        self.types_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.size = None
+        self.unswept = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _index_file(self, chain_id, address):
+        return self.index_dir / str(chain_id) / to_normalized_address(address)
+
+    def _type_file(self, digest):
+        return self.types_dir / f"{digest}.json"
+
+    def _expired(self, index_file):
+        if not self.ttl:
+            return False
+        return time.time() - index_file.stat().st_mtime > self.ttl
+
+    def get(self, chain_id, address):
+        """return cached ContractType or None"""
+        from ethpm_types.contract_type import ContractType
+
+        index_file = self._index_file(chain_id, address)
+        try:
+            if self._expired(index_file):
+                index_file.unlink(missing_ok=True)
+                raise FileNotFoundError(index_file)
+            digest = index_file.read_text().strip()
+            contract_type = ContractType.parse_raw(
+                self._type_file(digest).read_text()
+            )
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(index_file)
+        self.hits += 1
+        return contract_type
+
+    def set(self, chain_id, address, contract_type):
+        """store ContractType for address on chain_id"""
+        data = contract_type.json()
+        digest = hashlib.sha256(data.encode()).hexdigest()
+        type_file = self._type_file(digest)
+        if not type_file.is_file():
+            write_atomic(type_file, data)
+        index_file = self._index_file(chain_id, address)
+        if self.size is None:
+            self.size = len(self.entries())
+        if not index_file.is_file():
+            self.size += 1
+        write_atomic(index_file, digest)
+        self.stores += 1
+        self.unswept += 1
+        if (self.max_entries and self.size > self.max_entries) or (
+            self.sweep_interval and self.unswept >= self.sweep_interval
+        ):
+            self.evict()
+
+    def invalidate(self, chain_id, address):
+        index_file = self._index_file(chain_id, address)
+        if index_file.is_file() and self.size:
+            self.size -= 1
+        index_file.unlink(missing_ok=True)
+
+    def entries(self):
+        return [f for f in self.index_dir.glob("*/*") if f.is_file()]
+
+    def evict(self):
+        """remove expired entries, and least recently used entries down to
+        7/8 of max_entries once over it"""
+        entries = sorted(self.entries(), key=lambda f: f.stat().st_mtime)
+        expired = [f for f in entries if self._expired(f)]
+        live = [f for f in entries if not self._expired(f)]
+        excess = []
+        if self.max_entries and len(live) > self.max_entries:
+            keep = self.max_entries - self.max_entries // 8
+            excess = live[: len(live) - keep]
+        removed = expired + excess
+        self.size = len(live) - len(excess)
+        self.unswept = 0
+        if not removed:
+            return 0
+        for index_file in removed:
+            index_file.unlink(missing_ok=True)
+        self.evictions += len(removed)
+        self._collect()
+        return len(removed)
+
+    def _collect(self):
+        """remove type files no longer referenced by any index entry"""
+        referenced = set()
+        for index_file in self.entries():
+            try:
+                referenced.add(index_file.read_text().strip())
+            except FileNotFoundError:
+                pass
+        for type_file in self.types_dir.glob("*.json"):
+            if type_file.stem not in referenced:
+                type_file.unlink(missing_ok=True)
+
+    def clear(self):
+        for index_file in self.entries():
+            index_file.unlink(missing_ok=True)
+        self.size = 0
+        self._collect()
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            stores=self.stores,
+            evictions=self.evictions,
+            entries=len(self.entries()),
+        )
@@ -1,15 +1,29 @@
 # cli for ape-apeman
 
+import os
 import sys
 
 import click
 from box import Box
-from eth_utils import from_wei, to_checksum_address
 
+from . import server
+from .commands import (
+    COMMANDS,
+    DEFAULT_BALANCE_BATCH_SIZE,
+    LIGHT_COMMANDS,
+    balances,
+    blocks,
+    read_accounts,
+)
+from .events import DEFAULT_CHUNK_SIZE
 from .exception_handler import ExceptionHandler
-from .exceptions import ExplorerNotAvailable
+from .exceptions import DaemonUnavailable
+from .export import DEFAULT_ROW_GROUP_SIZE, FORMATS, WRITERS
+from .factory import APE
 from .json import dumps
-from .manager import APE
+from .light import LightAPE
+from .metrics import metrics
+from .parallel import DEFAULT_WORKERS
 from .version import __timestamp__, __version__
 
 header = f"{__name__.split('.')[0]} v{__version__} {__timestamp__}"
@@ -26,13 +40,60 @@ def output(ctx, data):
     click.echo(data)
 
 
+def output_line(ctx, data):
+    """output one NDJSON record"""
+    if ctx.obj.json:
+        data = dumps(
+            data,
+            humanize=ctx.obj.humanize,
+            hex_bytes=True,
+            separators=(",", ":"),
+        )
+    click.echo(data)
+
+
 def fail(message):
     click.echo(f"Failed: {message}", err=True)
     sys.exit(1)
 
 
+def get_ape(ctx):
+    """return the APE instance, constructing it on first use"""
+    if ctx.obj.ape is None:
+        ctx.obj.ape = APE(selector=ctx.obj.selector)
+    return ctx.obj.ape
+
+
+def local_ape(ctx, light=False):
+    """return a LightAPE if light and an rpc url is set, else the APE"""
+    if light and ctx.obj.rpc_url:
+        return LightAPE(ctx.obj.rpc_url, ctx.obj.selector)
+    return get_ape(ctx)
+
+
+def run(ctx, command, **params):
+    """run command on the apeman daemon if one is serving, else locally
+
+    commands that only need JSON-RPC run on a web3-only LightAPE when an
+    rpc url is configured, so they never import ape
+    """
+    if ctx.obj.json and ctx.obj.socket:
+        try:
+            return server.call(
+                ctx.obj.socket,
+                ctx.obj.selector,
+                command,
+                params,
+                humanize=ctx.obj.humanize,
+            )
+        except DaemonUnavailable:
+            pass
+    with local_ape(ctx, command in LIGHT_COMMANDS) as ape:
+        return COMMANDS[command](ape, **params)
+
+
 @click.group(name="apeman")
-@click.version_option(message=header)
+@click.version_option(__version__, message=header)
 @click.option(
     "-e",
     "--ecosystem",
@@ -70,14 +131,62 @@ def fail(message):
 @click.option(
     "-h", "--humanize", is_flag=True, help="human-friendly (but lossy) output"
 )
+@click.option(
+    "-s",
+    "--socket",
+    type=click.Path(dir_okay=False),
+    envvar="APEMAN_SOCKET",
+    show_envvar=True,
+    default=server.default_socket_path,
+    help="apeman daemon socket",
+)
+@click.option(
+    "-L", "--local", is_flag=True, help="do not use the apeman daemon"
+)
+@click.option(
+    "-u",
+    "--rpc-url",
+    type=str,
+    envvar="APEMAN_RPC_URL",
+    show_envvar=True,
+    help="JSON-RPC url for commands that do not need ape",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    envvar="APEMAN_PROFILE",
+    show_envvar=True,
+    help="output timing breakdown to stderr at exit",
+)
 @click.pass_context
-def cli(ctx, ecosystem, network, debug, provider, json, compact, humanize):
+def cli(
+    ctx,
+    ecosystem,
+    network,
+    debug,
+    provider,
+    json,
+    compact,
+    humanize,
+    socket,
+    local,
+    rpc_url,
+    profile,
+):
     ctx.obj = Box(ehandler=ExceptionHandler(debug))
     ctx.obj.debug = debug
     ctx.obj.json = json
     ctx.obj.compact = compact
     ctx.obj.humanize = humanize
-    ctx.obj.ape = APE(ecosystem, network, provider)
+    ctx.obj.socket = None if local else socket
+    ctx.obj.rpc_url = rpc_url
+    ctx.obj.selector = os.environ.get(
+        "APE_SELECTOR", f"{ecosystem}:{network}:{provider}"
+    )
+    ctx.obj.ape = None
+    if profile:
+        metrics.enable()
+        ctx.call_on_close(lambda: click.echo(metrics.report(), err=True))
 
 
 @cli.command
@@ -89,46 +198,104 @@ def cli(ctx, ecosystem, network, debug, provider, json, compact, humanize):
 @click.pass_context
 def txn(ctx, url, logs, txn_hash):
     """output transaction receipt"""
-    with ctx.obj.ape as ape:
-        if url:
-            if ape.explorer:
-                ret = ape.explorer.get_transaction_url(txn_hash)
-            else:
-                raise ExplorerNotAvailable
-        elif logs:
-            receipt = ape.provider.get_receipt(txn_hash)
-            logs = receipt.decode_logs()
-            ret = [log.dict() for log in logs]
-        else:
-            receipt = ape.provider.get_receipt(txn_hash)
-            ret = receipt.dict()
-
+    ret = run(ctx, "txn", txn_hash=txn_hash, url=url, logs=logs)
     output(ctx, ret)
 
 
 @cli.command
-@click.argument("account", type=str)
+@click.argument("accounts", nargs=-1, type=str)
 @click.option("-w", "--wei", is_flag=True, help="output wei")
 @click.option("-g", "--gwei", is_flag=True, help="output gwei")
 @click.option("-e", "--ether", is_flag=True, help="output ether")
+@click.option(
+    "-f",
+    "--file",
+    type=click.File("r"),
+    help="read accounts one per line ('-' for stdin)",
+)
+@click.option("-b", "--block", type=int, help="read balances as of block")
+@click.option(
+    "-W",
+    "--workers",
+    type=int,
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    help="concurrent batch requests",
+)
+@click.option(
+    "-B",
+    "--batch-size",
+    type=int,
+    default=DEFAULT_BALANCE_BATCH_SIZE,
+    show_default=True,
+    help="accounts per JSON-RPC batch",
+)
 @click.pass_context
-def balance(ctx, account, wei, gwei, ether):
-    """output account balance"""
-    account = to_checksum_address(account)
-    with ctx.obj.ape as ape:
-        as_wei = ape.provider.get_balance(account)
-    as_ether = from_wei(as_wei, "ether")
-    as_gwei = from_wei(as_wei, "gwei")
-    if wei:
-        ret = as_wei
-    elif gwei:
-        ret = as_gwei
-    elif ether:
-        ret = as_ether
-    else:
-        ret = {account: dict(wei=as_wei, gwei=as_gwei, ether=as_ether)}
+def balance(ctx, accounts, wei, gwei, ether, file, block, workers, batch_size):
+    """output account balances
 
-    output(ctx, ret)
+    a single ACCOUNT outputs its balance; several accounts, or a --file,
+    output one NDJSON record per account, all read at the same block
+    """
+    units = dict(wei=wei, gwei=gwei, ether=ether)
+    if len(accounts) == 1 and file is None:
+        ret = run(ctx, "balance", account=accounts[0], block=block, **units)
+        output(ctx, ret)
+        return
+    if not accounts and file is None:
+        fail("no accounts")
+    with local_ape(ctx, light=True) as ape:
+        for record in balances(
+            ape,
+            read_accounts(accounts, file),
+            block=block,
+            workers=workers,
+            batch_size=batch_size,
+            **units,
+        ):
+            output_line(ctx, record)
+
+
+@cli.command
+@click.option("-f", "--from-block", type=int, default=0, show_default=True)
+@click.option("-t", "--to-block", type=int, help="default: latest block")
+@click.option(
+    "-e", "--event", "events", multiple=True, help="select event by name"
+)
+@click.option("-R", "--raw-logs", is_flag=True, help="output undecoded logs")
+@click.option(
+    "-s",
+    "--chunk-size",
+    type=int,
+    default=DEFAULT_CHUNK_SIZE,
+    show_default=True,
+    help="blocks per request",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=int,
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    help="concurrent requests",
+)
+@click.argument("address", type=str)
+@click.pass_context
+def logs(
+    ctx, from_block, to_block, events, raw_logs, chunk_size, workers, address
+):
+    """output contract event logs as NDJSON"""
+    with get_ape(ctx) as ape:
+        for log in ape.backfill_logs(
+            address,
+            from_block=from_block,
+            to_block=to_block,
+            event_names=events or None,
+            decode=not raw_logs,
+            chunk_size=chunk_size,
+            workers=workers,
+        ):
+            output_line(ctx, dict(log))
 
 
 @cli.group
@@ -141,8 +308,7 @@ def eth(ctx):
 @eth.command
 @click.pass_context
 def get_block_number(ctx):
-    with ctx.obj.ape as ape:
-        ret = ape.web3.eth.get_block_number()
+    ret = run(ctx, "get_block_number")
     output(ctx, ret)
 
 
@@ -150,13 +316,70 @@ def get_block_number(ctx):
 @click.argument("block", type=str)
 @click.pass_context
 def get_block(ctx, block):
-    if block.isnumeric():
-        block = int(block)
-    with ctx.obj.ape as ape:
-        _block = ape.web3.eth.get_block(block)
-        ret = dict(_block)
+    ret = run(ctx, "get_block", block=block)
     output(ctx, ret)
 
 
+@eth.command
+@click.argument("start", type=int)
+@click.argument("end", type=int)
+@click.option(
+    "-t", "--transactions", is_flag=True, help="include full transactions"
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=int,
+    default=DEFAULT_WORKERS,
+    show_default=True,
+    help="concurrent requests",
+)
+@click.option(
+    "-F",
+    "--format",
+    "format_",
+    type=click.Choice(FORMATS),
+    default="ndjson",
+    show_default=True,
+)
+@click.option("-o", "--output", type=str, default="-", help="output file")
+@click.option(
+    "-r",
+    "--row-group-size",
+    type=int,
+    default=DEFAULT_ROW_GROUP_SIZE,
+    show_default=True,
+    help="rows buffered per CSV/Parquet row group",
+)
+@click.pass_context
+def get_blocks(
+    ctx, start, end, transactions, workers, format_, output, row_group_size
+):
+    """export blocks START through END in order"""
+    if end < start:
+        fail("END precedes START")
+    kwargs = dict(row_group_size=row_group_size)
+    if format_ == "ndjson":
+        kwargs["humanize"] = ctx.obj.humanize
+    mode = "wb" if format_ == "parquet" else "w"
+    with local_ape(ctx, light=True) as ape, click.open_file(
+        output, mode
+    ) as file:
+        records = blocks(ape, start, end, transactions, workers)
+        WRITERS[format_](records, file, **kwargs)
+
+
+@cli.command
+@click.pass_context
+def serve(ctx):
+    """run apeman daemon holding a connected ape on the socket"""
+    if ctx.obj.socket is None:
+        fail("daemon socket required")
+    with get_ape(ctx) as ape:
+        # answer get-block-number from one shared poller
+        ape.get_block_tracker()
+        server.serve(ape, ctx.obj.socket)
+
+
 if __name__ == "__main__":
     sys.exit(cli())  # pragma: no cover
@@ -0,0 +1,172 @@
+# command implementations shared by the cli and the apeman daemon
+
+from eth_utils import from_wei, to_checksum_address
+
+from .exceptions import ExplorerNotAvailable
+from .parallel import DEFAULT_WORKERS, bounded_map, chunks
+from .rpc_cache import quantity
+
+DEFAULT_BALANCE_BATCH_SIZE = 100
+
+
+def txn(ape, txn_hash, url=False, logs=False):
+    """return transaction receipt, decoded logs, or explorer url"""
+    if url:
+        if ape.explorer:
+            return ape.explorer.get_transaction_url(txn_hash)
+        raise ExplorerNotAvailable
+    if logs:
+        return [log.dict() for log in ape.get_receipt_logs(txn_hash)]
+    return ape.get_receipt(txn_hash).dict()
+
+
+def balance(ape, account, wei=False, gwei=False, ether=False, block=None):
+    """return account balance, optionally as of block"""
+    account = to_checksum_address(account)
+    if block is None:
+        as_wei = ape.provider.get_balance(account)
+    else:
+        as_wei = ape.web3.eth.get_balance(account, int(block))
+    return format_balance(account, as_wei, wei, gwei, ether)
+
+
+def format_balance(account, as_wei, wei=False, gwei=False, ether=False):
+    as_ether = from_wei(as_wei, "ether")
+    as_gwei = from_wei(as_wei, "gwei")
+    if wei:
+        return as_wei
+    elif gwei:
+        return as_gwei
+    elif ether:
+        return as_ether
+    return {account: dict(wei=as_wei, gwei=as_gwei, ether=as_ether)}
+
+
+def read_accounts(accounts, file=None):
+    """yield addresses from accounts, then one per line of file"""
+    yield from accounts
+    if file is not None:
+        for line in file:
+            line = line.split("#")[0].strip()
+            if line:
+                yield line
+
+
+def balances(
+    ape,
+    accounts,
+    wei=False,
+    gwei=False,
+    ether=False,
+    block=None,
+    workers=DEFAULT_WORKERS,
+    batch_size=DEFAULT_BALANCE_BATCH_SIZE,
+):
+    """yield a balance record for each account, in order
+
+    accounts may be an unbounded iterator; they are read batch_size at a
+    time and each batch is sent as one JSON-RPC batch request, with up to
+    workers batches in flight on their own HTTP sessions.  block pins every
+    read to one block number (default: the block current at the start) so
+    the records form a consistent snapshot.  providers without an HTTP
+    endpoint (IPC, websocket, eth-tester) are read serially via ape.web3.
+    """
+    from .pool import ThreadSessions
+
+    if block is None:
+        block = ape.web3.eth.get_block_number()
+    block_param = hex(int(block))
+    endpoint = http_endpoint(ape.web3)
+
+    if endpoint is None:
+        for account in accounts:
+            record = dict(account=account, block=int(block))
+            try:
+                address = to_checksum_address(account)
+                as_wei = ape.web3.eth.get_balance(address, int(block))
+                response = dict(result=as_wei)
+            except Exception as exc:
+                response = dict(error=str(exc))
+            yield balance_record(record, response, wei, gwei, ether)
+        return
+
+    with ThreadSessions(endpoint) as sessions:
+
+        def fetch(chunk):
+            provider = sessions.get().web3.provider
+            calls = [("eth_getBalance", [a, block_param]) for a in chunk]
+            return zip(chunk, provider.make_batch_request(calls))
+
+        batches = chunks(accounts, batch_size)
+        for results in bounded_map(fetch, batches, workers):
+            for account, response in results:
+                record = dict(account=account, block=int(block))
+                yield balance_record(record, response, wei, gwei, ether)
+
+
+def http_endpoint(web3):
+    """return the provider's HTTP endpoint uri, or None for IPC, websocket
+    and in-process providers that ThreadSessions cannot open"""
+    uri = getattr(web3.provider, "endpoint_uri", None)
+    if uri and str(uri).startswith(("http://", "https://")):
+        return str(uri)
+    return None
+
+
+def balance_record(record, response, wei, gwei, ether):
+    if response.get("result") is None:
+        error = response.get("error") or "no response"
+        if isinstance(error, dict):
+            error = error.get("message", error)
+        return dict(record, error=str(error))
+    as_wei = quantity(response["result"])
+    account = record["account"] = to_checksum_address(record["account"])
+    value = format_balance(account, as_wei, wei, gwei, ether)
+    if wei or gwei or ether:
+        return dict(record, balance=value)
+    return dict(record, **value[account])
+
+
+def get_block_number(ape):
+    return ape.get_block_number()
+
+
+def get_block(ape, block):
+    if isinstance(block, str) and block.isnumeric():
+        block = int(block)
+    return dict(ape.web3.eth.get_block(block))
+
+
+def blocks(ape, start, end, transactions=False, workers=DEFAULT_WORKERS):
+    """yield blocks start through end inclusive, in order
+
+    up to workers blocks are fetched concurrently on their own HTTP
+    sessions, with at most 2 * workers requests in flight; providers
+    without an HTTP endpoint are read serially via ape.web3
+    """
+    from .pool import ThreadSessions
+
+    endpoint = http_endpoint(ape.web3)
+    if endpoint is None:
+        for number in range(start, end + 1):
+            yield dict(ape.web3.eth.get_block(number, transactions))
+        return
+
+    with ThreadSessions(endpoint) as sessions:
+
+        def fetch(number):
+            eth = sessions.get().web3.eth
+            return dict(eth.get_block(number, transactions))
+
+        yield from bounded_map(fetch, range(start, end + 1), workers)
+
+
+COMMANDS = dict(
+    txn=txn,
+    balance=balance,
+    get_block_number=get_block_number,
+    get_block=get_block,
+)
+
+# commands that work with the web3-only LightAPE
+LIGHT_COMMANDS = ["balance", "get_block_number", "get_block"]
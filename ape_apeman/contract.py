@@ -1,21 +1,204 @@
 # ape_apeman contract module
 
+from collections.abc import Sequence
+
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+
+class LazyLogs(Sequence):
+    """a receipt's decoded logs, decoded one log at a time as accessed
+
+    like receipt.decode_logs(), logs that cannot be decoded are skipped,
+    so index i is the i-th decoded log; with events, only logs whose event
+    name or topic0 is listed are decoded.  it compares equal to a list of
+    the same logs and has ContractLogContainer's filter().
+
+    decoding uses the receipt's provider and contract cache, so logs must
+    be read while that provider is connected, from a thread that may use
+    it; list() the logs first to keep them past a disconnect
+    """
+
+    def __init__(self, receipt, events=None):
+        self.receipt = receipt
+        self.events = None
+        if events is not None:
+            self.events = {
+                e.lower() if e.startswith("0x") else e for e in events
+            }
+        self.logs = None
+        self.decoded = []
+        self.event_abis = {}
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} decoded={len(self.decoded)}>"
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or index < 0:
+            self.advance()
+        else:
+            self.advance(index + 1)
+        return self.decoded[index]
+
+    def __len__(self):
+        self.advance()
+        return len(self.decoded)
+
+    def __iter__(self):
+        index = 0
+        while True:
+            self.advance(index + 1)
+            if index >= len(self.decoded):
+                return
+            yield self.decoded[index]
+            index += 1
+
+    def __bool__(self):
+        self.advance(1)
+        return bool(self.decoded)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def filter(self, event, **kwargs):
+        """return the logs of event (a ContractEvent, EventABI or name)
+        whose arguments equal kwargs"""
+        name = getattr(event, "name", event)
+        return [
+            log
+            for log in self
+            if log.event_name == name
+            and all(
+                value is not None and log.event_arguments.get(key) == value
+                for key, value in kwargs.items()
+            )
+        ]
+
+    def advance(self, count=None):
+        """decode logs until count are decoded or the logs run out"""
+        if self.logs is None:
+            self.logs = iter(self.receipt.logs)
+        if count is not None and len(self.decoded) >= count:
+            return
+        for log in self.logs:
+            decoded = self.decode(log)
+            if decoded is not None:
+                self.decoded.append(decoded)
+                if count is not None and len(self.decoded) >= count:
+                    return
+
+    def get_event_abis(self, address):
+        """return topic0 -> EventABI for the contract at address, or None"""
+        if address not in self.event_abis:
+            contracts = self.receipt.chain_manager.contracts
+            contract_type = contracts.get(address)
+            self.event_abis[address] = contract_type and {
+                HexBytes(keccak(text=abi.selector)).hex(): abi
+                for abi in contract_type.events
+            }
+        return self.event_abis[address]
+
+    def decode(self, log):
+        if not log["topics"]:
+            return None
+        topic = HexBytes(log["topics"][0]).hex()
+        event_abis = self.get_event_abis(log["address"])
+        if event_abis is None:
+            return None
+        event_abi = event_abis.get(topic)
+        if self.events is not None:
+            if event_abi is None or not {topic, event_abi.name} & self.events:
+                return None
+        elif event_abi is None:
+            # likely a library log
+            return self.receipt._decode_ds_note(log)
+        ecosystem = self.receipt.provider.network.ecosystem
+        return next(ecosystem.decode_logs([log], event_abi), None)
+
 
 class ContractCallResult:
+    """result of a contract call or transaction
+
+    a transaction result caches its hash, block number, status, gas used
+    and ret, the first decoded log; compact() releases the receipt and
+    decoded logs, which are then fetched again with fetch_receipt(txn_hash)
+    on access
+    """
+
+    __slots__ = (
+        "ret",
+        "error",
+        "txn_hash",
+        "block_number",
+        "status",
+        "gas_used",
+        "events",
+        "fetch_receipt",
+        "_receipt",
+        "_decoded_logs",
+    )
+
     def __init__(self, ret=None):
-        self.decoded_logs = []
-        self.receipt = None
         self.ret = ret
+        self.error = None
+        self.txn_hash = None
+        self.block_number = None
+        self.status = None
+        self.gas_used = None
+        self.events = None
+        self.fetch_receipt = None
+        self._receipt = None
+        self._decoded_logs = None
 
-    def set_receipt(self, receipt):
-        self.receipt = receipt
-        self.decoded_logs = [log for log in receipt.decode_logs()]
-        if len(self.decoded_logs):
-            self.ret = self.decoded_logs[0]
-        else:
-            self.ret = None
+    @property
+    def receipt(self):
+        """the receipt, fetched again on each access once compacted"""
+        if self._receipt is None and self.txn_hash and self.fetch_receipt:
+            return self.fetch_receipt(self.txn_hash)
+        return self._receipt
+
+    @property
+    def decoded_logs(self):
+        if self._decoded_logs is not None:
+            return self._decoded_logs
+        receipt = self.receipt
+        if receipt is None:
+            return []
+        decoded_logs = LazyLogs(receipt, self.events)
+        if self._receipt is not None:
+            self._decoded_logs = decoded_logs
+        return decoded_logs
+
+    def set_receipt(self, receipt, events=None, fetch_receipt=None):
+        """set the receipt, decoding ret, its first log, now and the other
+        logs lazily, limited to the listed event names or topics if events
+        is set"""
+        self._receipt = receipt
+        self._decoded_logs = None
+        self.txn_hash = receipt.txn_hash
+        self.block_number = receipt.block_number
+        self.status = int(receipt.status)
+        self.gas_used = receipt.gas_used
+        self.events = events
+        self.fetch_receipt = fetch_receipt
+        decoded_logs = self.decoded_logs
+        self.ret = decoded_logs[0] if decoded_logs else None
+
+    def compact(self):
+        """release the receipt and decoded logs"""
+        self._receipt = None
+        self._decoded_logs = None
+        return self
 
     def dict(self):
-        return dict(
-            ret=self.ret, receipt=self.receipt.dict() if self.receipt else None
-        )
+        receipt = None
+        if self.txn_hash is not None:
+            receipt = dict(
+                txn_hash=self.txn_hash,
+                block_number=self.block_number,
+                status=self.status,
+                gas_used=self.gas_used,
+            )
+        return dict(ret=self.ret, receipt=receipt)
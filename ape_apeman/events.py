@@ -0,0 +1,304 @@
+# contract event streaming
+
+import json
+import logging
+import os
+import random
+import time
+from pathlib import Path
+
+from eth_utils import event_abi_to_log_topic, to_checksum_address, to_hex
+
+from .cache import write_atomic
+from .parallel import DEFAULT_WORKERS, bounded_map
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_CHUNK_SIZE = 1000
+MIN_CHUNK_SIZE = 1
+MAX_CHUNK_SIZE = 100000
+# the range only grows while a chunk returns fewer logs than this, well
+# under the 10000 result cap common to providers
+SPARSE_RESULTS = 250
+DEFAULT_CONFIRMATIONS = 2
+DEFAULT_POLL_INTERVAL = 2
+DEFAULT_RETRIES = 6
+DEFAULT_BACKOFF = 0.5
+
+RANGE_ERROR_MESSAGES = [
+    "query returned more than",
+    "too many",
+    "limit exceeded",
+    "response size",
+    "block range",
+    "range is too large",
+    "exceeds max results",
+    "query timeout",
+]
+
+
+# HTTP status and JSON-RPC error code of a rate limited request
+RATE_LIMIT_STATUS = 429
+RATE_LIMIT_MESSAGES = [
+    "rate limit",
+    "too many requests",
+    "compute units per second",
+]
+
+
+def rpc_error(exc):
+    """return the JSON-RPC error dict web3 raised exc with, or {}"""
+    error = exc.args[0] if exc.args else None
+    return error if isinstance(error, dict) else {}
+
+
+def error_message(exc):
+    return str(rpc_error(exc).get("message", exc)).lower()
+
+
+def is_rate_limited(exc):
+    """return True if exc is a provider request rate limit response: an
+    HTTP 429, a JSON-RPC error with code 429, or a rate limit message"""
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == RATE_LIMIT_STATUS:
+        return True
+    if rpc_error(exc).get("code") == RATE_LIMIT_STATUS:
+        return True
+    message = error_message(exc)
+    return any(pattern in message for pattern in RATE_LIMIT_MESSAGES)
+
+
+def is_range_error(exc):
+    """return True if exc is a provider complaint about the eth_getLogs
+    range"""
+    if is_rate_limited(exc):
+        return False
+    message = error_message(exc)
+    return any(pattern in message for pattern in RANGE_ERROR_MESSAGES)
+
+
+def get_logs(web3, params, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """eth_getLogs with jittered exponential backoff on rate limit errors"""
+    for attempt in range(retries + 1):
+        try:
+            return web3.eth.get_logs(params)
+        except Exception as exc:
+            if attempt == retries or not is_rate_limited(exc):
+                raise
+            delay = backoff * 2**attempt * (1 + random.random())
+            logger.debug(f"{exc}: retry in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def log_order(log):
+    return (log["blockNumber"], log["logIndex"])
+
+
+class EventDecoder:
+    """decode raw logs against the event entries of a contract abi"""
+
+    def __init__(self, web3, abi, event_names=None):
+        from web3._utils.events import get_event_data
+
+        self.get_event_data = get_event_data
+        self.codec = web3.codec
+        self.events = {}
+        for entry in abi:
+            if entry.get("type") != "event" or entry.get("anonymous"):
+                continue
+            if event_names and entry["name"] not in event_names:
+                continue
+            self.events[event_abi_to_log_topic(entry)] = entry
+        if event_names:
+            missing = set(event_names) - {
+                e["name"] for e in self.events.values()
+            }
+            if missing:
+                raise ValueError(f"events not found in abi: {sorted(missing)}")
+
+    @property
+    def topics(self):
+        """topic0 filter matching any of the decoded events"""
+        return [[to_hex(topic) for topic in self.events]]
+
+    def decode(self, logs):
+        """return decoded events for logs with a known topic0"""
+        decoded = []
+        for log in logs:
+            if not log["topics"]:
+                continue
+            abi = self.events.get(bytes(log["topics"][0]))
+            if abi is not None:
+                decoded.append(self.get_event_data(self.codec, abi, log))
+        return decoded
+
+
+class Checkpoint:
+    """last processed block number persisted to a json file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        try:
+            return json.loads(self.path.read_text())["block"]
+        except FileNotFoundError:
+            return None
+
+    def save(self, block):
+        write_atomic(self.path, json.dumps(dict(block=block)))
+
+
+class EventStream:
+    """iterate contract events, backfilling history then following the tip
+
+    eth_getLogs block ranges adapt to the provider: the range is halved when
+    the provider rejects a query as too large, which also caps it from then
+    on, and doubled while results are sparse.  Only blocks with the given
+    confirmation depth are read, and the last fully processed block is
+    saved to the checkpoint as the stream moves past it, so a restarted
+    stream resumes where it left off.
+    """
+
+    def __init__(
+        self,
+        web3,
+        address,
+        decoder,
+        from_block=0,
+        to_block=None,
+        confirmations=DEFAULT_CONFIRMATIONS,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        checkpoint=None,
+    ):
+        self.web3 = web3
+        self.address = to_checksum_address(address)
+        self.decoder = decoder
+        self.from_block = from_block
+        self.to_block = to_block
+        self.confirmations = confirmations
+        self.chunk_size = chunk_size
+        self.max_chunk_size = MAX_CHUNK_SIZE
+        self.poll_interval = poll_interval
+        if checkpoint is not None and not isinstance(checkpoint, Checkpoint):
+            checkpoint = Checkpoint(checkpoint)
+        self.checkpoint = checkpoint
+
+    def start_block(self):
+        if self.checkpoint:
+            block = self.checkpoint.load()
+            if block is not None:
+                return block + 1
+        return self.from_block
+
+    def safe_head(self):
+        head = self.web3.eth.block_number - self.confirmations
+        if self.to_block is not None:
+            head = min(head, self.to_block)
+        return head
+
+    def get_logs(self, start, end):
+        return get_logs(
+            self.web3,
+            {
+                "address": self.address,
+                "fromBlock": start,
+                "toBlock": end,
+                "topics": self.decoder.topics,
+            },
+        )
+
+    def resize(self, result_count):
+        if result_count < SPARSE_RESULTS:
+            self.chunk_size = min(self.chunk_size * 2, self.max_chunk_size)
+
+    def shrink(self, start, end):
+        """halve the range after the provider rejected start..end"""
+        self.chunk_size = max((end - start + 1) // 2, MIN_CHUNK_SIZE)
+        self.max_chunk_size = self.chunk_size
+
+    def deliver(self, logs):
+        """yield decoded logs, saving the checkpoint below each new block
+        once every event of the blocks before it has been consumed"""
+        block = None
+        for event in self.decoder.decode(logs):
+            number = event["blockNumber"]
+            if self.checkpoint and block is not None and number > block:
+                self.checkpoint.save(number - 1)
+            block = number
+            yield event
+
+    def __iter__(self):
+        start = self.start_block()
+        head = -1
+        while self.to_block is None or start <= self.to_block:
+            if start > head:
+                head = self.safe_head()
+                if start > head:
+                    time.sleep(self.poll_interval)
+                    continue
+            end = min(start + self.chunk_size - 1, head)
+            try:
+                logs = self.get_logs(start, end)
+            except Exception as exc:
+                if not is_range_error(exc) or end == start:
+                    raise
+                self.shrink(start, end)
+                logger.debug(f"{exc}: chunk_size={self.chunk_size}")
+                continue
+            yield from self.deliver(logs)
+            if self.checkpoint:
+                self.checkpoint.save(end)
+            self.resize(len(logs))
+            start = end + 1
+
+
+class LogBackfill:
+    """fetch a historical block range with concurrent eth_getLogs calls
+
+    the range is split into chunk_size block chunks fetched on a bounded
+    pool of worker threads; rate limited requests back off and retry, and
+    chunks the provider rejects as too large are split in half.  Batches
+    are yielded in chunk order, each sorted by (block, log_index), so the
+    concatenated output is in chain order.
+    """
+
+    def __init__(
+        self,
+        web3,
+        params,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        workers=DEFAULT_WORKERS,
+        retries=DEFAULT_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+    ):
+        self.web3 = web3
+        self.params = params
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def chunks(self, from_block, to_block):
+        for start in range(from_block, to_block + 1, self.chunk_size):
+            yield start, min(start + self.chunk_size - 1, to_block)
+
+    def fetch(self, chunk):
+        start, end = chunk
+        params = dict(self.params, fromBlock=start, toBlock=end)
+        try:
+            logs = get_logs(self.web3, params, self.retries, self.backoff)
+        except Exception as exc:
+            if not is_range_error(exc) or end == start:
+                raise
+            middle = (start + end) // 2
+            logs = self.fetch((start, middle)) + self.fetch((middle + 1, end))
+        return sorted(logs, key=log_order)
+
+    def batches(self, from_block, to_block):
+        """yield lists of logs in chain order"""
+        yield from bounded_map(
+            self.fetch, self.chunks(from_block, to_block), self.workers
+        )
@@ -11,3 +11,39 @@ class UnknownContractABI(ApeManagerException):
 
 class ExplorerNotAvailable(ApeManagerException):
     pass
+
+
+class CallReverted(ApeManagerException):
+    pass
+
+
+class DaemonUnavailable(ApeManagerException):
+    pass
+
+
+class DaemonError(ApeManagerException):
+    pass
+
+
+class DaemonRunning(ApeManagerException):
+    pass
+
+
+class PoolTimeout(ApeManagerException):
+    pass
+
+
+class PipelineClosed(ApeManagerException):
+    pass
+
+
+class ExportUnavailable(ApeManagerException):
+    pass
+
+
+class CassetteMiss(ApeManagerException):
+    pass
+
+
+class BlockTimeout(ApeManagerException):
+    pass
@@ -0,0 +1,125 @@
+# row-group writers for exporting blocks as NDJSON, CSV or Parquet
+
+import csv
+from collections.abc import Mapping
+
+from eth_utils import to_hex
+
+from .exceptions import ExportUnavailable
+from .json import dumps
+from .parallel import chunks
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+MAX_INT64 = 2**63 - 1
+
+# integer fields exported as strings because they may exceed int64
+BIG_INT_FIELDS = ["difficulty", "totalDifficulty", "baseFeePerGas"]
+
+# block fields with int64 Parquet columns; every other column is a string
+PARQUET_INT_FIELDS = [
+    "number",
+    "timestamp",
+    "gasLimit",
+    "gasUsed",
+    "size",
+    "blobGasUsed",
+    "excessBlobGas",
+]
+
+
+def json_value(value, humanize=False):
+    return dumps(
+        value, humanize=humanize, hex_bytes=True, separators=(",", ":")
+    )
+
+
+def column_value(key, value):
+    """return value as a scalar for a CSV or Parquet column"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        if key in BIG_INT_FIELDS or abs(value) > MAX_INT64:
+            return str(value)
+        return value
+    if isinstance(value, bytes):
+        return to_hex(value)
+    if isinstance(value, (list, tuple, Mapping)):
+        return json_value(value)
+    return value
+
+
+def to_row(record):
+    return {k: column_value(k, v) for k, v in dict(record).items()}
+
+
+def write_ndjson(records, file, row_group_size=None, humanize=False):
+    for record in records:
+        file.write(json_value(record, humanize) + "\n")
+
+
+def write_csv(records, file, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """write CSV with the first record's fields as the header
+
+    fields missing from a later record are left empty, and fields not in
+    the header are dropped; the file is flushed after each row group
+    """
+    writer = None
+    for group in chunks(records, row_group_size):
+        rows = [to_row(r) for r in group]
+        if writer is None:
+            writer = csv.DictWriter(
+                file, fieldnames=list(rows[0]), extrasaction="ignore"
+            )
+            writer.writeheader()
+        writer.writerows(rows)
+        file.flush()
+
+
+def parquet_schema(pa, fields):
+    return pa.schema(
+        [
+            (f, pa.int64() if f in PARQUET_INT_FIELDS else pa.string())
+            for f in fields
+        ]
+    )
+
+
+def parquet_row(record):
+    """return record as a row of PARQUET_INT_FIELDS ints and strings"""
+    row = to_row(record)
+    for key, value in row.items():
+        if key not in PARQUET_INT_FIELDS and value is not None:
+            row[key] = value if isinstance(value, str) else str(value)
+    return row
+
+
+def write_parquet(records, file, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """write Parquet with one row group per row_group_size records
+
+    the columns are the first record's fields, typed by field name rather
+    than inferred from values, so every row group shares one schema; as
+    with CSV, fields missing from a later record are null and fields not in
+    the first record are dropped
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ExportUnavailable("parquet export requires pyarrow") from exc
+
+    writer = None
+    try:
+        for group in chunks(records, row_group_size):
+            rows = [parquet_row(r) for r in group]
+            if writer is None:
+                schema = parquet_schema(pa, list(rows[0]))
+                writer = pq.ParquetWriter(file, schema)
+            table = pa.Table.from_pylist(rows, schema=writer.schema)
+            writer.write_table(table, row_group_size=row_group_size)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = dict(ndjson=write_ndjson, csv=write_csv, parquet=write_parquet)
+FORMATS = list(WRITERS)
@@ -0,0 +1,156 @@
+# background-refreshed EIP-1559 fee estimates
+
+import logging
+import os
+import threading
+import time
+from statistics import median
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_INTERVAL = 12
+DEFAULT_HISTORY_BLOCKS = 10
+DEFAULT_PERCENTILES = (10, 50, 90)
+DEFAULT_BASE_FEE_MULTIPLIER = 2
+DYNAMIC_FEE_TYPE = 2
+STATIC_FEE_TYPES = ["legacy", "static", "access_list"]
+
+
+def dynamic_fee_type(txn_type):
+    """return True if a transaction type (int, hex or name, None for the
+    default) takes EIP-1559 max_fee and max_priority_fee"""
+    if txn_type is None:
+        return True
+    txn_type = getattr(txn_type, "value", txn_type)
+    if isinstance(txn_type, str):
+        name = txn_type.lower()
+        if name in STATIC_FEE_TYPES:
+            return False
+        if name == "dynamic":
+            return True
+        txn_type = int(name, 16 if name.startswith("0x") else 10)
+    return txn_type == DYNAMIC_FEE_TYPE
+
+
+class FeeEstimate:
+    """one snapshot of the fee market"""
+
+    def __init__(self, base_fee, priority_fee, rewards):
+        self.base_fee = base_fee
+        self.priority_fee = priority_fee
+        self.rewards = rewards
+        self.updated = time.monotonic()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.updated
+
+    def dict(self):
+        return dict(
+            base_fee=self.base_fee,
+            priority_fee=self.priority_fee,
+            rewards=self.rewards,
+        )
+
+
+class FeeOracle:
+    """base fee, priority fee and eth_feeHistory reward percentiles,
+    refreshed every interval seconds on a background thread
+
+    fees() returns max_fee and max_priority_fee kwargs for a transaction
+    from the latest snapshot, refreshing synchronously only when the
+    snapshot is missing or older than 2 * interval.  when the node cannot
+    give an estimate, e.g. has no eth_feeHistory, fees() returns no kwargs
+    and leaves the fees to ape
+    """
+
+    def __init__(
+        self,
+        web3,
+        interval=DEFAULT_INTERVAL,
+        history_blocks=DEFAULT_HISTORY_BLOCKS,
+        percentiles=DEFAULT_PERCENTILES,
+        base_fee_multiplier=DEFAULT_BASE_FEE_MULTIPLIER,
+    ):
+        self.web3 = web3
+        self.interval = interval
+        self.history_blocks = history_blocks
+        self.percentiles = list(percentiles)
+        self.base_fee_multiplier = base_fee_multiplier
+        self.estimate = None
+        self.refreshes = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self):
+        """fetch a new estimate"""
+        history = self.web3.eth.fee_history(
+            self.history_blocks, "latest", self.percentiles
+        )
+        # the last base fee is the next block's
+        base_fee = history["baseFeePerGas"][-1]
+        rewards = {
+            percentile: int(median(r[i] for r in history["reward"]))
+            for i, percentile in enumerate(self.percentiles)
+            if history.get("reward")
+        }
+        try:
+            priority_fee = self.web3.eth.max_priority_fee
+        except Exception as exc:
+            logger.debug(f"max_priority_fee failed: {exc!r}")
+            priority_fee = None
+        if priority_fee is None:
+            priority_fee = rewards.get(50, 0)
+        estimate = FeeEstimate(base_fee, priority_fee, rewards)
+        with self.lock:
+            self.estimate = estimate
+            self.refreshes += 1
+        return estimate
+
+    def get(self):
+        """return the current estimate, refreshing it if stale, or None if
+        the refresh fails"""
+        estimate = self.estimate
+        if estimate is None or estimate.age > 2 * self.interval:
+            try:
+                estimate = self.refresh()
+            except Exception as exc:
+                logger.warning(f"fee refresh failed: {exc!r}")
+                return None
+        return estimate
+
+    def fees(self):
+        """return max_fee and max_priority_fee transaction kwargs, or an
+        empty dict on chains without a base fee or an estimate"""
+        estimate = self.get()
+        if estimate is None or not estimate.base_fee:
+            return {}
+        max_fee = (
+            estimate.base_fee * self.base_fee_multiplier
+            + estimate.priority_fee
+        )
+        return dict(max_fee=max_fee, max_priority_fee=estimate.priority_fee)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning(f"fee refresh failed: {exc!r}")
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(
+                target=self.run, name="FeeOracle", daemon=True
+            )
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
@@ -1,42 +1,132 @@
 # hex or humanized json dumps
 
 import json
+from collections.abc import Mapping
 from decimal import Decimal
 
 from eth_utils import humanize_bytes, to_hex
 from hexbytes import HexBytes
 
 
-class JSONEncoder_hex_bytes(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return str(o)
-        elif isinstance(o, HexBytes):
-            return to_hex(bytes(o))
-        elif isinstance(o, bytes):
-            return to_hex(o)
-        else:
-            return super().default(o)
+def _hex_bytes(o):
+    return to_hex(bytes(o))
+
+
+def _humanize_bytes(o):
+    return humanize_bytes(bytes(o))
+
+
+# conversions in isinstance precedence order
+HEX_BYTES_TYPES = [
+    (Decimal, str),
+    (HexBytes, _hex_bytes),
+    (bytes, _hex_bytes),
+    (Mapping, dict),
+]
+HUMANIZE_TYPES = [
+    (Decimal, str),
+    (HexBytes, _humanize_bytes),
+    (bytes, _humanize_bytes),
+    (Mapping, dict),
+]
+
 
+class DispatchEncoder(json.JSONEncoder):
+    """JSONEncoder converting values through a per-type dispatch table
+
+    the conversion for each concrete type is resolved once against types
+    and cached, so default() is a dict lookup instead of an isinstance
+    chain
+    """
+
+    types = []
+    dispatch = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = {}
 
-class JSONEncoder_humanize(json.JSONEncoder):
     def default(self, o):
-        if isinstance(o, Decimal):
-            return str(o)
-        elif isinstance(o, HexBytes):
-            return humanize_bytes(bytes(o))
-        elif isinstance(o, bytes):
-            return humanize_bytes(o)
-        else:
+        try:
+            convert = self.dispatch[type(o)]
+        except KeyError:
+            convert = self.resolve(type(o))
+        if convert is None:
             return super().default(o)
+        return convert(o)
 
+    @classmethod
+    def resolve(cls, type_):
+        convert = None
+        for base, function in cls.types:
+            if issubclass(type_, base):
+                convert = function
+                break
+        cls.dispatch[type_] = convert
+        return convert
 
-def dumps(*args, **kwargs):
+
+class JSONEncoder_hex_bytes(DispatchEncoder):
+    types = HEX_BYTES_TYPES
+
+
+class JSONEncoder_humanize(DispatchEncoder):
+    types = HUMANIZE_TYPES
+
+
+def encoder_kwargs(kwargs):
     humanize = kwargs.pop("humanize", False)
     hex_bytes = kwargs.pop("hex_bytes", False)
     if humanize:
         kwargs["cls"] = JSONEncoder_humanize
     elif hex_bytes:
         kwargs["cls"] = JSONEncoder_hex_bytes
+    return kwargs
+
+
+def dumps(*args, **kwargs):
+    return json.dumps(*args, **encoder_kwargs(kwargs))
+
+
+class _Items(list):
+    """non-empty list stand-in iterating lazily over items"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def __bool__(self):
+        return True
+
+    def __iter__(self):
+        return self.items
+
+
+def dump_iter(iterable, **kwargs):
+    """yield chunks of the JSON list of iterable's items
+
+    "".join(dump_iter(items, **kwargs)) == dumps(list(items), **kwargs),
+    but items are consumed and encoded one at a time
+    """
+    kwargs = encoder_kwargs(kwargs)
+    cls = kwargs.pop("cls", None) or json.JSONEncoder
+    encoder = cls(**kwargs)
+    items = iter(iterable)
+    try:
+        first = next(items)
+    except StopIteration:
+        yield "[]"
+        return
+    if encoder.indent is None:
+        # the C encoder handles each item; only the list is ours
+        yield "[" + encoder.encode(first)
+        for item in items:
+            yield encoder.item_separator + encoder.encode(item)
+        yield "]"
+    else:
+        stream = _Items(_chain(first, items))
+        yield from encoder.iterencode(stream, _one_shot=False)
+
 
-    return json.dumps(*args, **kwargs)
+def _chain(first, items):
+    yield first
+    yield from items
@@ -0,0 +1,48 @@
+# request layers wrapped around a web3 provider instance
+
+# known layers, innermost first
+ORDER = ["apeman_cassette", "apeman_rpc_cache", "apeman_metrics"]
+
+
+def rank(name):
+    return ORDER.index(name) if name in ORDER else len(ORDER)
+
+
+def install(web3, name, middleware):
+    """route every request of web3's provider through middleware
+
+    ape sends eth_call, eth_getLogs and others straight to
+    web3.provider.make_request, bypassing the middleware onion, so layers
+    wrap the provider instance's make_request, which the onion also ends
+    in.  middleware has the web3 middleware signature; installing a name
+    again replaces its layer, and layers nest in ORDER
+    """
+    provider = web3.provider
+    if "apeman_layers" not in vars(provider):
+        provider.apeman_layers = {}
+        provider.apeman_make_request = provider.make_request
+    provider.apeman_layers[name] = middleware
+    rebuild(web3)
+    return web3
+
+
+def uninstall(web3, name):
+    provider = web3.provider
+    if name in vars(provider).get("apeman_layers", {}):
+        del provider.apeman_layers[name]
+        rebuild(web3)
+    return web3
+
+
+def installed(web3, name):
+    return name in vars(web3.provider).get("apeman_layers", {})
+
+
+def rebuild(web3):
+    provider = web3.provider
+    make_request = provider.apeman_make_request
+    for name in sorted(provider.apeman_layers, key=rank):
+        make_request = provider.apeman_layers[name](make_request, web3)
+    provider.make_request = make_request
+    # the onion caches its request function around the old make_request
+    provider._request_func_cache = (None, None)
@@ -1,29 +1,48 @@
 # eth-ape wrangler
 
-import atexit
-import json
 import logging
 import os
-import shutil
-import tempfile
 from pathlib import Path
 
 # from ape.exceptions import ChainError
-from eth_utils import is_same_address, to_normalized_address
-from ethpm_types.contract_type import ContractType
+from eth_utils import (
+    is_same_address,
+    to_checksum_address,
+    to_normalized_address,
+)
+from hexbytes import HexBytes
 
 from . import exceptions
+from .abi import ABIIndex, ABIMap
 from .account import KeyAccount
+from .cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, ContractTypeCache
 from .contract import ContractCallResult
+from .events import EventDecoder, EventStream, LogBackfill
+from .fees import DEFAULT_INTERVAL, FeeOracle, dynamic_fee_type
+from .metrics import metrics
+from .multicall import MULTICALL3_ADDRESS, Multicall, parse_call
+from .pipeline import TransactionPipeline
+from .receipts import DEFAULT_CONFIRMATIONS, DEFAULT_SIZE, ReceiptCache
+from .registry import registry
+from .replay import get_cassette
+from .rpc_cache import DEFAULT_CONFIRMATIONS as RPC_CACHE_CONFIRMATIONS
+from .rpc_cache import DEFAULT_SIZE as RPC_CACHE_SIZE
+from .rpc_cache import RPCCache
+from .tracker import DEFAULT_POLL_INTERVAL, BlockTracker
 
 logger = logging.getLogger(__name__)
 logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
 
+FEE_KWARGS = ["max_fee", "max_priority_fee", "gas_price"]
+# ape's development network name; "-fork" networks are local too
+LOCAL_NETWORK_NAME = "local"
+
 
 class APE:
 
     ape = None
 
+    @metrics.timed("ape.init")
     def __init__(
         self,
         ecosystem=None,
@@ -34,6 +53,10 @@ class APE:
         project_dir=None,
         data_dir=None,
         abi_map=None,
+        contract_cache=None,
+        reload=False,
+        receipt_cache=None,
+        rpc_cache=None,
     ):
         if self.__class__.ape is None:
             import ape
@@ -43,17 +66,20 @@ class APE:
         self.exceptions = exceptions
         self.ape_exceptions = self.ape.exceptions
         self.connection = None
-        self.contract_abi = {}
+        self.chain_id = None
+        self.multicall = None
+        self.fee_oracle = None
+        self.block_tracker = None
+        self.cassette = None
+        self.abi_index = ABIIndex()
+        self.key_accounts = {}
         self.set_abi_map(abi_map)
         self.project_dir = self.init_dir(project_dir, "APE_PROJECT_DIR")
         self.data_dir = self.init_dir(data_dir, "APE_DATA_DIR")
+        self.contract_cache = self.init_contract_cache(contract_cache)
+        self.receipt_cache = self.init_receipt_cache(receipt_cache)
+        self.rpc_cache = self.init_rpc_cache(rpc_cache)
 
-        self.ape.config.DATA_FOLDER = self.data_dir
-        self.ape.config.PROJECT_FOLDER = self.project_dir
-
-        self.ape.project = self.ape.Project(self.project_dir)
-
-        self.ape.config.load(force_reload=True)
         if selector is None:
             ecosystem = ecosystem or os.environ["APE_ECOSYSTEM"]
             network = network or os.environ["APE_NETWORK"]
@@ -61,24 +87,179 @@ class APE:
             selector = os.environ.get(
                 "APE_SELECTOR", f"{ecosystem}:{network}:{provider}"
             )
-        self.context_manager = self.ape.networks.parse_network_choice(selector)
+        self.selector = selector
+        if reload:
+            self.invalidate(self.project_dir, self.data_dir)
+        self.context_manager = registry.load(
+            self.ape, self.project_dir, self.data_dir, self.selector
+        )
         if connect is True:
             self.connect()
 
+    @classmethod
+    def invalidate(cls, project_dir=None, data_dir=None, selector=None):
+        """discard registered ape config, projects and network contexts
+
+        the next APE constructed with matching dirs reloads ape's config;
+        with no arguments everything is discarded
+        """
+        registry.invalidate(project_dir, data_dir, selector)
+
     def set_abi_map(self, abi_map=None):
-        """set contract abi mapping from dict or filename"""
+        """set contract abi mapping from dict or filename
+
+        a json file is converted to a SQLite store next to it, read on
+        demand, unless APE_ABI_INDEX_CACHE=0 and the file is small, or
+        APE_ABI_STORE=0; .sqlite files are used as stores
+        """
         abi_map = abi_map or os.environ.get("APE_ABI_FILE", None)
         if isinstance(abi_map, (str, Path)):
-            abi_map = json.loads(Path(abi_map).read_text())
-        if abi_map:
-            for address, abi in abi_map.items():
-                self.set_contract_abi(address, abi)
+            cache = os.environ.get("APE_ABI_INDEX_CACHE", "1")
+            cache = cache.lower() not in ["0", "false", "no", "off"]
+            store = os.environ.get("APE_ABI_STORE", "").lower() or None
+            if store is not None:
+                store = store not in ["0", "false", "no", "off"]
+            self.abi_index.merge(
+                ABIIndex.load_file(abi_map, cache=cache, store=store)
+            )
+        elif abi_map:
+            self.abi_index.update(abi_map)
+
+    @property
+    def contract_abi(self):
+        """read-only normalized address -> abi mapping"""
+        return ABIMap(self.abi_index)
+
+    @property
+    def live_network(self):
+        """True when connected to a network whose chain data persists; local
+        and forked dev chains reuse addresses and block numbers every run"""
+        if self.connection is None:
+            return False
+        name = self.network.name
+        return name != LOCAL_NETWORK_NAME and not name.endswith("-fork")
+
+    def init_contract_cache(self, contract_cache=None):
+        """return persistent contract type cache, or None if disabled
+
+        get_contract only uses it on live networks once connected; local
+        and forked dev chains are left to ape's in-memory cache
+        """
+        if contract_cache is None:
+            contract_cache = os.environ.get("APE_CONTRACT_CACHE", True)
+            if str(contract_cache).lower() in ["0", "false", "no", "off"]:
+                contract_cache = False
+        if contract_cache is False:
+            return None
+        if isinstance(contract_cache, ContractTypeCache):
+            return contract_cache
+        if isinstance(contract_cache, (str, Path)):
+            cache_dir = Path(contract_cache)
+        else:
+            cache_dir = Path(
+                os.environ.get(
+                    "APE_CONTRACT_CACHE_DIR", self.data_dir / "contract_cache"
+                )
+            )
+        return ContractTypeCache(
+            cache_dir,
+            ttl=int(os.environ.get("APE_CONTRACT_CACHE_TTL", DEFAULT_TTL)),
+            max_entries=int(
+                os.environ.get("APE_CONTRACT_CACHE_SIZE", DEFAULT_MAX_ENTRIES)
+            ),
+        )
+
+    def init_receipt_cache(self, receipt_cache=None):
+        """return final receipt cache, or None if disabled
+
+        receipt_cache may be a ReceiptCache, False, or a SQLite file path;
+        APE_RECEIPT_CACHE_DB=1 stores receipts under data_dir
+        """
+        if receipt_cache is None:
+            receipt_cache = os.environ.get("APE_RECEIPT_CACHE", True)
+            if str(receipt_cache).lower() in ["0", "false", "no", "off"]:
+                receipt_cache = False
+        if receipt_cache is False:
+            return None
+        if isinstance(receipt_cache, ReceiptCache):
+            return receipt_cache
+        path = None
+        if isinstance(receipt_cache, (str, Path)):
+            path = Path(receipt_cache)
+        else:
+            db = os.environ.get("APE_RECEIPT_CACHE_DB", "")
+            if db.lower() in ["1", "true", "yes", "on"]:
+                path = self.data_dir / "receipts.sqlite"
+            elif db and db.lower() not in ["0", "false", "no", "off"]:
+                path = Path(db)
+        return ReceiptCache(
+            path,
+            size=int(os.environ.get("APE_RECEIPT_CACHE_SIZE", DEFAULT_SIZE)),
+            confirmations=int(
+                os.environ.get(
+                    "APE_RECEIPT_CONFIRMATIONS", DEFAULT_CONFIRMATIONS
+                )
+            ),
+        )
 
+    def init_rpc_cache(self, rpc_cache=None):
+        """return immutable JSON-RPC response cache, or None if disabled
+
+        rpc_cache may be an RPCCache, False, or a SQLite file path;
+        APE_RPC_CACHE_DB=1 stores responses under data_dir.  the cache is
+        only installed on live networks, not local or forked dev chains
+        """
+        if rpc_cache is None:
+            rpc_cache = os.environ.get("APE_RPC_CACHE", True)
+            if str(rpc_cache).lower() in ["0", "false", "no", "off"]:
+                rpc_cache = False
+        if rpc_cache is False:
+            return None
+        if isinstance(rpc_cache, RPCCache):
+            return rpc_cache
+        path = None
+        if isinstance(rpc_cache, (str, Path)):
+            path = Path(rpc_cache)
+        else:
+            db = os.environ.get("APE_RPC_CACHE_DB", "")
+            if db.lower() in ["1", "true", "yes", "on"]:
+                path = self.data_dir / "rpc_cache.sqlite"
+            elif db and db.lower() not in ["0", "false", "no", "off"]:
+                path = Path(db)
+        return RPCCache(
+            path,
+            size=int(os.environ.get("APE_RPC_CACHE_SIZE", RPC_CACHE_SIZE)),
+            confirmations=int(
+                os.environ.get(
+                    "APE_RPC_CACHE_CONFIRMATIONS", RPC_CACHE_CONFIRMATIONS
+                )
+            ),
+        )
+
+    @metrics.timed("ape.get_contract")
     def get_contract(
         self, contract_address, contract_type=None, txn_hash=None, abi=None
     ):
+        # an explicit abi overrides whatever the cache holds for the address,
+        # and dev chains reuse addresses for different contracts every run
+        cache = self.contract_cache
+        if abi or not self.live_network or self.chain_id is None:
+            cache = None
         if abi:
             self.set_contract_abi(contract_address, abi)
+        if contract_type is None and cache:
+            contract_type = cache.get(self.chain_id, contract_address)
+            metrics.count(
+                "contract_cache.hit"
+                if contract_type
+                else "contract_cache.miss"
+            )
+            if contract_type:
+                return self.ape.contracts.ContractInstance(
+                    to_checksum_address(contract_address),
+                    contract_type,
+                    txn_hash=txn_hash,
+                )
         try:
             contract = self.ape.Contract(
                 contract_address, contract_type, txn_hash
@@ -87,33 +268,149 @@ class APE:
             if exc.args[0].startswith(
                 "Failed to get contract type for address"
             ):
-                contract = self.ape.Contract(
-                    contract_address,
-                    ContractType(abi=self.get_contract_abi(contract_address)),
-                    txn_hash,
-                )
+                with metrics.timer("ape.get_contract.fallback"):
+                    contract = self.ape.Contract(
+                        contract_address,
+                        self.get_contract_type(contract_address),
+                        txn_hash,
+                    )
             else:
                 raise exc from exc
+        if cache:
+            cache.set(self.chain_id, contract_address, contract.contract_type)
         return contract
 
-    def get_contract_abi(self, contract_address):
-        """lookup cached contract_type for contract addresss"""
-        contract_address = to_normalized_address(contract_address)
+    def get_receipt(self, txn_hash):
+        """return receipt for txn_hash, served from the receipt cache once
+        the transaction is final"""
+        txn_hash = HexBytes(txn_hash).hex()
+        cache = self.receipt_cache
+        entry = cache.get(self.chain_id, txn_hash) if cache else None
+        if entry is not None:
+            return self.decode_receipt(entry["data"])
+        from web3.exceptions import TransactionNotFound
+
         try:
-            abi = self.contract_abi[contract_address]
-        except KeyError:
+            receipt_data = self.web3.eth.get_transaction_receipt(txn_hash)
+        except TransactionNotFound:
+            # pending: let the provider wait for it
+            return self.provider.get_receipt(txn_hash)
+        data = {**self.web3.eth.get_transaction(txn_hash), **receipt_data}
+        if cache and cache.final(
+            data.get("blockNumber"), self.get_block_number()
+        ):
+            cache.set(self.chain_id, txn_hash, data)
+        return self.decode_receipt(data)
+
+    def decode_receipt(self, data):
+        return self.provider.network.ecosystem.decode_receipt(
+            {"provider": self.provider, "required_confirmations": 0, **data}
+        )
+
+    def get_receipt_logs(self, txn_hash, receipt=None):
+        """return the decoded logs of a transaction, cached once final"""
+        txn_hash = HexBytes(txn_hash).hex()
+        cache = self.receipt_cache
+        entry = cache.get(self.chain_id, txn_hash) if cache else None
+        if entry is not None:
+            if entry["logs"] is not None:
+                return entry["logs"]
+            receipt = receipt or self.decode_receipt(entry["data"])
+        receipt = receipt or self.get_receipt(txn_hash)
+        logs = list(receipt.decode_logs())
+        if cache:
+            cache.set_logs(self.chain_id, txn_hash, logs)
+        return logs
+
+    def get_contract_abi(self, contract_address):
+        """lookup abi for contract addresss in the abi map"""
+        abi = self.abi_index.get_abi(contract_address)
+        if abi is None:
+            contract_address = to_normalized_address(contract_address)
             raise self.exceptions.UnknownContractABI(f"{contract_address=}")
         return abi
 
+    def get_contract_type(self, contract_address):
+        """lookup the parsed ContractType for contract address in the abi
+        map"""
+        contract_type = self.abi_index.get_contract_type(contract_address)
+        if contract_type is None:
+            contract_address = to_normalized_address(contract_address)
+            raise self.exceptions.UnknownContractABI(f"{contract_address=}")
+        return contract_type
+
+    def get_event_abi(self, contract_address):
+        """return abi from the abi map, or event abis from the contract type"""
+        try:
+            return self.get_contract_abi(contract_address)
+        except self.exceptions.UnknownContractABI:
+            contract = self.get_contract(contract_address)
+            return [abi.dict() for abi in contract.contract_type.events]
+
+    def stream_events(
+        self, contract_address, event_names=None, from_block=0, **kwargs
+    ):
+        """generate decoded events emitted by a contract
+
+        History from from_block is backfilled in adaptively sized eth_getLogs
+        ranges, then new blocks are followed as they reach the confirmation
+        depth.
+
+        kwargs:
+          to_block: (int) stop after this block instead of following the tip
+          confirmations: (int) blocks behind the head considered final
+          chunk_size: (int) initial eth_getLogs block range
+          poll_interval: (float) seconds between head checks when caught up
+          checkpoint: (str, Path) file recording the last processed block
+        """
+        decoder = EventDecoder(
+            self.web3, self.get_event_abi(contract_address), event_names
+        )
+        stream = EventStream(
+            self.web3, contract_address, decoder, from_block, **kwargs
+        )
+        yield from stream
+
+    def backfill_logs(
+        self,
+        contract_address,
+        from_block=0,
+        to_block=None,
+        event_names=None,
+        decode=True,
+        **kwargs,
+    ):
+        """generate historical contract logs in (block, log_index) order
+
+        eth_getLogs chunks are fetched concurrently; decoded events are
+        returned unless decode is False, in which case raw logs are returned
+
+        kwargs:
+          chunk_size: (int) blocks per eth_getLogs request
+          workers: (int) maximum concurrent requests
+          retries: (int) retries for rate limited requests
+          backoff: (float) initial retry delay in seconds
+        """
+        params = dict(address=to_checksum_address(contract_address))
+        decoder = None
+        if decode or event_names:
+            decoder = EventDecoder(
+                self.web3, self.get_event_abi(contract_address), event_names
+            )
+            params["topics"] = decoder.topics
+        if to_block is None:
+            to_block = self.get_block_number()
+        backfill = LogBackfill(self.web3, params, **kwargs)
+        for logs in backfill.batches(from_block, to_block):
+            yield from decoder.decode(logs) if decode else logs
+
     def init_dir(self, param, key):
         dir = param or os.environ.get(key)
         if dir:
             dir = Path(dir)
             dir.mkdir(exist_ok=True)
         else:
-            dir = Path(tempfile.mkdtemp()).resolve()
-            atexit.register(shutil.rmtree, str(dir))
-            logger.debug(f"created temp directory {str(dir)} as {key}")
+            dir = registry.temp_dir(key)
 
         if isinstance(dir, Path) is False or dir.is_dir() is False:
             raise TypeError(f"{dir} is not a directory")
@@ -130,19 +427,44 @@ class APE:
         alias=None,
         password=None,
         autosign=False,
+        keyfile=False,
     ):
-        return KeyAccount(
-            ape=self,
-            private_key=private_key,
-            alias=alias,
-            password=password,
-            autosign=autosign,
-        )
+        """return KeyAccount for private_key
 
+        in-memory accounts are cached per key; keyfile=True writes and
+        loads an encrypted keyfile account instead
+        """
+        if keyfile:
+            return KeyAccount(
+                ape=self,
+                private_key=private_key,
+                alias=alias,
+                password=password,
+                autosign=autosign,
+                keyfile=True,
+            )
+        key = HexBytes(private_key)
+        account = self.key_accounts.get(key)
+        if account is None:
+            account = KeyAccount(ape=self, private_key=key, alias=alias)
+            self.key_accounts[key] = account
+        account.autosign = autosign
+        return account
+
+    @metrics.timed("ape.connect")
     def connect(self, *args, **kwargs):
         if self.connection is None:
 
-            self.connection = self.context_manager.__enter__(*args, **kwargs)
+            cassette = get_cassette()
+            if cassette:
+                with cassette.intercept():
+                    self.connection = registry.enter(
+                        self.context_manager, *args, **kwargs
+                    )
+            else:
+                self.connection = registry.enter(
+                    self.context_manager, *args, **kwargs
+                )
 
             self.__all__ = self.ape.__all__
 
@@ -154,6 +476,14 @@ class APE:
             self.explorer = self.provider.network.explorer
             self.web3 = self.provider.web3
             self.contracts = self.network.chain_manager.contracts
+            self.chain_id = self.provider.chain_id
+            if self.rpc_cache and self.live_network:
+                self.rpc_cache.install(self.web3)
+            self.cassette = cassette
+            if cassette:
+                cassette.install(self.web3)
+            if metrics.enabled:
+                metrics.instrument(self.web3)
 
             # assert self.provider is self.project.provider
             # assert self.network is self.project.provider.network
@@ -166,8 +496,14 @@ class APE:
         return self
 
     def disconnect(self, *args, **kwargs):
+        if self.fee_oracle:
+            self.fee_oracle.stop()
+            self.fee_oracle = None
+        if self.block_tracker:
+            self.block_tracker.stop()
+            self.block_tracker = None
         if self.connection:
-            self.context_manager.__exit__(*args, **kwargs)
+            registry.exit(self.context_manager, *args, **kwargs)
             logger.debug(f"disconnected: {self}")
         self.connection = None
 
@@ -179,7 +515,7 @@ class APE:
 
     def set_contract_abi(self, contract_address, abi):
         """set abi for contract address"""
-        self.contract_abi[to_normalized_address(contract_address)] = abi
+        self.abi_index.add(contract_address, abi)
 
     def call_contract(self, contract_address, function_name, *args, **kwargs):
         """call a lookup or mutable contract function, returning a ContractCallResult
@@ -189,7 +525,11 @@ class APE:
           autosign: (bool) automatically sign transaction
           max_fee:  max fee per GAS to be used
           max_priority_fee: specify amount of 'tip' per GAS
+          type: transaction type; without fee kwargs, the fee oracle fills
+            in max_fee and max_priority_fee for dynamic (type 2) only
           abi: (list) contract ABI
+          decode_events: (list) event names or topics to decode from the
+            receipt logs, default all
         """
         result = ContractCallResult()
         contract = self.get_contract(
@@ -198,7 +538,8 @@ class APE:
         function = getattr(contract, function_name)
         if isinstance(function, self.ape.contracts.base.ContractCallHandler):
             # lookup call may include sender=ADDRESS
-            result.ret = function(*args, **kwargs)
+            with metrics.timer("ape.call_contract.call"):
+                result.ret = function(*args, **kwargs)
         elif isinstance(
             function, self.ape.contracts.base.ContractTransactionHandler
         ):
@@ -217,6 +558,7 @@ class APE:
                 )
 
             account.autosign = kwargs.pop("autosign", True)
+            decode_events = kwargs.pop("decode_events", None)
 
             if sender is not None:
                 if not is_same_address(sender, account.address):
@@ -224,9 +566,16 @@ class APE:
                         f"account key mismatches sender address {sender}"
                     )
 
-            with account as ape_account:
+            if not any(kwarg in kwargs for kwarg in FEE_KWARGS) and (
+                dynamic_fee_type(self.transaction_type(kwargs))
+            ):
+                kwargs.update(self.oracle_fees())
+
+            with account as ape_account, metrics.timer(
+                "ape.call_contract.transaction"
+            ):
                 receipt = function(*args, **kwargs, sender=ape_account)
-                result.set_receipt(receipt)
+                result.set_receipt(receipt, decode_events, self.get_receipt)
 
         else:
             raise TypeError(
@@ -234,3 +583,151 @@ class APE:
             )
 
         return result
+
+    def transaction_type(self, kwargs):
+        """return the transaction type call kwargs select"""
+        if "type" in kwargs:
+            return kwargs["type"]
+        ecosystem = self.provider.network.ecosystem
+        return getattr(ecosystem, "default_transaction_type", None)
+
+    def oracle_fees(self):
+        """return fee oracle transaction kwargs, or {} so ape estimates the
+        fees when the oracle is disabled or fails"""
+        oracle = self.get_fee_oracle()
+        if oracle is None:
+            return {}
+        try:
+            return oracle.fees()
+        except Exception as exc:
+            logger.warning(f"fee oracle failed: {exc!r}")
+            return {}
+
+    def get_fee_oracle(self):
+        """return the FeeOracle, started on first use, or None if disabled
+
+        env: APE_FEE_ORACLE=0 disables, APE_FEE_ORACLE_INTERVAL sets the
+        refresh interval in seconds
+        """
+        if self.fee_oracle is None:
+            enabled = os.environ.get("APE_FEE_ORACLE", True)
+            if str(enabled).lower() in ["0", "false", "no", "off"]:
+                return None
+            interval = os.environ.get(
+                "APE_FEE_ORACLE_INTERVAL", DEFAULT_INTERVAL
+            )
+            self.fee_oracle = FeeOracle(
+                self.web3, interval=float(interval)
+            ).start()
+        return self.fee_oracle
+
+    def get_block_tracker(self):
+        """return the BlockTracker, started on first use
+
+        env: APE_BLOCK_POLL_INTERVAL sets the poll interval in seconds
+        """
+        if self.block_tracker is None:
+            interval = os.environ.get(
+                "APE_BLOCK_POLL_INTERVAL", DEFAULT_POLL_INTERVAL
+            )
+            tracker = BlockTracker(self.web3, poll_interval=float(interval))
+            if self.rpc_cache and self.live_network:
+                tracker.on_block(
+                    lambda block: self.rpc_cache.observe_head(
+                        self.chain_id, block["number"]
+                    )
+                )
+            self.block_tracker = tracker.start()
+        return self.block_tracker
+
+    def get_block_number(self):
+        """return the head block number, from the block tracker once
+        started"""
+        if self.block_tracker is not None:
+            return self.block_tracker.head
+        return self.web3.eth.block_number
+
+    def pipeline(self, private_key, **kwargs):
+        """return a TransactionPipeline submitting from private_key"""
+        return TransactionPipeline(self, private_key, **kwargs)
+
+    def get_multicall(self, batch_size=None):
+        """return the Multicall helper for the connected chain"""
+        if self.multicall is None:
+            self.multicall = Multicall(
+                self,
+                address=os.environ.get(
+                    "APE_MULTICALL_ADDRESS", MULTICALL3_ADDRESS
+                ),
+            )
+        if batch_size:
+            self.multicall.batch_size = batch_size
+        return self.multicall
+
+    def get_lookup(self, contract_address, function_name, abi=None):
+        """return the ContractCallHandler for a read-only contract function"""
+        contract = self.get_contract(contract_address, abi=abi)
+        function = getattr(contract, function_name, None)
+        if not isinstance(
+            function, self.ape.contracts.base.ContractCallHandler
+        ):
+            raise TypeError(
+                f"lookup function {function_name} not found in contract at {contract_address}"
+            )
+        return function
+
+    def call_many(
+        self, calls, batch_size=None, block_identifier="latest", multicall=True
+    ):
+        """perform many lookup calls, returning a list of ContractCallResult
+
+        calls: list of (address, function_name[, args[, kwargs]])
+
+        Lookups without call kwargs are aggregated into multicall3 batches
+        when the contract is deployed; anything else is called individually
+        at the same block_identifier.  Failures are isolated per item and
+        reported in result.error
+        """
+        results = []
+        pending = []
+        if multicall:
+            multicall = self._available_multicall(batch_size)
+        for call in calls:
+            result = ContractCallResult()
+            results.append(result)
+            try:
+                address, function_name, args, kwargs = parse_call(call)
+                function = self.get_lookup(
+                    address, function_name, abi=kwargs.pop("abi", None)
+                )
+                if multicall and not kwargs:
+                    calldata, abi = multicall.encode(function, args)
+                    pending.append((result, address, calldata, abi))
+                else:
+                    kwargs.setdefault("block_identifier", block_identifier)
+                    result.ret = function(*args, **kwargs)
+            except Exception as exc:
+                result.error = exc
+        if pending:
+            self._aggregate(multicall, pending, block_identifier)
+        return results
+
+    def _available_multicall(self, batch_size):
+        multicall = self.get_multicall(batch_size)
+        try:
+            return multicall if multicall.available else None
+        except Exception as exc:
+            logger.warning(f"multicall3 unavailable, calling singly: {exc!r}")
+            return None
+
+    def _aggregate(self, multicall, pending, block_identifier):
+        for batch in multicall.batches(pending):
+            calls = [(address, calldata) for _, address, calldata, _ in batch]
+            try:
+                returned = multicall.aggregate(calls, block_identifier)
+            except Exception as exc:
+                for result, *_ in batch:
+                    result.error = exc
+                continue
+            for (result, _, _, abi), (success, data) in zip(batch, returned):
+                result.ret, result.error = multicall.result(abi, success, data)
@@ -0,0 +1,151 @@
+# opt-in timing and counting of apeman hot paths
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from . import layers
+
+MIDDLEWARE_NAME = "apeman_metrics"
+
+
+def env_enabled():
+    value = os.environ.get("APEMAN_METRICS", "")
+    return value.lower() in ["1", "true", "yes", "on"]
+
+
+class Metrics:
+    """named timers and counters, recorded only while enabled
+
+    timers keep count, total, and max seconds per name; stats() returns
+    them as a dict, prometheus() in Prometheus text format and report()
+    as a table
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def record(self, name, seconds):
+        with self.lock:
+            timer = self.timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    def count(self, name, value=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """decorator timing each call of the function as name"""
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.timer(name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def rpc_middleware(self, make_request, web3):
+        """middleware timing requests as rpc.<method>"""
+
+        def middleware(method, params):
+            if not self.enabled:
+                return make_request(method, params)
+            with self.timer(f"rpc.{method}"):
+                return make_request(method, params)
+
+        return middleware
+
+    def instrument(self, web3):
+        """time every request of web3's provider once, including those
+        ape sends straight to the provider"""
+        if not layers.installed(web3, MIDDLEWARE_NAME):
+            layers.install(web3, MIDDLEWARE_NAME, self.rpc_middleware)
+        return web3
+
+    def stats(self):
+        with self.lock:
+            timers = {
+                name: dict(
+                    count=count,
+                    total=total,
+                    mean=total / count if count else 0.0,
+                    max=maximum,
+                )
+                for name, (count, total, maximum) in self.timers.items()
+            }
+            return dict(timers=timers, counters=dict(self.counters))
+
+    def prometheus(self):
+        stats = self.stats()
+        lines = [
+            "# HELP apeman_operation_seconds apeman operation duration",
+            "# TYPE apeman_operation_seconds summary",
+        ]
+        for name, timer in sorted(stats["timers"].items()):
+            label = f'{{operation="{name}"}}'
+            lines.append(
+                f"apeman_operation_seconds_count{label} {timer['count']}"
+            )
+            lines.append(
+                f"apeman_operation_seconds_sum{label} {timer['total']}"
+            )
+        if stats["counters"]:
+            lines.append("# HELP apeman_events_total apeman event counts")
+            lines.append("# TYPE apeman_events_total counter")
+        for name, value in sorted(stats["counters"].items()):
+            lines.append(f'apeman_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        stats = self.stats()
+        timers = sorted(
+            stats["timers"].items(), key=lambda item: -item[1]["total"]
+        )
+        width = max([len(name) for name, _ in timers] + [9])
+        lines = [
+            f"{'operation':<{width}} {'count':>7} {'total':>10} "
+            f"{'mean':>10} {'max':>10}"
+        ]
+        for name, t in timers:
+            lines.append(
+                f"{name:<{width}} {t['count']:>7} {t['total']:>10.4f} "
+                f"{t['mean']:>10.4f} {t['max']:>10.4f}"
+            )
+        for name, value in sorted(stats["counters"].items()):
+            lines.append(f"{name:<{width}} {value:>7}")
+        return "\n".join(lines)
+
+
+metrics = Metrics(enabled=env_enabled())
@@ -0,0 +1,132 @@
+# batched contract lookups using multicall3
+
+from eth_abi import decode
+from eth_utils import to_checksum_address
+
+from .exceptions import CallReverted
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+DEFAULT_BATCH_SIZE = 100
+ERROR_SELECTOR = bytes.fromhex("08c379a0")
+
+MULTICALL3_ABI = [
+    {
+        "name": "aggregate3",
+        "type": "function",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+]
+
+
+def parse_call(call):
+    """return (address, function_name, args, kwargs) from a call_many item"""
+    address, function_name, *rest = call
+    args = tuple(rest[0]) if len(rest) > 0 and rest[0] else ()
+    kwargs = dict(rest[1]) if len(rest) > 1 and rest[1] else {}
+    return address, function_name, args, kwargs
+
+
+def revert_reason(data):
+    """return revert string from returned error data if present"""
+    if data[:4] == ERROR_SELECTOR:
+        try:
+            return decode(["string"], data[4:])[0]
+        except Exception:
+            pass
+    return "0x" + bytes(data).hex()
+
+
+class Multicall:
+    """encode contract lookups into multicall3 aggregate3 batches"""
+
+    def __init__(
+        self, ape, address=MULTICALL3_ADDRESS, batch_size=DEFAULT_BATCH_SIZE
+    ):
+        self.ape = ape
+        self.address = to_checksum_address(address)
+        self.batch_size = batch_size
+        self._available = None
+        self._contract = None
+
+    @property
+    def available(self):
+        """True if the multicall3 contract is deployed on the connected
+        chain"""
+        if self._available is None:
+            code = self.ape.web3.eth.get_code(self.address)
+            self._available = len(code) > 0
+        return self._available
+
+    @property
+    def contract(self):
+        if self._contract is None:
+            self._contract = self.ape.web3.eth.contract(
+                address=self.address, abi=MULTICALL3_ABI
+            )
+        return self._contract
+
+    def encode(self, handler, args):
+        """return (calldata, method_abi) for a ContractCallHandler"""
+        calldata = handler.encode_input(*args)
+        ecosystem = self.ape.provider.network.ecosystem
+        for abi in handler.abis:
+            if ecosystem.get_method_selector(abi) == calldata[:4]:
+                return calldata, abi
+        raise ValueError(f"no method abi matches calldata for {handler}")
+
+    def decode(self, abi, data):
+        """decode return data the same way ape's ContractCall does"""
+        ecosystem = self.ape.provider.network.ecosystem
+        output = ecosystem.decode_returndata(abi, data)
+        if not isinstance(output, (list, tuple)):
+            return output
+        elif len(output) < 2:
+            return output[0] if len(output) == 1 else None
+        return output
+
+    def batches(self, items):
+        """split items into lists of at most batch_size"""
+        size = self.batch_size
+        for start in range(0, len(items), size):
+            end = start + size
+            yield items[start:end]
+
+    def aggregate(self, calls, block_identifier="latest"):
+        """execute [(address, calldata)...], returning [(success, data)...]"""
+        calls = [
+            (to_checksum_address(address), True, bytes(calldata))
+            for address, calldata in calls
+        ]
+        return self.contract.functions.aggregate3(calls).call(
+            block_identifier=block_identifier
+        )
+
+    def result(self, abi, success, data):
+        """return (ret, error) for one aggregate3 return value"""
+        if not success:
+            return None, CallReverted(revert_reason(data))
+        try:
+            return self.decode(abi, data), None
+        except Exception as exc:
+            return None, exc
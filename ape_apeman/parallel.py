@@ -0,0 +1,36 @@
+# bounded concurrent execution
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_WORKERS = 8
+
+
+def bounded_map(function, items, workers=DEFAULT_WORKERS, max_pending=None):
+    """yield function(item) for each item in order
+
+    calls run on a pool of workers threads with at most max_pending
+    (default: 2 * workers) submitted at a time, so items may be an
+    unbounded iterator and memory stays flat
+    """
+    max_pending = max_pending or workers * 2
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                pending.append(executor.submit(function, item))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def chunks(items, size):
+    """yield lists of up to size items from the iterable items"""
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
@@ -0,0 +1,315 @@
+# concurrent transaction submission with local nonce management
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from eth_account import Account
+from eth_utils import to_checksum_address
+
+from .contract import ContractCallResult
+from .exceptions import PipelineClosed
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_MAX_PENDING = 64
+DEFAULT_WORKERS = 8
+DEFAULT_POLL_INTERVAL = 1
+DEFAULT_REPLACE_AFTER = 60
+DEFAULT_FEE_BUMP = 1.125
+DEFAULT_MAX_REPLACEMENTS = 5
+TRANSFER_GAS = 21000
+FEE_FIELDS = ["maxFeePerGas", "maxPriorityFeePerGas", "gasPrice"]
+
+
+class Submission:
+    """one nonce's transaction, its replacements and its result future"""
+
+    def __init__(self, nonce):
+        self.nonce = nonce
+        self.future = Future()
+        self.txn = None
+        self.hashes = []
+        self.sent = None
+        self.replacements = 0
+        self.events = None
+        self.error = None
+
+    @property
+    def txn_hash(self):
+        return self.hashes[-1] if self.hashes else None
+
+
+class TransactionPipeline:
+    """submit transactions from one key without waiting for each receipt
+
+    nonces are assigned locally in submission order; transactions are
+    built, signed and broadcast on a worker pool, and a tracker thread polls
+    for receipts, resolving each submission's future with a
+    ContractCallResult.  A transaction still unmined replace_after seconds
+    after broadcast is re-sent with its fees multiplied by fee_bump.  If a
+    transaction cannot be built or broadcast, its nonce is filled with a
+    zero value self-transfer so later nonces are not stuck behind the gap;
+    the filler is tracked and replaced like any other transaction, and the
+    submission's future fails with the original error once it is mined.
+    At most max_pending submissions are in flight; submit blocks beyond
+    that.
+    """
+
+    def __init__(
+        self,
+        ape,
+        private_key,
+        max_pending=DEFAULT_MAX_PENDING,
+        workers=DEFAULT_WORKERS,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        replace_after=DEFAULT_REPLACE_AFTER,
+        fee_bump=DEFAULT_FEE_BUMP,
+        max_replacements=DEFAULT_MAX_REPLACEMENTS,
+    ):
+        self.ape = ape
+        self.web3 = ape.web3
+        self.key = Account.from_key(private_key)
+        self.address = to_checksum_address(self.key.address)
+        self.chain_id = self.web3.eth.chain_id
+        self.poll_interval = poll_interval
+        self.replace_after = replace_after
+        self.fee_bump = fee_bump
+        self.max_replacements = max_replacements
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.nonce = None
+        self.pending = {}
+        self.closed = False
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="TransactionPipeline"
+        )
+        self.stopped = threading.Event()
+        self.tracker = threading.Thread(
+            target=self.track, name="TransactionTracker", daemon=True
+        )
+        self.tracker.start()
+
+    def next_nonce(self):
+        with self.lock:
+            if self.closed:
+                raise PipelineClosed("pipeline is closed")
+            if self.nonce is None:
+                self.nonce = self.web3.eth.get_transaction_count(
+                    self.address, "pending"
+                )
+            nonce, self.nonce = self.nonce, self.nonce + 1
+            submission = Submission(nonce)
+            self.pending[nonce] = submission
+            return submission
+
+    def resync(self):
+        """re-read the next nonce from the node when the key was used
+        outside the pipeline; only valid while nothing is pending"""
+        with self.lock:
+            if self.pending:
+                raise ValueError("cannot resync with pending transactions")
+            self.nonce = None
+
+    def submit(self, contract_address, function_name, *args, **kwargs):
+        """return a Future of the ContractCallResult of a contract transaction
+
+        kwargs are transaction kwargs as for APE.call_contract (max_fee,
+        max_priority_fee, gas_limit, value, abi, decode_events)
+        """
+        events = kwargs.pop("decode_events", None)
+
+        def build(nonce):
+            return self.build(
+                contract_address, function_name, nonce, *args, **kwargs
+            )
+
+        return self._submit(build, events)
+
+    def send(self, txn):
+        """return a Future of the ContractCallResult of a transaction dict
+
+        txn holds web3 transaction fields; nonce, chainId and from are set by
+        the pipeline
+        """
+        return self._submit(lambda nonce: dict(txn))
+
+    def _submit(self, build, events=None):
+        self.slots.acquire()
+        try:
+            submission = self.next_nonce()
+        except BaseException:
+            self.slots.release()
+            raise
+        submission.events = events
+        self.executor.submit(self._send, submission, build)
+        return submission.future
+
+    def build(self, contract_address, function_name, nonce, *args, **kwargs):
+        """return the transaction dict for a contract function call"""
+        contract = self.ape.get_contract(
+            contract_address, abi=kwargs.pop("abi", None)
+        )
+        function = getattr(contract, function_name)
+        if not isinstance(
+            function, self.ape.ape.contracts.base.ContractTransactionHandler
+        ):
+            raise TypeError(f"{function_name} is not a mutable function")
+        txn = function.as_transaction(
+            *args, sender=self.address, nonce=nonce, **kwargs
+        )
+        return txn.dict(exclude_none=True, by_alias=True)
+
+    def _send(self, submission, build):
+        try:
+            txn = build(submission.nonce)
+            self.broadcast(submission, txn)
+        except Exception as exc:
+            logger.warning(f"nonce {submission.nonce} failed: {exc!r}")
+            if self.fill_gap(submission):
+                # fails the future once the filler is mined
+                submission.error = exc
+            else:
+                self.finish(submission, exception=exc)
+
+    def sign(self, submission, txn):
+        txn = dict(txn, nonce=submission.nonce, chainId=self.chain_id)
+        txn.pop("from", None)
+        txn.setdefault("value", 0)
+        if not any(field in txn for field in FEE_FIELDS):
+            txn.update(self.fees())
+        if "gas" not in txn:
+            txn["gas"] = self.web3.eth.estimate_gas(
+                dict(txn, **{"from": self.address})
+            )
+        return txn, self.key.sign_transaction(txn)
+
+    def broadcast(self, submission, txn):
+        txn, signed = self.sign(submission, txn)
+        txn_hash = self.web3.eth.send_raw_transaction(signed.rawTransaction)
+        with self.lock:
+            submission.txn = txn
+            submission.hashes.append(txn_hash.hex())
+            submission.sent = time.monotonic()
+        logger.debug(f"nonce {submission.nonce} sent {txn_hash.hex()}")
+
+    def fees(self):
+        get_fee_oracle = getattr(self.ape, "get_fee_oracle", None)
+        oracle = get_fee_oracle() if get_fee_oracle else None
+        fees = oracle.fees() if oracle else None
+        if fees:
+            return dict(
+                maxFeePerGas=fees["max_fee"],
+                maxPriorityFeePerGas=fees["max_priority_fee"],
+            )
+        priority_fee = self.web3.eth.max_priority_fee
+        base_fee = self.web3.eth.get_block("latest").get("baseFeePerGas")
+        if base_fee is None:
+            return dict(gasPrice=self.web3.eth.gas_price)
+        return dict(
+            maxFeePerGas=2 * base_fee + priority_fee,
+            maxPriorityFeePerGas=priority_fee,
+        )
+
+    def fill_gap(self, submission):
+        """consume the submission's nonce with a zero value self-transfer,
+        returning True if a transaction was sent for the nonce"""
+        if submission.txn_hash is None:
+            txn = dict(to=self.address, value=0, gas=TRANSFER_GAS)
+            try:
+                self.broadcast(submission, txn)
+            except Exception as exc:
+                # most likely the nonce was already consumed
+                logger.warning(f"nonce {submission.nonce} gap fill: {exc!r}")
+        return submission.txn_hash is not None
+
+    def replace(self, submission):
+        """re-send a stuck transaction with bumped fees"""
+        txn = dict(submission.txn)
+        for field in FEE_FIELDS:
+            if field in txn:
+                txn[field] = int(txn[field] * self.fee_bump) + 1
+        submission.replacements += 1
+        logger.info(
+            f"nonce {submission.nonce} replacement {submission.replacements}"
+        )
+        self.broadcast(submission, txn)
+
+    def track(self):
+        while not self.stopped.wait(self.poll_interval):
+            with self.lock:
+                pending = [s for s in self.pending.values() if s.sent]
+            for submission in sorted(pending, key=lambda s: s.nonce):
+                try:
+                    self.poll(submission)
+                except Exception as exc:
+                    logger.warning(f"nonce {submission.nonce}: {exc!r}")
+
+    def poll(self, submission):
+        for txn_hash in reversed(submission.hashes):
+            receipt = self.get_receipt(txn_hash)
+            if receipt is not None:
+                with self.lock:
+                    submission.sent = None
+                self.executor.submit(self.resolve, submission, txn_hash)
+                return
+        stuck = time.monotonic() - submission.sent > self.replace_after
+        if stuck and submission.replacements < self.max_replacements:
+            self.replace(submission)
+
+    def get_receipt(self, txn_hash):
+        from web3.exceptions import TransactionNotFound
+
+        try:
+            return self.web3.eth.get_transaction_receipt(txn_hash)
+        except TransactionNotFound:
+            return None
+
+    def resolve(self, submission, txn_hash):
+        if submission.error is not None:
+            self.finish(submission, exception=submission.error)
+            return
+        try:
+            result = ContractCallResult()
+            receipt = self.ape.get_receipt(txn_hash)
+            result.set_receipt(
+                receipt, submission.events, self.ape.get_receipt
+            )
+        except Exception as exc:
+            self.finish(submission, exception=exc)
+        else:
+            self.finish(submission, result=result)
+
+    def finish(self, submission, result=None, exception=None):
+        with self.lock:
+            if self.pending.pop(submission.nonce, None) is None:
+                return
+        self.slots.release()
+        if exception is not None:
+            submission.future.set_exception(exception)
+        elif not submission.future.done():
+            submission.future.set_result(result)
+
+    def close(self, wait=True):
+        """stop accepting submissions, optionally waiting for pending ones"""
+        with self.lock:
+            self.closed = True
+            futures = [s.future for s in self.pending.values()]
+        if wait:
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        self.stopped.set()
+        self.tracker.join()
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
@@ -0,0 +1,272 @@
+# pool of JSON-RPC sessions for multi-threaded services
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from web3 import HTTPProvider, Web3
+
+from .exceptions import PoolTimeout
+from .light import LightAPE
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_IDLE = 300
+DEFAULT_HEALTH_INTERVAL = 30
+DEFAULT_REQUEST_TIMEOUT = 10
+
+
+class SessionHTTPProvider(HTTPProvider):
+    """HTTPProvider posting through its own requests session
+
+    web3's HTTPProvider shares one cached session per endpoint uri across
+    every thread in the process; this one owns its session
+    """
+
+    def __init__(self, endpoint_uri, session=None, request_kwargs=None):
+        super().__init__(endpoint_uri, request_kwargs)
+        self.session = session or requests.Session()
+
+    def make_request(self, method, params):
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault("timeout", DEFAULT_REQUEST_TIMEOUT)
+        response = self.session.post(
+            self.endpoint_uri,
+            data=self.encode_rpc_request(method, params),
+            **kwargs,
+        )
+        response.raise_for_status()
+        return self.decode_rpc_response(response.content)
+
+    def make_batch_request(self, calls):
+        """post (method, params) calls as one JSON-RPC batch
+
+        returns the response dicts in call order; endpoints that reject
+        batches get the calls posted one at a time
+        """
+        batch = [
+            dict(jsonrpc="2.0", method=method, params=params, id=id)
+            for id, (method, params) in enumerate(calls)
+        ]
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault("timeout", DEFAULT_REQUEST_TIMEOUT)
+        response = self.session.post(self.endpoint_uri, json=batch, **kwargs)
+        response.raise_for_status()
+        responses = response.json()
+        if not isinstance(responses, list):
+            logger.debug(f"batch rejected: {responses}")
+            return [
+                self.make_request(method, params) for method, params in calls
+            ]
+        by_id = {r.get("id"): r for r in responses}
+        return [by_id.get(request["id"], {}) for request in batch]
+
+    def close(self):
+        self.session.close()
+
+
+class SessionLightAPE(LightAPE):
+    """LightAPE whose web3 posts through its own HTTP session"""
+
+    def make_web3(self):
+        return Web3(SessionHTTPProvider(self.rpc_url))
+
+    def close(self):
+        if self.web3 is not None:
+            self.web3.provider.close()
+
+
+class ThreadSessions:
+    """one connected SessionLightAPE per thread, closed together"""
+
+    def __init__(self, rpc_url):
+        self.rpc_url = rpc_url
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []
+
+    def get(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = SessionLightAPE(self.rpc_url).connect()
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for connection in connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+
+class PooledConnection(SessionLightAPE):
+    """web3 session checked out of an APEPool
+
+    ape: the pool's shared connected APE, for contract and account use
+    web3: a Web3 instance with its own HTTP session
+    """
+
+    def __init__(self, pool):
+        super().__init__(pool.rpc_url, pool.ape.selector)
+        self.pool = pool
+        self.ape = pool.ape
+        self.last_used = self.last_checked = time.monotonic()
+        self.connect()
+
+    def healthy(self):
+        try:
+            self.web3.eth.block_number
+        except Exception as exc:
+            logger.debug(f"health check failed: {exc}")
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+
+class APEPool:
+    """bounded pool of JSON-RPC sessions sharing one connected APE
+
+    ape's provider and network context are process global, so the pool
+    holds a single connected APE and hands out up to size independent web3
+    sessions against the same endpoint; threads checking out different
+    connections no longer share one HTTP session.  Idle connections older
+    than max_idle seconds are closed, and a connection idle longer than
+    health_interval seconds is health checked before it is handed out.
+    """
+
+    def __init__(
+        self,
+        ape=None,
+        size=DEFAULT_POOL_SIZE,
+        max_idle=DEFAULT_MAX_IDLE,
+        health_interval=DEFAULT_HEALTH_INTERVAL,
+        rpc_url=None,
+        **ape_kwargs,
+    ):
+        if ape is None:
+            from .factory import APE
+
+            ape = APE(**ape_kwargs)
+        self.ape = ape.connect()
+        self.rpc_url = rpc_url or self.ape.web3.provider.endpoint_uri
+        self.size = size
+        self.max_idle = max_idle
+        self.health_interval = health_interval
+        self.idle = deque()
+        self.count = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def evict(self):
+        """close connections idle longer than max_idle"""
+        now = time.monotonic()
+        with self.condition:
+            expired = [
+                c for c in self.idle if now - c.last_used > self.max_idle
+            ]
+            for connection in expired:
+                self.idle.remove(connection)
+                self.count -= 1
+            if expired:
+                self.condition.notify(len(expired))
+        for connection in expired:
+            connection.close()
+        return len(expired)
+
+    def _acquire(self, timeout):
+        """return an idle connection, or None if the caller may create one"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise PoolTimeout("pool is closed")
+                if self.idle:
+                    return self.idle.pop()
+                if self.count < self.size:
+                    self.count += 1
+                    return None
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"no connection in {timeout}s")
+                self.condition.wait(remaining)
+
+    def checkout(self, timeout=None):
+        """return a connection, waiting up to timeout seconds if exhausted"""
+        self.evict()
+        while True:
+            connection = self._acquire(timeout)
+            if connection is None:
+                try:
+                    return PooledConnection(self)
+                except Exception:
+                    self.discard()
+                    raise
+            stale = time.monotonic() - connection.last_checked
+            if stale < self.health_interval or connection.healthy():
+                return connection
+            self.discard(connection)
+
+    def checkin(self, connection):
+        """return a connection to the pool"""
+        connection.last_used = time.monotonic()
+        with self.condition:
+            if self.closed:
+                self.count -= 1
+            else:
+                self.idle.append(connection)
+                self.condition.notify()
+                return
+        connection.close()
+
+    def discard(self, connection=None):
+        """drop a broken connection instead of returning it"""
+        with self.condition:
+            self.count -= 1
+            self.condition.notify()
+        if connection is not None:
+            connection.close()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        connection = self.checkout(timeout)
+        try:
+            yield connection
+        except requests.RequestException:
+            self.discard(connection)
+            raise
+        except BaseException:
+            self.checkin(connection)
+            raise
+        else:
+            self.checkin(connection)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            idle, self.idle = list(self.idle), deque()
+            self.count -= len(idle)
+            self.condition.notify_all()
+        for connection in idle:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
@@ -0,0 +1,179 @@
+# finality-aware receipt and decoded log cache
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+
+from .json import dumps
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_SIZE = 4096
+DEFAULT_CONFIRMATIONS = 12
+
+# byte fields of web3 transaction, receipt and log data, stored as hex
+BYTES_FIELDS = {
+    "blockHash",
+    "data",
+    "hash",
+    "input",
+    "logsBloom",
+    "r",
+    "root",
+    "s",
+    "storageKeys",
+    "topics",
+    "transactionHash",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS receipt_json (
+    chain_id INTEGER NOT NULL,
+    txn_hash TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (chain_id, txn_hash)
+)
+"""
+
+
+def to_json(data):
+    return dumps(data, hex_bytes=True, separators=(",", ":"))
+
+
+def from_json(text):
+    """return web3 data stored with to_json, with byte fields as HexBytes"""
+    from web3.datastructures import AttributeDict
+
+    def restore(value, key=None):
+        if isinstance(value, dict):
+            return AttributeDict({k: restore(v, k) for k, v in value.items()})
+        if isinstance(value, list):
+            return [restore(v, key) for v in value]
+        if key in BYTES_FIELDS and isinstance(value, str):
+            return HexBytes(value)
+        return value
+
+    return restore(json.loads(text))
+
+
+class ReceiptCache:
+    """LRU of final transaction receipts, optionally backed by SQLite
+
+    entries hold the merged transaction and receipt data as returned by
+    web3, plus the decoded logs once they have been decoded; only receipts
+    at least confirmations blocks deep are admitted, so cached entries
+    never change.  SQLite keeps the data as JSON, and the logs are decoded
+    again from it after a reload.  logs are copied in and out, so callers
+    never share them
+    """
+
+    def __init__(
+        self, path=None, size=DEFAULT_SIZE, confirmations=DEFAULT_CONFIRMATIONS
+    ):
+        self.size = size
+        self.confirmations = confirmations
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.stores = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(str(path), check_same_thread=False)
+            self.db.execute(SCHEMA)
+            self.db.commit()
+
+    def final(self, block_number, head):
+        """return True if block_number is deep enough to cache"""
+        return (
+            block_number is not None
+            and head - block_number >= self.confirmations
+        )
+
+    def get(self, chain_id, txn_hash):
+        """return entry dict with data and logs keys, or None"""
+        key = (chain_id, txn_hash)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            elif self.db is not None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._insert(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(data=entry["data"], logs=copy.deepcopy(entry["logs"]))
+
+    def set(self, chain_id, txn_hash, data, logs=None):
+        key = (chain_id, txn_hash)
+        entry = dict(data=data, logs=copy.deepcopy(logs))
+        with self.lock:
+            self._insert(key, entry)
+            self._store(key, entry)
+            self.stores += 1
+
+    def set_logs(self, chain_id, txn_hash, logs):
+        """add decoded logs to a cached entry"""
+        key = (chain_id, txn_hash)
+        with self.lock:
+            entry = self.entries.get(key) or self._load(key)
+            if entry is None:
+                return False
+            entry["logs"] = copy.deepcopy(logs)
+            self._insert(key, entry)
+            return True
+
+    def _insert(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def _load(self, key):
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            "SELECT data FROM receipt_json WHERE chain_id=? AND txn_hash=?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(data=from_json(row[0]), logs=None)
+
+    def _store(self, key, entry):
+        if self.db is None:
+            return
+        self.db.execute(
+            "INSERT OR REPLACE INTO receipt_json VALUES (?, ?, ?, ?)",
+            (*key, entry["data"].get("blockNumber"), to_json(entry["data"])),
+        )
+        self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM receipt_json")
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            stores=self.stores,
+            entries=len(self.entries),
+        )
@@ -0,0 +1,124 @@
+# process-level registry of loaded ape configuration
+
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+
+class Registry:
+    """reuse ape config, projects and network context managers across APEs
+
+    ape's config is process global, so it is only reloaded when an APE asks
+    for different project/data dirs than the ones currently loaded; projects
+    are kept per project dir and network context managers per
+    (project_dir, data_dir, selector).  APEs sharing a context manager
+    enter it once and exit it when the last of them disconnects
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded_dirs = None
+        self.projects = {}
+        self.context_managers = {}
+        self.connections = {}
+        self.temp_dirs = {}
+        self.loads = 0
+
+    def temp_dir(self, key):
+        """return the process-wide temporary directory for key"""
+        with self.lock:
+            if key not in self.temp_dirs:
+                dir = Path(tempfile.mkdtemp()).resolve()
+                atexit.register(shutil.rmtree, str(dir), ignore_errors=True)
+                logger.debug(f"created temp directory {str(dir)} as {key}")
+                self.temp_dirs[key] = dir
+            return self.temp_dirs[key]
+
+    def load(self, ape, project_dir, data_dir, selector):
+        """return network context manager, loading config if dirs changed"""
+        dirs = (str(project_dir), str(data_dir))
+        key = (*dirs, selector)
+        with self.lock:
+            if self.loaded_dirs != dirs:
+                self._load_config(ape, project_dir, data_dir)
+                self.loaded_dirs = dirs
+            if key not in self.context_managers:
+                self.context_managers[key] = ape.networks.parse_network_choice(
+                    selector
+                )
+            return self.context_managers[key]
+
+    def enter(self, context_manager, *args, **kwargs):
+        """return the connection of context_manager, entering it for the
+        first user"""
+        with self.lock:
+            entry = self.connections.get(id(context_manager))
+            if entry is None:
+                connection = context_manager.__enter__(*args, **kwargs)
+                entry = self.connections[id(context_manager)] = [
+                    context_manager,
+                    connection,
+                    0,
+                ]
+            entry[2] += 1
+            return entry[1]
+
+    def exit(self, context_manager, *args, **kwargs):
+        """release a user of context_manager, exiting it for the last"""
+        with self.lock:
+            entry = self.connections.get(id(context_manager))
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] == 0:
+                del self.connections[id(context_manager)]
+                context_manager.__exit__(*args, **kwargs)
+
+    def users(self, context_manager):
+        entry = self.connections.get(id(context_manager))
+        return 0 if entry is None else entry[2]
+
+    def _load_config(self, ape, project_dir, data_dir):
+        ape.config.DATA_FOLDER = data_dir
+        ape.config.PROJECT_FOLDER = project_dir
+        project = self.projects.get(str(project_dir))
+        if project is None:
+            project = ape.Project(project_dir)
+            self.projects[str(project_dir)] = project
+        ape.project = project
+        ape.config.load(force_reload=True)
+        # network choices parsed under a previous config may be stale
+        self.context_managers.clear()
+        self.loads += 1
+
+    def invalidate(self, project_dir=None, data_dir=None, selector=None):
+        """forget matching entries; with no arguments forget everything"""
+        with self.lock:
+            for key in list(self.context_managers):
+                if _matches(key, project_dir, data_dir, selector):
+                    del self.context_managers[key]
+            if selector is not None:
+                return
+            if self.loaded_dirs and _matches(
+                self.loaded_dirs, project_dir, data_dir
+            ):
+                self.loaded_dirs = None
+            if project_dir is not None or data_dir is None:
+                for path in list(self.projects):
+                    if project_dir is None or str(project_dir) == path:
+                        del self.projects[path]
+
+
+def _matches(key, project_dir=None, data_dir=None, selector=None):
+    values = (project_dir, data_dir, selector)[: len(key)]
+    return all(v is None or str(v) == k for v, k in zip(values, key))
+
+
+registry = Registry()
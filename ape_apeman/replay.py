@@ -0,0 +1,221 @@
+# JSON-RPC record and replay
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+from hexbytes import HexBytes
+
+from . import layers
+from .exceptions import CassetteMiss
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+MIDDLEWARE_NAME = "apeman_cassette"
+MODES = ["record", "replay", "auto"]
+DEFAULT_MODE = "auto"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    response BLOB NOT NULL,
+    PRIMARY KEY (key, seq)
+)
+"""
+
+cassettes = {}
+cassettes_lock = threading.Lock()
+
+# HTTPProvider patch shared by intercepting threads
+intercepts = threading.local()
+http_patch = dict(count=0, make_request=None)
+http_patch_lock = threading.Lock()
+
+
+def json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return HexBytes(value).hex()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def request_key(method, params):
+    data = json.dumps(
+        [method, params],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=json_default,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class Cassette:
+    """JSON-RPC responses recorded to SQLite, keyed by request
+
+    a request made n times is recorded n times and replayed in the same
+    order, repeating the last response once they run out, so polling
+    calls such as eth_blockNumber replay as recorded.  mode is 'record'
+    (always ask the node), 'replay' (never ask; unrecorded requests raise
+    CassetteMiss) or 'auto' (replay what was recorded, record the rest)
+    """
+
+    def __init__(self, path, mode=DEFAULT_MODE):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}")
+        self.path = Path(path)
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.plays = {}
+        self.records = {}
+        self.hits = self.misses = self.stores = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute(SCHEMA)
+        self.db.commit()
+        self.counts = dict(
+            self.db.execute("SELECT key, count(*) FROM responses GROUP BY key")
+        )
+
+    def play(self, key):
+        """return the next recorded response for key, or None"""
+        with self.lock:
+            count = self.counts.get(key, 0)
+            if not count:
+                self.misses += 1
+                return None
+            seq = min(self.plays.get(key, 0), count - 1)
+            self.plays[key] = seq + 1
+            (data,) = self.db.execute(
+                "SELECT response FROM responses WHERE key = ? AND seq = ?",
+                (key, seq),
+            ).fetchone()
+            self.hits += 1
+        return json.loads(zlib.decompress(data))
+
+    def record(self, key, method, response):
+        data = zlib.compress(
+            json.dumps(response, separators=(",", ":")).encode()
+        )
+        with self.lock:
+            seq = self.records.get(key, 0)
+            self.records[key] = seq + 1
+            with self.db:
+                if seq == 0:
+                    # a new session replaces earlier recordings of key
+                    self.db.execute(
+                        "DELETE FROM responses WHERE key = ?", (key,)
+                    )
+                self.db.execute(
+                    "INSERT INTO responses VALUES (?, ?, ?, ?)",
+                    (key, seq, method, data),
+                )
+            self.counts[key] = seq + 1
+            self.stores += 1
+
+    def request(self, make_request, method, params):
+        if getattr(self.local, "active", False):
+            # already handled by an outer layer
+            return make_request(method, params)
+        key = request_key(method, params)
+        if self.mode != "record":
+            response = self.play(key)
+            if response is not None:
+                return response
+            if self.mode == "replay":
+                raise CassetteMiss(f"{method} {params!r} not in {self.path}")
+        self.local.active = True
+        try:
+            response = make_request(method, params)
+        finally:
+            self.local.active = False
+        self.record(key, method, response)
+        return response
+
+    def middleware(self, make_request, web3):
+        """web3 middleware replaying and recording through the cassette"""
+
+        def middleware(method, params):
+            return self.request(make_request, method, params)
+
+        return middleware
+
+    def install(self, web3):
+        """make the cassette the innermost layer of web3's provider for
+        the life of the connection, replacing any earlier cassette"""
+        return layers.install(web3, MIDDLEWARE_NAME, self.middleware)
+
+    @contextmanager
+    def intercept(self):
+        """route HTTPProvider requests made on this thread through the
+        cassette while active, covering those ape makes connecting its
+        provider before install() can wrap it"""
+        previous = getattr(intercepts, "cassette", None)
+        intercepts.cassette = self
+        patch_http_provider(1)
+        try:
+            yield self
+        finally:
+            patch_http_provider(-1)
+            intercepts.cassette = previous
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            stores=self.stores,
+            requests=len(self.counts),
+        )
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def intercepted(provider, method, params):
+    make_request = partial(http_patch["make_request"], provider)
+    cassette = getattr(intercepts, "cassette", None)
+    if cassette is None:
+        return make_request(method, params)
+    return cassette.request(make_request, method, params)
+
+
+def patch_http_provider(delta):
+    """patch HTTPProvider.make_request while any thread intercepts"""
+    from web3 import HTTPProvider
+
+    with http_patch_lock:
+        if http_patch["count"] == 0:
+            http_patch["make_request"] = HTTPProvider.make_request
+            HTTPProvider.make_request = intercepted
+        http_patch["count"] += delta
+        if http_patch["count"] == 0:
+            HTTPProvider.make_request = http_patch["make_request"]
+
+
+def get_cassette(path=None, mode=None):
+    """return the shared Cassette for path, or None if not configured
+
+    defaults come from APE_CASSETTE and APE_CASSETTE_MODE
+    """
+    path = path or os.environ.get("APE_CASSETTE")
+    if not path:
+        return None
+    mode = mode or os.environ.get("APE_CASSETTE_MODE", DEFAULT_MODE)
+    path = Path(path).resolve()
+    with cassettes_lock:
+        cassette = cassettes.get(path)
+        if cassette is None or cassette.mode != mode:
+            if cassette is not None:
+                cassette.close()
+            cassette = cassettes[path] = Cassette(path, mode)
+        return cassette
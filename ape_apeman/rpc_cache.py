@@ -0,0 +1,261 @@
+# read-through cache of immutable JSON-RPC responses
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from . import layers
+from .replay import request_key
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+MIDDLEWARE_NAME = "apeman_rpc_cache"
+DEFAULT_SIZE = 16384
+DEFAULT_CONFIRMATIONS = 12
+DEFAULT_HEAD_TTL = 12
+
+# method -> index of its block parameter
+BLOCK_PARAMS = {
+    "eth_getBlockByNumber": 0,
+    "eth_getBlockTransactionCountByNumber": 0,
+    "eth_getBalance": 1,
+    "eth_getCode": 1,
+    "eth_getTransactionCount": 1,
+    "eth_call": 1,
+    "eth_getStorageAt": 2,
+}
+# methods whose result is final once the block it names is
+RESULT_BLOCK_METHODS = [
+    "eth_getTransactionReceipt",
+    "eth_getTransactionByHash",
+]
+IMMUTABLE_METHODS = ["eth_getBlockByHash"]
+CACHED_METHODS = {
+    *BLOCK_PARAMS,
+    *RESULT_BLOCK_METHODS,
+    *IMMUTABLE_METHODS,
+    "eth_getLogs",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    chain_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    response BLOB NOT NULL,
+    PRIMARY KEY (chain_id, key)
+)
+"""
+
+
+def quantity(value):
+    """return a JSON-RPC quantity as an int; eth-tester answers with ints
+    where nodes send hex strings"""
+    return value if isinstance(value, int) else int(value, 16)
+
+
+def block_number(block):
+    """return the number of a block parameter, None for 'latest' and the
+    other moving tags, or True for a block hash"""
+    if isinstance(block, int):
+        return block
+    if isinstance(block, dict):
+        if "blockHash" in block:
+            return True
+        return block_number(block.get("blockNumber"))
+    if block == "earliest":
+        return 0
+    if isinstance(block, str) and block.startswith("0x"):
+        return True if len(block) == 66 else int(block, 16)
+    return None
+
+
+class RPCCache:
+    """LRU of immutable JSON-RPC responses, optionally backed by SQLite
+
+    only requests naming a block at least confirmations deep, block and
+    transaction lookups by hash once final, and logs of final block ranges
+    are cached, as is eth_chainId per connection; requests for 'latest',
+    'pending' and other moving tags, and error responses, never are
+    """
+
+    def __init__(
+        self,
+        path=None,
+        size=DEFAULT_SIZE,
+        confirmations=DEFAULT_CONFIRMATIONS,
+        head_ttl=DEFAULT_HEAD_TTL,
+    ):
+        self.size = size
+        self.confirmations = confirmations
+        self.head_ttl = head_ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.heads = {}
+        self.hits = self.misses = self.stores = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(str(path), check_same_thread=False)
+            self.db.execute(SCHEMA)
+            self.db.commit()
+
+    def get(self, chain_id, key):
+        """return the cached response, or None"""
+        with self.lock:
+            data = self.entries.get((chain_id, key))
+            if data is not None:
+                self.entries.move_to_end((chain_id, key))
+            elif self.db is not None:
+                row = self.db.execute(
+                    "SELECT response FROM responses"
+                    " WHERE chain_id=? AND key=?",
+                    (chain_id, key),
+                ).fetchone()
+                if row is not None:
+                    data = zlib.decompress(row[0]).decode()
+                    self._insert((chain_id, key), data)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(data)
+
+    def set(self, chain_id, key, response):
+        data = json.dumps(response, separators=(",", ":"))
+        with self.lock:
+            self._insert((chain_id, key), data)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (chain_id, key, zlib.compress(data.encode())),
+                )
+                self.db.commit()
+            self.stores += 1
+
+    def _insert(self, key, data):
+        self.entries[key] = data
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def observe_head(self, chain_id, number):
+        with self.lock:
+            head, _ = self.heads.get(chain_id, (-1, 0))
+            self.heads[chain_id] = (max(head, number), time.monotonic())
+
+    def final(self, make_request, chain_id, number):
+        """return True if block number is confirmations deep, asking the
+        node for the head only when the known head is stale"""
+        if number is True:
+            return True
+        head, updated = self.heads.get(chain_id, (None, 0))
+        if head is not None and head - number >= self.confirmations:
+            return True
+        if time.monotonic() - updated < self.head_ttl:
+            return False
+        response = make_request("eth_blockNumber", [])
+        if "result" not in response:
+            return False
+        self.observe_head(chain_id, quantity(response["result"]))
+        return self.heads[chain_id][0] - number >= self.confirmations
+
+    def cacheable(self, make_request, chain_id, method, params, response):
+        """return True if a successful response never changes"""
+        if method in IMMUTABLE_METHODS:
+            return response.get("result") is not None
+        if method in BLOCK_PARAMS:
+            index = BLOCK_PARAMS[method]
+            if len(params) <= index:
+                return False
+            number = block_number(params[index])
+        elif method in RESULT_BLOCK_METHODS:
+            result = response.get("result") or {}
+            number = block_number(result.get("blockNumber"))
+        elif method == "eth_getLogs":
+            query = params[0] if params else {}
+            if "blockHash" in query:
+                return True
+            from_block = block_number(query.get("fromBlock"))
+            number = block_number(query.get("toBlock"))
+            if from_block is None:
+                return False
+        else:
+            return False
+        if number is None:
+            return False
+        return self.final(make_request, chain_id, number)
+
+    def request(self, make_request, chain_id, method, params):
+        """answer a cacheable method from the cache or the node"""
+        key = request_key(method, params)
+        response = self.get(chain_id, key)
+        if response is not None:
+            return response
+        response = make_request(method, params)
+        if "error" not in response and self.cacheable(
+            make_request, chain_id, method, params, response
+        ):
+            self.set(chain_id, key, response)
+        return response
+
+    def middleware(self, make_request, web3):
+        """web3 middleware answering immutable requests from the cache"""
+        chain = {}
+
+        def get_chain_id():
+            """return the chain id, or None if the node would not say"""
+            if "id" not in chain:
+                response = make_request("eth_chainId", [])
+                if "result" not in response:
+                    return None
+                chain.update(
+                    id=quantity(response["result"]), response=response
+                )
+            return chain["id"]
+
+        def middleware(method, params):
+            if method == "eth_chainId" and get_chain_id() is not None:
+                return dict(chain["response"])
+            if method == "eth_blockNumber":
+                response = make_request(method, params)
+                chain_id = get_chain_id()
+                if "result" in response and chain_id is not None:
+                    self.observe_head(chain_id, quantity(response["result"]))
+                return response
+            chain_id = get_chain_id() if method in CACHED_METHODS else None
+            if chain_id is None:
+                return make_request(method, params)
+            return self.request(make_request, chain_id, method, params)
+
+        return middleware
+
+    def install(self, web3):
+        """add the cache as a layer of web3's provider once, so requests
+        ape sends straight to the provider are cached too"""
+        if not layers.installed(web3, MIDDLEWARE_NAME):
+            layers.install(web3, MIDDLEWARE_NAME, self.middleware)
+        return web3
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM responses")
+                self.db.commit()
+
+    def stats(self):
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            stores=self.stores,
+            entries=len(self.entries),
+        )
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
@@ -0,0 +1,166 @@
+# keep-alive apeman daemon serving commands over a unix socket
+
+import builtins
+import json
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from pathlib import Path
+
+from . import exceptions
+from .commands import COMMANDS
+from .exceptions import DaemonError, DaemonRunning, DaemonUnavailable
+from .json import dumps
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_TIMEOUT = 300
+PROBE_TIMEOUT = 1
+
+
+def default_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir())
+    return Path(runtime_dir) / f"apeman-{os.getuid()}.sock"
+
+
+def is_live(path):
+    """return True if a daemon accepts connections on socket path"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(PROBE_TIMEOUT)
+            sock.connect(str(path))
+    except OSError:
+        return False
+    return True
+
+
+def error_type(name):
+    """return the apeman or builtin exception class called name, or None"""
+    cls = getattr(exceptions, name, None) or getattr(builtins, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        return cls
+    return None
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """read newline-delimited json requests, write one json response each"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as exc:
+                request = {}
+                response = self.server.error(exc)
+            else:
+                response = self.server.dispatch(request)
+            data = dumps(
+                response,
+                humanize=request.get("humanize", False),
+                hex_bytes=True,
+                separators=(",", ":"),
+            )
+            self.wfile.write(data.encode() + b"\n")
+            self.wfile.flush()
+
+
+class APEServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """serve COMMANDS using one connected APE instance
+
+    requests are serialized through a lock because the ape network context
+    is process global and not thread-safe
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, ape):
+        self.path = Path(path)
+        self.ape = ape
+        self.lock = threading.Lock()
+        if self.path.is_socket():
+            if is_live(self.path):
+                raise DaemonRunning(f"a daemon is serving on {self.path}")
+            # left behind by a daemon that did not exit cleanly
+            self.path.unlink()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.path), RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    @property
+    def selector(self):
+        return self.ape.selector
+
+    def error(self, exc):
+        return dict(error=str(exc), type=exc.__class__.__name__)
+
+    def dispatch(self, request):
+        if request.get("selector") != self.selector:
+            return dict(error="selector mismatch", type="SelectorMismatch")
+        try:
+            command = COMMANDS[request["command"]]
+            with self.lock:
+                result = command(self.ape, **request.get("params", {}))
+        except Exception as exc:
+            logger.debug(f"{request=} failed", exc_info=True)
+            return self.error(exc)
+        return dict(result=result)
+
+    def server_close(self):
+        super().server_close()
+        self.path.unlink(missing_ok=True)
+
+
+def serve(ape, path=None):
+    """run apeman daemon on unix socket path until interrupted"""
+    path = path or default_socket_path()
+    with APEServer(path, ape) as server:
+        logger.info(f"serving {ape.selector} on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def call(path, selector, command, params=None, humanize=False, timeout=None):
+    """run a command on the apeman daemon listening on path
+
+    raises DaemonUnavailable if no daemon is listening, the connection
+    fails or times out, or it serves a different network selector; an
+    error raised by the command is raised again as its apeman or builtin
+    exception type, or as DaemonError for other types
+    """
+    request = dict(
+        selector=selector,
+        command=command,
+        params=params or {},
+        humanize=humanize,
+    )
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout or DEFAULT_TIMEOUT)
+            sock.connect(str(path))
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as ifp:
+                line = ifp.readline()
+    except OSError as exc:
+        raise DaemonUnavailable(repr(exc)) from exc
+    if not line.endswith(b"\n"):
+        raise DaemonUnavailable("connection closed")
+    try:
+        response = json.loads(line)
+    except ValueError as exc:
+        raise DaemonUnavailable(f"invalid response: {exc}") from exc
+    if response.get("type") == "SelectorMismatch":
+        raise DaemonUnavailable(response["error"])
+    if "error" in response:
+        cls = error_type(response["type"])
+        if cls is None:
+            raise DaemonError(f"{response['type']}: {response['error']}")
+        raise cls(response["error"])
+    return response["result"]
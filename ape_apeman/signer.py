@@ -0,0 +1,63 @@
+# ape account signing with an in-memory private key
+
+from typing import Optional
+
+from ape.api import AccountAPI, TransactionAPI
+from ape.types import (
+    AddressType,
+    MessageSignature,
+    SignableMessage,
+    TransactionSignature,
+)
+from eth_account import Account as EthAccount
+from eth_utils import to_bytes
+from pydantic import PrivateAttr
+
+
+class KeySigner(AccountAPI):
+    """AccountAPI signing with a private key held in memory
+
+    signs like ape's KeyfileAccount, without the keyfile, the KDF or the
+    confirmation prompt; it is always unlocked and autosigns
+    """
+
+    _key = PrivateAttr()
+    _address = PrivateAttr()
+
+    def __init__(self, private_key, **kwargs):
+        super().__init__(**kwargs)
+        account = EthAccount.from_key(private_key)
+        self._key = account.key
+        self._address = account.address
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} address={self.address}>"
+
+    @property
+    def address(self) -> AddressType:
+        return self._address
+
+    def sign_message(self, msg: SignableMessage) -> Optional[MessageSignature]:
+        signed_msg = EthAccount.sign_message(msg, self._key)
+        return MessageSignature(
+            v=signed_msg.v,
+            r=to_bytes(signed_msg.r),
+            s=to_bytes(signed_msg.s),
+        )
+
+    def sign_transaction(
+        self, txn: TransactionAPI, **kwargs
+    ) -> Optional[TransactionAPI]:
+        signature = EthAccount.sign_transaction(
+            txn.dict(exclude_none=True, by_alias=True), self._key
+        )
+        txn.signature = TransactionSignature(
+            v=signature.v,
+            r=to_bytes(signature.r),
+            s=to_bytes(signature.s),
+        )
+        return txn
+
+    def set_autosign(self, enabled: bool, passphrase: Optional[str] = None):
+        """always autosigns; kept for KeyfileAccount compatibility"""
+        pass
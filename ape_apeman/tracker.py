@@ -0,0 +1,206 @@
+# shared chain head tracking
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .exceptions import BlockTimeout
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.environ.get("APEMAN_LOG_LEVEL", "WARNING"))
+
+DEFAULT_POLL_INTERVAL = 2
+DEFAULT_HISTORY = 64
+
+
+class BlockTracker:
+    """the chain head, polled once every poll_interval seconds on a
+    background thread for all consumers
+
+    head and block are read without an RPC, refreshing synchronously only
+    when the last poll is missing or older than 2 * poll_interval.
+    on_block callbacks run on the polling thread for every new block in
+    order, fetching any skipped between polls; they run once the poll has
+    finished, so they may read head themselves.  when a block's parent is
+    not the tracked block below it, the tracker walks back to the common
+    ancestor and calls on_reorg callbacks with the ancestor's number and
+    the removed blocks before replaying the new branch
+    """
+
+    def __init__(
+        self,
+        web3,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        history=DEFAULT_HISTORY,
+    ):
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.history = history
+        self.blocks = OrderedDict()
+        self.block = None
+        self.updated = 0
+        self.polls = self.reorgs = 0
+        self.block_callbacks = []
+        self.reorg_callbacks = []
+        self.events = []
+        self.poll_lock = threading.Lock()
+        self.notify_lock = threading.RLock()
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @property
+    def head(self):
+        """the head block number"""
+        return self.get()["number"]
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def get(self):
+        """return the head block, polling if stale"""
+        block = self.block
+        if block is None or time.monotonic() - self.updated > (
+            2 * self.poll_interval
+        ):
+            block = self.poll()
+        return block
+
+    def poll(self):
+        """fetch the latest block and process any new ones"""
+        with self.poll_lock:
+            latest = self.web3.eth.get_block("latest")
+            head = self.block
+            if head is None or latest["hash"] != head["hash"]:
+                if head is not None and latest["number"] > head["number"] + 1:
+                    start = max(
+                        head["number"] + 1, latest["number"] - self.history
+                    )
+                    for number in range(start, latest["number"]):
+                        self.advance(self.web3.eth.get_block(number))
+                self.advance(latest)
+            self.updated = time.monotonic()
+            self.polls += 1
+            events, self.events = self.events, []
+        with self.notify_lock:
+            for callbacks, args in events:
+                for callback in list(callbacks):
+                    self.notify(callback, *args)
+        return self.block
+
+    def advance(self, block):
+        number = block["number"]
+        parent = self.blocks.get(number - 1)
+        if (parent is not None and parent["hash"] != block["parentHash"]) or (
+            self.block is not None and number <= self.block["number"]
+        ):
+            self.rewind(block)
+        self.add(block)
+
+    def rewind(self, block):
+        """drop tracked blocks not in block's chain and add the new branch
+        up to block's parent"""
+        number = block["number"] - 1
+        parent_hash = block["parentHash"]
+        branch = []
+        while number in self.blocks and (
+            self.blocks[number]["hash"] != parent_hash
+        ):
+            canonical = self.web3.eth.get_block(number)
+            branch.append(canonical)
+            parent_hash = canonical["parentHash"]
+            number -= 1
+        removed = [
+            self.blocks.pop(n) for n in sorted(self.blocks) if n > number
+        ]
+        self.reorgs += 1
+        logger.warning(
+            f"reorg: {len(removed)} blocks removed above block {number}"
+        )
+        self.events.append((self.reorg_callbacks, (number, removed)))
+        for canonical in reversed(branch):
+            self.add(canonical)
+
+    def add(self, block):
+        self.blocks[block["number"]] = block
+        while len(self.blocks) > self.history:
+            self.blocks.popitem(last=False)
+        with self.condition:
+            self.block = block
+            self.condition.notify_all()
+        self.events.append((self.block_callbacks, (block,)))
+
+    def notify(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception(f"block tracker callback {callback!r} failed")
+
+    def on_block(self, callback):
+        """call callback(block) for each new block; usable as a decorator"""
+        self.block_callbacks.append(callback)
+        return callback
+
+    def on_reorg(self, callback):
+        """call callback(ancestor_number, removed_blocks) on each reorg;
+        usable as a decorator"""
+        self.reorg_callbacks.append(callback)
+        return callback
+
+    def remove(self, callback):
+        for callbacks in [self.block_callbacks, self.reorg_callbacks]:
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def wait_for(self, number, timeout=None):
+        """return the head block once the head reaches number
+
+        raises BlockTimeout if it does not within timeout seconds
+        """
+        self.start()
+
+        def reached():
+            return self.block is not None and self.block["number"] >= number
+
+        with self.condition:
+            if not self.condition.wait_for(reached, timeout):
+                raise BlockTimeout(
+                    f"block {number} not reached within {timeout} seconds"
+                )
+            return self.block
+
+    def confirmations(self, block_number):
+        """return how many blocks are above block_number"""
+        return self.head - block_number
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.poll()
+            except Exception as exc:
+                logger.warning(f"block poll failed: {exc!r}")
+            self.stopped.wait(self.poll_interval)
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(
+                target=self.run, name="BlockTracker", daemon=True
+            )
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
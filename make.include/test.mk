@@ -1,6 +1,6 @@
 # test - testing with pytest and tox
 
-options ?= -x --log-cli-level=CRITICAL $(if $(USE_GAS),, -m "not uses_gas")
+options ?= -x --log-cli-level=CRITICAL -m "not benchmark$(if $(USE_GAS),, and not uses_gas)"
 testfiles ?= $(wildcard tests/test_*.py)
 options := $(if $(test),$(options) -k $(test),$(options))
 
@@ -8,7 +8,7 @@ ifdef PYTEST_OPTIONS
 options := $(options) $(PYTEST_OPTIONS)
 endif
 
-tox_options ?= -m "not uses_gas"
+tox_options ?= -m "not uses_gas and not benchmark"
 
 
 ### run tests;  example: make options=-svvx test=cli test 
@@ -26,6 +26,14 @@ coverage:
 	coverage html
 	$(browser) htmlcov/index.html
 
+### run benchmarks, saving results tagged with the current commit
+benchmark:
+	env TESTING=1 pytest -m benchmark --benchmark-autosave tests/test_benchmark.py
+
+### run benchmarks, failing on a mean regression against the last saved run
+benchmark-compare:
+	env TESTING=1 pytest -m benchmark --benchmark-autosave --benchmark-compare --benchmark-compare-fail=mean:25% tests/test_benchmark.py
+
 ### list test cases
 testls:
 	@grep -h -R '^def test_' tests/test_*.py | awk -F'[ (]' '{print $$2}' | sort | uniq
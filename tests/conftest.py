@@ -3,6 +3,8 @@ import json
 import logging
 import os
 import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
@@ -104,3 +106,65 @@ def owner_address():
 @pytest.fixture
 def owner_private_key():
     return os.environ["TEST_ACCOUNT_PRIVATE_KEY"]
+
+
+RPC_RESULTS = {
+    "eth_chainId": "0x5",
+    "eth_blockNumber": "0x10",
+    "eth_getBalance": "0xde0b6b3a7640000",
+    "eth_getBlockByNumber": {
+        "number": "0x10",
+        "hash": "0x" + "11" * 32,
+        "parentHash": "0x" + "22" * 32,
+        "extraData": "0x" + "33" * 97,
+        "timestamp": "0x64",
+        "transactions": [],
+    },
+}
+
+
+class RPCHandler(BaseHTTPRequestHandler):
+    """minimal JSON-RPC endpoint answering from server.results"""
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        request = json.loads(self.rfile.read(length))
+        if isinstance(request, list):
+            self.server.batches.append(request)
+            response = [self.respond(r) for r in request]
+        else:
+            response = self.respond(request)
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond(self, request):
+        self.server.requests.append(request)
+        result = self.server.results.get(request["method"])
+        if callable(result):
+            result = result(*request["params"])
+        return dict(jsonrpc="2.0", id=request["id"], result=result)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def rpc_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RPCHandler)
+    server.requests = []
+    server.batches = []
+    server.results = dict(RPC_RESULTS)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def rpc_url(rpc_server):
+    return rpc_server.url
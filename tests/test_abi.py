@@ -0,0 +1,202 @@
+# abi index tests
+
+import io
+import json
+import os
+import sqlite3
+
+import pytest
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
+
+from ape_apeman.abi import (
+    ABIIndex,
+    ABIMap,
+    ABIMapReader,
+    ABIStore,
+    store_path,
+)
+
+OTHER_ADDRESS = "0x" + "ab" * 20
+OTHER_ABI = [
+    {
+        "type": "function",
+        "name": "value",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view",
+    }
+]
+
+
+@pytest.fixture
+def transfer_from_abi(contract_abi):
+    return [e for e in contract_abi if e.get("name") == "transferFrom"][0]
+
+
+@pytest.fixture
+def abi_file(tmp_path, contract_address, contract_abi):
+    path = tmp_path / "abi_map.json"
+    abi_map = {contract_address: contract_abi, OTHER_ADDRESS: OTHER_ABI}
+    path.write_text(json.dumps(abi_map))
+    return path
+
+
+def test_abi_index_dedup(contract_address, contract_abi):
+    index = ABIIndex({contract_address: contract_abi})
+    index.add(OTHER_ADDRESS, json.loads(json.dumps(contract_abi)))
+    assert len(index) == 2
+    assert len(index.abis) == 1
+    assert index.get_contract_type(OTHER_ADDRESS) is index.get_contract_type(
+        contract_address.upper().replace("0X", "0x")
+    )
+    assert index.get_abi("0x" + "cd" * 20) is None
+
+
+def test_abi_index_lookup(contract_address, contract_abi, transfer_from_abi):
+    index = ABIIndex({contract_address: contract_abi})
+    selector = function_abi_to_4byte_selector(transfer_from_abi)
+    assert index.function(selector) == transfer_from_abi
+    assert index.function(selector + b"\x00" * 64) == transfer_from_abi
+    assert index.function(selector, contract_address) == transfer_from_abi
+    assert index.function(selector, OTHER_ADDRESS) is None
+    event = [e for e in contract_abi if e.get("name") == "Transfer"][0]
+    topic = event_abi_to_log_topic(event)
+    assert index.event(topic) == event
+    assert index.event(topic.hex(), contract_address) == event
+
+
+def test_abi_index_cache(abi_file, contract_address, contract_abi):
+    index = ABIIndex.load_file(abi_file)
+    assert index.stores
+    assert store_path(abi_file).is_file()
+    assert not list(abi_file.parent.glob("*.index"))
+    assert index.get_abi(contract_address) == contract_abi
+    assert len(ABIIndex.load_file(abi_file)) == 2
+
+
+def test_abi_index_cache_corrupt(abi_file):
+    store_path(abi_file).write_bytes(b"not a database")
+    assert len(ABIIndex.load_file(abi_file)) == 2
+
+
+def test_abi_index_no_cache(abi_file):
+    index = ABIIndex.load_file(abi_file, cache=False)
+    assert not index.stores
+    assert len(index) == 2
+    assert not store_path(abi_file).exists()
+
+
+def test_abi_map_view(abi_file, contract_address, contract_abi):
+    index = ABIIndex({OTHER_ADDRESS: OTHER_ABI})
+    index.merge(ABIIndex.load_file(abi_file, store=True))
+    abi_map = ABIMap(index)
+    assert len(abi_map) == 2
+    assert set(abi_map) == {contract_address.lower(), OTHER_ADDRESS}
+    assert abi_map[contract_address] == contract_abi
+    assert abi_map.get("0x" + "cd" * 20) is None
+    with pytest.raises(TypeError):
+        abi_map[OTHER_ADDRESS] = OTHER_ABI
+
+
+def test_abi_index_merge(abi_file, contract_address, contract_abi):
+    index = ABIIndex({contract_address: contract_abi})
+    index.merge(ABIIndex.load(abi_file))
+    assert len(index) == 2
+    assert len(index.abis) == 2
+    assert index.function(function_abi_to_4byte_selector(OTHER_ABI[0]))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_abi_map_reader(abi_file, chunk_size):
+    with open(abi_file) as ifp:
+        members = list(ABIMapReader(ifp, chunk_size))
+    assert dict(members) == json.loads(abi_file.read_text())
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("{}", {}),
+        (' \n{ "a" : [1, 2],\n"b":[] }\n', {"a": [1, 2], "b": []}),
+        ('{"a": [{"x": 12345}]}', {"a": [{"x": 12345}]}),
+    ],
+)
+def test_abi_map_reader_format(text, expected):
+    assert dict(ABIMapReader(io.StringIO(text), 2)) == expected
+
+
+@pytest.mark.parametrize("text", ["", "[]", '{"a": [1}', '{"a": [] "b"'])
+def test_abi_map_reader_invalid(text):
+    with pytest.raises(ValueError):
+        dict(ABIMapReader(io.StringIO(text), 3))
+
+
+def test_abi_store_lazy(abi_file, contract_address, contract_abi):
+    index = ABIIndex.load_file(abi_file, store=True)
+    assert store_path(abi_file).is_file()
+    assert len(index) == 2
+    assert index.abis == {}
+
+    assert index.get_abi(contract_address) == contract_abi
+    assert len(index.abis) == 1
+    contract_type = index.get_contract_type(contract_address)
+    assert index.get_contract_type(contract_address) is contract_type
+    assert index.get_abi("0x" + "cd" * 20) is None
+
+    selector = function_abi_to_4byte_selector(OTHER_ABI[0])
+    assert index.function(selector) == OTHER_ABI[0]
+    assert len(index.abis) == 2
+    assert OTHER_ADDRESS in index
+
+
+def test_abi_store_rebuild(abi_file, contract_address):
+    ABIIndex.load_file(abi_file, store=True)
+    path = store_path(abi_file)
+    built = path.stat().st_ino
+
+    stat = abi_file.stat()
+    os.utime(abi_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert len(ABIIndex.load_file(abi_file, store=True)) == 2
+    assert path.stat().st_ino == built
+
+    abi_file.write_text(json.dumps({OTHER_ADDRESS: OTHER_ABI}))
+    index = ABIIndex.load_file(abi_file, store=True)
+    assert len(index) == 1
+    assert contract_address not in index
+
+
+def test_abi_store_file(abi_file, contract_address, contract_abi):
+    ABIIndex.load_file(abi_file, store=True)
+    index = ABIIndex.load_file(store_path(abi_file))
+    assert index.get_abi(contract_address) == contract_abi
+
+
+def test_abi_store_threshold(abi_file, monkeypatch):
+    monkeypatch.setattr("ape_apeman.abi.DEFAULT_STORE_THRESHOLD", 1)
+    assert ABIIndex.load_file(abi_file, cache=False).stores
+    monkeypatch.setattr("ape_apeman.abi.DEFAULT_STORE_THRESHOLD", 1 << 30)
+    assert not ABIIndex.load_file(abi_file, cache=False).stores
+
+
+@pytest.mark.skipif(
+    os.geteuid() == 0, reason="root ignores directory permissions"
+)
+def test_abi_index_read_only_dir(abi_file, contract_address, contract_abi):
+    abi_file.parent.chmod(0o555)
+    try:
+        index = ABIIndex.load_file(abi_file)
+    finally:
+        abi_file.parent.chmod(0o755)
+    assert not index.stores
+    assert index.get_abi(contract_address) == contract_abi
+    assert not store_path(abi_file).exists()
+
+
+def test_abi_index_store_unwritable(abi_file, contract_address, monkeypatch):
+    def build(path, abi_file):
+        raise sqlite3.OperationalError("attempt to write a readonly database")
+
+    monkeypatch.setattr(ABIStore, "build", build)
+    index = ABIIndex.load_file(abi_file)
+    assert not index.stores
+    assert len(index) == 2
@@ -0,0 +1,88 @@
+# asyncio interface tests
+
+import asyncio
+import threading
+import time
+
+from ape_apeman.aio import AsyncAPE
+from ape_apeman.contract import ContractCallResult
+
+
+class StubAPE:
+    selector = "ethereum:local:test"
+    connected = False
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = self.max_active = 0
+
+    def connect(self):
+        self.connected = True
+        return self
+
+    def disconnect(self):
+        self.connected = False
+
+    def call_contract(self, contract_address, function_name, *args, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.active, self.max_active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        return ContractCallResult(ret=(contract_address, function_name, args))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_aio_rpc(rpc_url):
+    ape = StubAPE()
+
+    async def main():
+        async with AsyncAPE(ape, rpc_url=rpc_url, max_concurrency=2) as aape:
+            assert ape.connected
+            return await asyncio.gather(
+                aape.get_block_number(),
+                aape.get_balance("0x27566e752e56D403fB436C8b7031e7fcc75b6b4f"),
+                aape.get_block(16),
+            )
+
+    block_number, balance, block = run(main())
+    assert not ape.connected
+    assert block_number == 16
+    assert balance == 10**18
+    assert block.number == 16
+    assert "proofOfAuthorityData" in block
+
+
+def test_aio_call_contract(rpc_url):
+    ape = StubAPE()
+
+    async def main():
+        async with AsyncAPE(ape, rpc_url=rpc_url) as aape:
+            return await asyncio.gather(
+                *[aape.call_contract("0x01", "symbol", i) for i in range(8)]
+            )
+
+    results = run(main())
+    assert all(isinstance(r, ContractCallResult) for r in results)
+    assert [r.ret[2] for r in results] == [(i,) for i in range(8)]
+    # ape operations never overlap
+    assert ape.max_active == 1
+
+
+def test_aio_connect_on_use(rpc_url):
+    ape = StubAPE()
+
+    async def main():
+        aape = AsyncAPE(ape, rpc_url=rpc_url)
+        try:
+            return await aape.get_block_number()
+        finally:
+            await aape.disconnect()
+            aape.close()
+
+    assert run(main()) == 16
+    assert not ape.connected
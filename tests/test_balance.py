@@ -0,0 +1,65 @@
+# bulk balance tests
+
+from types import SimpleNamespace
+
+import pytest
+
+from ape_apeman.commands import balances, read_accounts
+from ape_apeman.light import LightAPE
+
+ACCOUNTS = [f"0x{i:040x}" for i in range(1, 26)]
+
+
+def stub_balance(address, block):
+    return hex(int(address, 16) * 10**18)
+
+
+def test_balances(rpc_server):
+    rpc_server.results["eth_getBalance"] = stub_balance
+    with LightAPE(rpc_server.url) as ape:
+        records = list(balances(ape, iter(ACCOUNTS), workers=3, batch_size=4))
+    assert [r["account"].lower() for r in records] == ACCOUNTS
+    assert [r["ether"] for r in records] == list(range(1, 26))
+    assert all(r["block"] == 16 for r in records)
+    assert len(rpc_server.batches) == 7
+    params = [r["params"] for b in rpc_server.batches for r in b]
+    assert all(block == "0x10" for _, block in params)
+
+
+def test_balances_pinned_block(rpc_server):
+    rpc_server.results["eth_getBalance"] = stub_balance
+    with LightAPE(rpc_server.url) as ape:
+        records = list(balances(ape, ACCOUNTS[:3], wei=True, block=7))
+    assert [r["balance"] for r in records] == [
+        10**18,
+        2 * 10**18,
+        3 * 10**18,
+    ]
+    methods = [r["method"] for r in rpc_server.requests]
+    assert "eth_blockNumber" not in methods
+    assert all(r["params"][1] == "0x7" for r in rpc_server.requests)
+
+
+def test_balances_error(rpc_server):
+    rpc_server.results["eth_getBalance"] = None
+    with LightAPE(rpc_server.url) as ape:
+        records = list(balances(ape, ACCOUNTS[:2], block=1))
+    assert [r["error"] for r in records] == ["no response"] * 2
+
+
+def test_read_accounts():
+    lines = ["0x01\n", "\n", "# comment\n", "0x02  # hot wallet\n"]
+    assert list(read_accounts(["0x00"], lines)) == ["0x00", "0x01", "0x02"]
+
+
+def test_balances_eth_tester():
+    pytest.importorskip("eth_tester")
+    from web3 import EthereumTesterProvider, Web3
+
+    web3 = Web3(EthereumTesterProvider())
+    accounts = web3.eth.accounts[:2]
+    records = list(balances(SimpleNamespace(web3=web3), iter(accounts)))
+    assert [r["account"] for r in records] == accounts
+    assert [r["wei"] for r in records] == [
+        web3.eth.get_balance(a) for a in accounts
+    ]
@@ -0,0 +1,192 @@
+# benchmarks against ape's local eth-tester chain
+
+import os
+import subprocess
+import sys
+from decimal import Decimal
+
+import pytest
+from hexbytes import HexBytes
+
+from ape_apeman.json import dumps
+
+from .test_json import baseline_dumps
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = pytest.mark.benchmark
+
+SELECTOR = "ethereum:local:test"
+
+# Storage: value() returns slot 0, setValue(uint256) stores it and emits
+# ValueSet(uint256); hand assembled so no compiler plugin is needed
+STORAGE_BYTECODE = (
+    "0x605c80600c6000396000f300"
+    "60003560e01c80633fa4f24514601e5780635524107714602a57600080fd"
+    "5b60005460005260206000f3"
+    "5b600435806000556000527f"
+    "012c78e2b84325878b1bd9d250d772cfe5bda7722d795f45036fa5e1e6e303fc"
+    "60206000a100"
+)
+STORAGE_ABI = [
+    {
+        "type": "function",
+        "name": "value",
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view",
+    },
+    {
+        "type": "function",
+        "name": "setValue",
+        "inputs": [{"name": "value", "type": "uint256"}],
+        "outputs": [],
+        "stateMutability": "nonpayable",
+    },
+    {
+        "type": "event",
+        "name": "ValueSet",
+        "inputs": [{"name": "value", "type": "uint256", "indexed": False}],
+        "anonymous": False,
+    },
+]
+
+
+@pytest.fixture(scope="module")
+def dirs(tmp_path_factory):
+    project_dir = tmp_path_factory.mktemp("project")
+    data_dir = tmp_path_factory.mktemp("data")
+    return dict(project_dir=project_dir, data_dir=data_dir)
+
+
+@pytest.fixture(scope="module")
+def ape(dirs):
+    from ape_apeman import APE
+
+    with APE(selector=SELECTOR, **dirs) as ape:
+        yield ape
+
+
+@pytest.fixture(scope="module")
+def owner(ape):
+    return ape.accounts.test_accounts[0]
+
+
+@pytest.fixture(scope="module")
+def storage(ape, owner):
+    from ethpm_types import ContractType
+
+    contract_type = ContractType.parse_obj(
+        dict(
+            contractName="Storage",
+            abi=STORAGE_ABI,
+            deploymentBytecode=dict(bytecode=STORAGE_BYTECODE),
+        )
+    )
+    container = ape.ape.contracts.ContractContainer(contract_type)
+    return owner.deploy(container).address
+
+
+def test_benchmark_construct(benchmark, dirs):
+    from ape_apeman import APE
+
+    benchmark(APE, selector=SELECTOR, **dirs)
+
+
+def test_benchmark_connect(benchmark, dirs):
+    from ape_apeman import APE
+
+    ape = APE(selector=SELECTOR, **dirs)
+
+    def cycle():
+        ape.connect()
+        ape.disconnect()
+
+    benchmark.pedantic(cycle, rounds=20)
+
+
+def test_benchmark_get_contract_miss(benchmark, ape, storage):
+    # resolved through the abi map once ape no longer knows the contract
+    ape.set_contract_abi(storage, STORAGE_ABI)
+
+    def forget():
+        if ape.contract_cache:
+            ape.contract_cache.clear()
+        del ape.contracts[storage]
+
+    benchmark.pedantic(
+        ape.get_contract, args=(storage,), setup=forget, rounds=50
+    )
+
+
+def test_benchmark_get_contract_hit(benchmark, ape, storage):
+    ape.get_contract(storage)
+    benchmark(ape.get_contract, storage)
+
+
+def test_benchmark_call_lookup(benchmark, ape, storage):
+    result = benchmark(ape.call_contract, storage, "value")
+    assert isinstance(result.ret, int)
+
+
+def test_benchmark_call_transaction(benchmark, ape, owner, storage):
+    result = benchmark.pedantic(
+        ape.call_contract,
+        args=(storage, "setValue", 7),
+        kwargs=dict(private_key=owner.private_key),
+        rounds=20,
+    )
+    assert result.receipt.status == 1
+    assert result.ret.event_arguments["value"] == 7
+
+
+@pytest.mark.parametrize("keyfile", [False, True])
+def test_benchmark_key_account(benchmark, ape, owner, keyfile):
+    from ape_apeman.account import KeyAccount
+
+    benchmark.pedantic(
+        KeyAccount,
+        kwargs=dict(ape=ape, private_key=owner.private_key, keyfile=keyfile),
+        rounds=5 if keyfile else 50,
+    )
+
+
+def log(i):
+    return dict(
+        address="0x" + "ab" * 20,
+        topics=[HexBytes(i.to_bytes(32, "big")), HexBytes(b"\x01" * 32)],
+        data=bytes(range(i % 64)),
+        amount=Decimal(i) / 7,
+        logIndex=i,
+    )
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("encoder", ["baseline", "dispatch"])
+def test_benchmark_json(benchmark, encoder, indent):
+    logs = [log(i) for i in range(2000)]
+    function = baseline_dumps if encoder == "baseline" else dumps
+    benchmark.group = f"json indent={indent}"
+    result = benchmark(function, logs, hex_bytes=True, indent=indent)
+    assert result == baseline_dumps(logs, hex_bytes=True, indent=indent)
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["-L", "eth", "get-block-number"]]
+)
+def test_benchmark_cli(benchmark, dirs, args):
+    env = dict(
+        os.environ,
+        APE_SELECTOR=SELECTOR,
+        APE_NETWORK="local",
+        APE_PROVIDER="test",
+        APE_PROJECT_DIR=str(dirs["project_dir"]),
+        APE_DATA_DIR=str(dirs["data_dir"]),
+    )
+    command = [sys.executable, "-m", "ape_apeman.cli", *args]
+    benchmark.pedantic(
+        subprocess.run,
+        args=(command,),
+        kwargs=dict(env=env, check=True, capture_output=True),
+        rounds=5,
+    )
@@ -0,0 +1,95 @@
+# contract type cache tests
+
+import os
+import time
+
+import pytest
+from ethpm_types.contract_type import ContractType
+
+from ape_apeman.cache import ContractTypeCache
+
+CHAIN_ID = 5
+
+
+@pytest.fixture
+def contract_type(contract_abi):
+    return ContractType(abi=contract_abi)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ContractTypeCache(tmp_path / "contract_cache", max_entries=2)
+
+
+def test_cache_miss_hit(cache, contract_address, contract_type):
+    assert cache.get(CHAIN_ID, contract_address) is None
+    assert cache.misses == 1
+    cache.set(CHAIN_ID, contract_address, contract_type)
+    cached = cache.get(CHAIN_ID, contract_address.lower())
+    assert cached == contract_type
+    assert cache.hits == 1
+    assert cache.get(CHAIN_ID + 1, contract_address) is None
+    assert cache.misses == 2
+
+
+def test_cache_persistent(cache, contract_address, contract_type):
+    cache.set(CHAIN_ID, contract_address, contract_type)
+    warm = ContractTypeCache(cache.cache_dir)
+    assert warm.get(CHAIN_ID, contract_address) == contract_type
+    assert warm.stats()["hits"] == 1
+    assert warm.stats()["misses"] == 0
+
+
+def test_cache_content_addressed(cache, contract_type):
+    cache.set(CHAIN_ID, "0x" + "01" * 20, contract_type)
+    cache.set(CHAIN_ID, "0x" + "02" * 20, contract_type)
+    assert len(list(cache.types_dir.glob("*.json"))) == 1
+
+
+def test_cache_ttl(cache, contract_address, contract_type):
+    cache.set(CHAIN_ID, contract_address, contract_type)
+    cache.ttl = 60
+    index_file = cache._index_file(CHAIN_ID, contract_address)
+    stale = time.time() - 120
+    os.utime(index_file, (stale, stale))
+    assert cache.get(CHAIN_ID, contract_address) is None
+
+
+def test_cache_eviction(cache, contract_type):
+    addresses = ["0x" + f"{i:02x}" * 20 for i in range(1, 4)]
+    for address in addresses:
+        cache.set(CHAIN_ID, address, contract_type)
+        time.sleep(0.01)
+    assert cache.evictions == 1
+    assert cache.get(CHAIN_ID, addresses[0]) is None
+    assert cache.get(CHAIN_ID, addresses[2]) == contract_type
+
+
+def test_cache_eviction_batched(tmp_path, contract_type):
+    cache = ContractTypeCache(tmp_path / "contract_cache", max_entries=8)
+    scans = []
+    entries = cache.entries
+    cache.entries = lambda: scans.append(1) or entries()
+    addresses = ["0x" + f"{i:02x}" * 20 for i in range(1, 12)]
+    for address in addresses[:8]:
+        cache.set(CHAIN_ID, address, contract_type)
+    assert len(scans) == 1
+    cache.set(CHAIN_ID, addresses[8], contract_type)
+    assert cache.evictions == 2
+    assert cache.size == 7
+    scans.clear()
+    cache.set(CHAIN_ID, addresses[9], contract_type)
+    assert scans == []
+    assert cache.size == 8
+
+
+def test_cache_sweep_interval(cache, contract_address, contract_type):
+    cache.sweep_interval = 2
+    cache.set(CHAIN_ID, contract_address, contract_type)
+    cache.ttl = 60
+    index_file = cache._index_file(CHAIN_ID, contract_address)
+    stale = time.time() - 120
+    os.utime(index_file, (stale, stale))
+    cache.set(CHAIN_ID, "0x" + "01" * 20, contract_type)
+    assert cache.evictions == 1
+    assert not index_file.exists()
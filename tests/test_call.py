@@ -115,3 +115,43 @@ def test_call_mint(
     )
     assert isinstance(result, ContractCallResult)
     info(pformat(result.dict()))
+
+
+def test_call_many(ape, contract_address, owner_address):
+    results = ape.call_many(
+        [
+            (contract_address, "symbol"),
+            (contract_address, "balanceOf", [owner_address]),
+            (contract_address, "getPrices", [], dict(sender=owner_address)),
+            (contract_address, "setMintRoyalty", [0]),
+        ]
+    )
+    assert len(results) == 4
+    assert all(isinstance(r, ContractCallResult) for r in results)
+    assert results[0].ret == "ETHERSIEVE"
+    assert isinstance(results[1].ret, int)
+    assert results[2].ret.mintRoyalty
+    assert results[3].ret is None
+    assert isinstance(results[3].error, TypeError)
+    assert all(r.error is None for r in results[:3])
+
+
+def test_call_many_fallback(ape, contract_address, owner_address, monkeypatch):
+    def get_code(address):
+        raise ConnectionError("get_code failed")
+
+    ape.get_multicall()._available = None
+    monkeypatch.setattr(ape.web3.eth, "get_code", get_code)
+    block = ape.web3.eth.block_number - 1
+    results = ape.call_many(
+        [
+            (contract_address, "symbol"),
+            (contract_address, "balanceOf", [owner_address]),
+        ],
+        block_identifier=block,
+    )
+    assert [r.error for r in results] == [None, None]
+    assert results[0].ret == "ETHERSIEVE"
+    assert results[1].ret == ape.get_contract(contract_address).balanceOf(
+        owner_address, block_identifier=block
+    )
@@ -87,3 +87,21 @@ def test_cli_txn_json(run, txn_hash):
     txn = json.loads(result.output)
     assert isinstance(txn, dict)
     assert set(txn.keys()) == set(TXN_KEYS)
+
+
+def test_cli_balance_bulk(run, rpc_url):
+    accounts = [f"0x{i:040x}" for i in range(1, 4)]
+    result = run(
+        ["-L", "-u", rpc_url, "balance", "-w", accounts[0], "-f", "-"],
+        input="\n".join(accounts[1:]),
+    )
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [r["account"].lower() for r in records] == accounts
+    assert all(r["balance"] == 10**18 for r in records)
+
+
+def test_cli_get_blocks(run, rpc_url):
+    result = run(["-L", "-u", rpc_url, "eth", "get-blocks", "3", "5"])
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert len(records) == 3
+    assert all(r["number"] == 16 for r in records)
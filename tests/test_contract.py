@@ -0,0 +1,167 @@
+# contract call result tests
+
+from types import SimpleNamespace
+
+import pytest
+from box import Box
+from eth_utils import event_abi_to_log_topic
+from ethpm_types.contract_type import ContractType
+
+from ape_apeman.contract import ContractCallResult, LazyLogs
+
+OTHER_ADDRESS = "0x" + "ab" * 20
+
+
+class Ecosystem:
+    """stub ecosystem counting the logs it decodes"""
+
+    def __init__(self):
+        self.decoded = 0
+
+    def decode_logs(self, logs, *abis):
+        for log in logs:
+            self.decoded += 1
+            yield Box(event_name=abis[0].name, log_index=log["logIndex"])
+
+
+@pytest.fixture
+def topics(contract_abi):
+    return {
+        e["name"]: event_abi_to_log_topic(e)
+        for e in contract_abi
+        if e["type"] == "event"
+    }
+
+
+@pytest.fixture
+def receipt(contract_address, contract_abi, topics):
+    contract_type = ContractType(abi=contract_abi)
+    names = ["Transfer"] * 8 + ["Approval", "Paused"]
+    logs = [
+        dict(address=contract_address, topics=[topics[name]], logIndex=i)
+        for i, name in enumerate(names)
+    ]
+    logs.insert(0, dict(address=OTHER_ADDRESS, topics=[topics["Paused"]]))
+    logs.insert(1, dict(address=contract_address, topics=[]))
+    contracts = {contract_address: contract_type}
+    return Box(
+        logs=logs,
+        chain_manager=Box(contracts=SimpleNamespace(get=contracts.get)),
+        provider=Box(network=Box(ecosystem=Ecosystem())),
+        _decode_ds_note=lambda log: None,
+        txn_hash="0x" + "99" * 32,
+        block_number=16,
+        status=1,
+        gas_used=50000,
+    )
+
+
+def decoded(receipt):
+    return receipt.provider.network.ecosystem.decoded
+
+
+def test_contract_result_ret_eager(receipt):
+    result = ContractCallResult()
+    result.set_receipt(receipt)
+    assert decoded(receipt) == 1
+    assert result.ret.event_name == "Transfer"
+    assert result.ret.log_index == 0
+    assert decoded(receipt) == 1
+    assert result.dict()["receipt"] == dict(
+        txn_hash=receipt.txn_hash, block_number=16, status=1, gas_used=50000
+    )
+    assert decoded(receipt) == 1
+
+
+def test_contract_result_logs(receipt):
+    result = ContractCallResult()
+    result.set_receipt(receipt)
+    logs = result.decoded_logs
+    assert logs[2].log_index == 2
+    assert decoded(receipt) == 3
+    assert [log.log_index for log in logs] == list(range(10))
+    assert len(logs) == 10
+    assert logs[-1].event_name == "Paused"
+    assert [log.log_index for log in logs[8:]] == [8, 9]
+    assert decoded(receipt) == 10
+
+
+def test_contract_result_logs_container(receipt):
+    receipt.provider.network.ecosystem = SimpleNamespace(
+        decode_logs=lambda logs, abi: (
+            Box(
+                event_name=abi.name,
+                event_arguments=dict(value=log["logIndex"] % 2),
+            )
+            for log in logs
+        )
+    )
+    result = ContractCallResult()
+    result.set_receipt(receipt)
+    logs = result.decoded_logs
+    assert logs == list(logs)
+    assert len(logs.filter("Transfer")) == 8
+    assert len(logs.filter(Box(name="Transfer"), value=1)) == 4
+    assert logs.filter("Transfer", value=None) == []
+    assert logs.filter("Unknown") == []
+
+
+@pytest.mark.parametrize("by_topic", [False, True])
+def test_contract_result_events(receipt, topics, by_topic):
+    events = ["Approval", "Paused"]
+    if by_topic:
+        events = ["0x" + topics[name].hex().upper() for name in events]
+    result = ContractCallResult()
+    result.set_receipt(receipt, events)
+    assert result.ret.event_name == "Approval"
+    assert [log.event_name for log in result.decoded_logs] == [
+        "Approval",
+        "Paused",
+    ]
+    assert decoded(receipt) == 2
+
+
+def test_contract_result_no_logs(receipt):
+    receipt.logs = []
+    result = ContractCallResult()
+    result.set_receipt(receipt)
+    assert result.ret is None
+    assert not result.decoded_logs
+    assert list(LazyLogs(receipt)) == []
+
+
+def test_contract_result_call():
+    result = ContractCallResult(ret=5)
+    assert result.ret == 5
+    assert result.decoded_logs == []
+    assert result.dict() == dict(ret=5, receipt=None)
+
+
+def test_contract_result_compact(receipt):
+    fetched = []
+
+    def fetch_receipt(txn_hash):
+        fetched.append(txn_hash)
+        return receipt
+
+    result = ContractCallResult()
+    result.set_receipt(receipt, fetch_receipt=fetch_receipt)
+    assert not hasattr(result, "__dict__")
+    assert result.compact() is result
+    assert result.receipt is receipt
+    assert fetched == [receipt.txn_hash]
+    assert result.ret.log_index == 0
+    assert result.dict()["receipt"]["gas_used"] == 50000
+    assert len(fetched) == 1
+    assert len(result.decoded_logs) == 10
+    assert len(fetched) == 2
+
+
+def test_contract_result_compact_no_fetch(receipt):
+    result = ContractCallResult()
+    result.set_receipt(receipt)
+    result.compact()
+    assert result.receipt is None
+    assert result.decoded_logs == []
+    assert result.ret.event_name == "Transfer"
+    assert result.status == 1
@@ -0,0 +1,203 @@
+# event stream tests
+
+import pytest
+from eth_abi import encode
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from requests import HTTPError, Response
+from web3 import Web3
+
+from ape_apeman.events import (
+    EventDecoder,
+    EventStream,
+    LogBackfill,
+    is_range_error,
+    is_rate_limited,
+)
+from ape_apeman.parallel import bounded_map
+
+OWNER = "0x27566e752e56D403fB436C8b7031e7fcc75b6b4f"
+
+
+class StubEth:
+    def __init__(self, block_number, logs, max_range, rate_limit=0):
+        self.block_number = block_number
+        self.logs = logs
+        self.max_range = max_range
+        self.rate_limit = rate_limit
+        self.queries = []
+
+    def get_logs(self, params):
+        start, end = params["fromBlock"], params["toBlock"]
+        self.queries.append((start, end))
+        if self.rate_limit:
+            self.rate_limit -= 1
+            raise ValueError({"code": 429, "message": "Too Many Requests"})
+        if end - start + 1 > self.max_range:
+            raise ValueError({"message": "query returned more than 10000"})
+        return [log for log in self.logs if start <= log["blockNumber"] <= end]
+
+
+class StubWeb3:
+    codec = Web3().codec
+
+    def __init__(self, **kwargs):
+        self.eth = StubEth(**kwargs)
+
+
+@pytest.fixture
+def transfer_abi(contract_abi):
+    return [e for e in contract_abi if e.get("name") == "Transfer"][0]
+
+
+def transfer_log(abi, block_number, token_id, address):
+    return dict(
+        address=address,
+        blockNumber=block_number,
+        blockHash=HexBytes(b"\x01" * 32),
+        transactionHash=HexBytes(b"\x02" * 32),
+        transactionIndex=0,
+        logIndex=0,
+        data=HexBytes(b""),
+        topics=[
+            HexBytes(event_abi_to_log_topic(abi)),
+            HexBytes(encode(["address"], [OWNER])),
+            HexBytes(encode(["address"], [OWNER])),
+            HexBytes(encode(["uint256"], [token_id])),
+        ],
+    )
+
+
+@pytest.fixture
+def web3(transfer_abi, contract_address):
+    logs = [
+        transfer_log(transfer_abi, block, block, contract_address)
+        for block in (10, 500, 4000, 9000)
+    ]
+    return StubWeb3(block_number=10000, logs=logs, max_range=2000)
+
+
+def test_events_decoder_filter(web3, contract_abi):
+    decoder = EventDecoder(web3, contract_abi, ["Transfer"])
+    assert len(decoder.topics[0]) == 1
+    with pytest.raises(ValueError):
+        EventDecoder(web3, contract_abi, ["NoSuchEvent"])
+
+
+def test_events_stream_adaptive(web3, contract_abi, contract_address):
+    decoder = EventDecoder(web3, contract_abi, ["Transfer"])
+    stream = EventStream(
+        web3, contract_address, decoder, to_block=9500, chunk_size=1000
+    )
+    events = list(stream)
+    assert [e.args.tokenId for e in events] == [10, 500, 4000, 9000]
+    assert all(e.args["from"] == OWNER for e in events)
+    sizes = [end - start + 1 for start, end in web3.eth.queries]
+    assert max(sizes) > 2000
+    shrunk = sizes.index(max(sizes)) + 1
+    assert max(sizes[shrunk:]) <= 2000
+    assert web3.eth.queries[-1][1] == 9500
+
+
+def test_events_stream_dense(
+    web3, contract_abi, contract_address, transfer_abi
+):
+    web3.eth.logs = [
+        transfer_log(transfer_abi, block, block, contract_address)
+        for block in range(300)
+    ]
+    decoder = EventDecoder(web3, contract_abi)
+    stream = EventStream(
+        web3, contract_address, decoder, to_block=999, chunk_size=500
+    )
+    assert len(list(stream)) == 300
+    assert web3.eth.queries == [(0, 499), (500, 999)]
+
+
+def test_events_stream_checkpoint(
+    web3, contract_abi, contract_address, tmp_path
+):
+    checkpoint = tmp_path / "events.checkpoint"
+    decoder = EventDecoder(web3, contract_abi)
+    kwargs = dict(to_block=5000, checkpoint=checkpoint)
+    stream = EventStream(web3, contract_address, decoder, **kwargs)
+    assert len(list(stream)) == 3
+    kwargs["to_block"] = 9500
+    stream = EventStream(web3, contract_address, decoder, **kwargs)
+    assert [e.args.tokenId for e in stream] == [9000]
+
+
+def test_events_stream_checkpoint_partial(
+    web3, contract_abi, contract_address, tmp_path
+):
+    web3.eth.max_range = 10000
+    checkpoint = tmp_path / "events.checkpoint"
+    decoder = EventDecoder(web3, contract_abi)
+    kwargs = dict(to_block=5000, checkpoint=checkpoint, chunk_size=5001)
+    events = iter(EventStream(web3, contract_address, decoder, **kwargs))
+    assert [next(events).args.tokenId for _ in range(2)] == [10, 500]
+    events.close()
+    stream = EventStream(web3, contract_address, decoder, **kwargs)
+    assert stream.checkpoint.load() == 499
+    assert [e.args.tokenId for e in stream] == [500, 4000]
+
+
+def test_events_bounded_map():
+    results = list(bounded_map(lambda i: i * i, iter(range(100)), workers=4))
+    assert results == [i * i for i in range(100)]
+
+
+def test_events_backfill(web3, contract_abi, contract_address):
+    web3.eth.rate_limit = 2
+    decoder = EventDecoder(web3, contract_abi)
+    params = dict(address=contract_address, topics=decoder.topics)
+    backfill = LogBackfill(
+        web3, params, chunk_size=3000, workers=4, backoff=0.001
+    )
+    logs = [log for batch in backfill.batches(0, 9999) for log in batch]
+    assert [log["blockNumber"] for log in logs] == [10, 500, 4000, 9000]
+    assert (0, 1499) in web3.eth.queries
+    assert (1500, 2999) in web3.eth.queries
+
+
+def http_error(status_code):
+    response = Response()
+    response.status_code = status_code
+    return HTTPError(f"{status_code} Client Error", response=response)
+
+
+@pytest.mark.parametrize(
+    "exc,rate_limited,range_error",
+    [
+        (ValueError({"code": 429, "message": "Too Many Requests"}), 1, 0),
+        (http_error(429), 1, 0),
+        (http_error(500), 0, 0),
+        (
+            ValueError(
+                {
+                    "code": -32000,
+                    "message": "exceeded its compute units"
+                    " per second capacity",
+                }
+            ),
+            1,
+            0,
+        ),
+        (
+            ValueError({"code": -32000, "message": "header 0x429 not found"}),
+            0,
+            0,
+        ),
+        (ValueError("execution reverted: pool at capacity"), 0, 0),
+        (
+            ValueError(
+                {"code": -32005, "message": "query returned more than 10000"}
+            ),
+            0,
+            1,
+        ),
+    ],
+)
+def test_events_error_classes(exc, rate_limited, range_error):
+    assert is_rate_limited(exc) is bool(rate_limited)
+    assert is_range_error(exc) is bool(range_error)
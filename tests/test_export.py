@@ -0,0 +1,93 @@
+# block range export tests
+
+import csv
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from ape_apeman.commands import blocks
+from ape_apeman.export import write_csv, write_ndjson, write_parquet
+from ape_apeman.light import LightAPE
+
+
+def stub_block(number, full_transactions):
+    transactions = ["0x" + "aa" * 32] if full_transactions else []
+    return {
+        "number": number,
+        "hash": "0x" + number[2:].zfill(64),
+        "extraData": "0x",
+        "difficulty": hex(2**70),
+        "timestamp": "0x64",
+        "transactions": transactions,
+    }
+
+
+@pytest.fixture
+def ape(rpc_server):
+    rpc_server.results["eth_getBlockByNumber"] = stub_block
+    with LightAPE(rpc_server.url) as ape:
+        yield ape
+
+
+def test_blocks_in_order(ape):
+    numbers = [b["number"] for b in blocks(ape, 5, 54, workers=4)]
+    assert numbers == list(range(5, 55))
+
+
+def test_write_ndjson(ape):
+    file = io.StringIO()
+    write_ndjson(blocks(ape, 1, 3, transactions=True), file)
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert [r["number"] for r in records] == [1, 2, 3]
+    assert records[0]["transactions"] == ["0x" + "aa" * 32]
+
+
+def test_write_csv(ape):
+    file = io.StringIO()
+    write_csv(blocks(ape, 1, 10), file, row_group_size=3)
+    rows = list(csv.DictReader(io.StringIO(file.getvalue())))
+    assert [int(r["number"]) for r in rows] == list(range(1, 11))
+    assert rows[0]["difficulty"] == str(2**70)
+    assert rows[0]["hash"] == "0x" + "1".zfill(64)
+    assert rows[0]["transactions"] == "[]"
+
+
+def test_write_parquet(ape, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "blocks.parquet"
+    with path.open("wb") as file:
+        write_parquet(blocks(ape, 1, 10), file, row_group_size=4)
+    parquet = pq.ParquetFile(path)
+    assert parquet.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("number").to_pylist() == list(range(1, 11))
+    assert table.column("difficulty").to_pylist()[0] == str(2**70)
+
+
+def test_write_parquet_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    records = [
+        dict(number=1, baseFeePerGas=None, l1Fee=1),
+        dict(number=2, baseFeePerGas=None, l1Fee=2),
+        dict(number=3, baseFeePerGas=7, l1Fee=2**70),
+    ]
+    path = tmp_path / "blocks.parquet"
+    with path.open("wb") as file:
+        write_parquet(iter(records), file, row_group_size=2)
+    parquet = pq.ParquetFile(path)
+    assert parquet.num_row_groups == 2
+    table = parquet.read()
+    assert str(table.schema.field("number").type) == "int64"
+    assert table.column("baseFeePerGas").to_pylist() == [None, None, "7"]
+    assert table.column("l1Fee").to_pylist() == ["1", "2", str(2**70)]
+
+
+def test_blocks_eth_tester():
+    pytest.importorskip("eth_tester")
+    from web3 import EthereumTesterProvider, Web3
+
+    web3 = Web3(EthereumTesterProvider())
+    ape = SimpleNamespace(web3=web3)
+    assert [b["number"] for b in blocks(ape, 0, 0)] == [0]
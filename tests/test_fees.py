@@ -0,0 +1,116 @@
+# fee oracle tests
+
+import time
+
+import pytest
+
+from ape_apeman.fees import FeeOracle, dynamic_fee_type
+from ape_apeman.light import LightAPE
+
+FEE_HISTORY = dict(
+    oldestBlock="0x6",
+    baseFeePerGas=["0x64", "0x6e", "0x78"],
+    gasUsedRatio=[0.5, 0.6],
+    reward=[["0x1", "0x4", "0x9"], ["0x3", "0x6", "0xb"]],
+)
+
+
+@pytest.fixture
+def web3(rpc_server):
+    rpc_server.results.update(
+        eth_feeHistory=FEE_HISTORY, eth_maxPriorityFeePerGas="0x5"
+    )
+    with LightAPE(rpc_server.url) as ape:
+        yield ape.web3
+
+
+def requests(rpc_server, method):
+    return [r for r in rpc_server.requests if r["method"] == method]
+
+
+def test_fees_refresh(web3, rpc_server):
+    oracle = FeeOracle(web3, interval=60)
+    estimate = oracle.refresh()
+    assert estimate.base_fee == 120
+    assert estimate.priority_fee == 5
+    assert estimate.rewards == {10: 2, 50: 5, 90: 10}
+    params = requests(rpc_server, "eth_feeHistory")[0]["params"]
+    assert params == ["0xa", "latest", [10, 50, 90]]
+
+
+def test_fees_kwargs(web3):
+    oracle = FeeOracle(web3, interval=60)
+    assert oracle.fees() == dict(max_fee=245, max_priority_fee=5)
+
+
+def test_fees_priority_fallback(web3, rpc_server):
+    rpc_server.results["eth_maxPriorityFeePerGas"] = None
+    oracle = FeeOracle(web3, interval=60)
+    assert oracle.refresh().priority_fee == 5
+
+
+def test_fees_no_base_fee(web3, rpc_server):
+    rpc_server.results["eth_feeHistory"] = dict(
+        FEE_HISTORY, baseFeePerGas=["0x0", "0x0", "0x0"]
+    )
+    assert FeeOracle(web3, interval=60).fees() == {}
+
+
+def test_fees_cached(web3, rpc_server):
+    oracle = FeeOracle(web3, interval=60)
+    for _ in range(5):
+        oracle.fees()
+    assert oracle.refreshes == 1
+    assert len(requests(rpc_server, "eth_feeHistory")) == 1
+
+
+def test_fees_unsupported():
+    pytest.importorskip("eth_tester")
+    from web3 import EthereumTesterProvider, Web3
+
+    web3 = Web3(EthereumTesterProvider())
+    with pytest.raises(Exception):
+        web3.eth.fee_history(1, "latest", [50])
+    oracle = FeeOracle(web3, interval=60)
+    assert oracle.get() is None
+    assert oracle.fees() == {}
+    assert oracle.refreshes == 0
+
+
+def test_fees_stale(web3):
+    oracle = FeeOracle(web3, interval=60)
+    oracle.get()
+    oracle.estimate.updated -= 121
+    oracle.get()
+    assert oracle.refreshes == 2
+
+
+def test_fees_background(web3):
+    oracle = FeeOracle(web3, interval=0.05).start()
+    try:
+        time.sleep(0.5)
+        assert oracle.refreshes >= 3
+        assert oracle.estimate.age < 0.5
+    finally:
+        oracle.stop()
+    assert oracle.thread is None
+    refreshes = oracle.refreshes
+    time.sleep(0.2)
+    assert oracle.refreshes == refreshes
+
+
+@pytest.mark.parametrize(
+    "txn_type,dynamic",
+    [
+        (None, True),
+        (2, True),
+        ("0x2", True),
+        ("dynamic", True),
+        (0, False),
+        ("0x0", False),
+        ("legacy", False),
+        (1, False),
+    ],
+)
+def test_fees_dynamic_type(txn_type, dynamic):
+    assert dynamic_fee_type(txn_type) is dynamic
@@ -0,0 +1,52 @@
+# cli import tests
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["ape", "ape_ethereum", "ethpm_types", "web3"]
+LIGHT_ALLOWED = {"web3"}
+ACCOUNT = "0x" + "11" * 20
+
+PROBE = """
+import sys
+from ape_apeman.cli import cli
+try:
+    cli({args!r}, standalone_mode=False)
+except SystemExit:
+    pass
+loaded = sorted(set(m.split('.')[0] for m in sys.modules) & {heavy!r})
+print('loaded:' + ','.join(loaded))
+"""
+
+
+def probe(args):
+    """run the cli in a fresh interpreter, returning the heavy top level
+    modules it imported"""
+    code = PROBE.format(args=args, heavy=set(HEAVY_MODULES))
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        text=True,
+        capture_output=True,
+    )
+    prefix, _, loaded = proc.stdout.strip().split("\n")[-1].partition(":")
+    assert prefix == "loaded"
+    return set(loaded.split(",")) - {""}
+
+
+@pytest.mark.parametrize("args", [["--help"], ["--version"]])
+def test_import_cheap_commands(args):
+    loaded = probe(args)
+    assert not loaded, f"{args} imported {loaded}"
+
+
+@pytest.mark.parametrize(
+    "args", [["balance", ACCOUNT], ["eth", "get-block-number"]]
+)
+def test_import_light_commands(rpc_url, args):
+    options = ["-n", "goerli", "-p", "alchemy", "-L", "-u", rpc_url]
+    loaded = probe(options + args)
+    assert "ape" not in loaded, f"{args} imported {loaded}"
+    assert not loaded - LIGHT_ALLOWED, f"{args} imported {loaded}"
@@ -0,0 +1,100 @@
+# json encoder tests
+
+import json
+from decimal import Decimal
+
+import pytest
+from eth_utils import humanize_bytes, to_hex
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from ape_apeman.json import dump_iter, dumps
+
+
+# the encoders and dumps the dispatch table replaced, copied unchanged
+class JSONEncoder_hex_bytes(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return str(o)
+        elif isinstance(o, HexBytes):
+            return to_hex(bytes(o))
+        elif isinstance(o, bytes):
+            return to_hex(o)
+        else:
+            return super().default(o)
+
+
+class JSONEncoder_humanize(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return str(o)
+        elif isinstance(o, HexBytes):
+            return humanize_bytes(bytes(o))
+        elif isinstance(o, bytes):
+            return humanize_bytes(o)
+        else:
+            return super().default(o)
+
+
+def baseline_dumps(*args, **kwargs):
+    humanize = kwargs.pop("humanize", False)
+    hex_bytes = kwargs.pop("hex_bytes", False)
+    if humanize:
+        kwargs["cls"] = JSONEncoder_humanize
+    elif hex_bytes:
+        kwargs["cls"] = JSONEncoder_hex_bytes
+
+    return json.dumps(*args, **kwargs)
+
+
+FORMATS = [
+    dict(),
+    dict(indent=2),
+    dict(separators=(",", ":")),
+    dict(sort_keys=True, indent=4),
+]
+
+
+def log(i):
+    return dict(
+        address="0x" + "ab" * 20,
+        topics=[HexBytes(i.to_bytes(32, "big")), HexBytes(b"\x01" * 32)],
+        data=bytes(range(i % 64)),
+        amount=Decimal(i) / 7,
+        value=2**200 + i,
+        logIndex=i,
+        removed=False,
+        name="Transfer →",
+    )
+
+
+LOGS = [log(i) for i in range(50)]
+
+
+def reference_dumps(data, mode, **kwargs):
+    return baseline_dumps(data, **{mode: True}, **kwargs)
+
+
+@pytest.mark.parametrize("mode", ["hex_bytes", "humanize"])
+@pytest.mark.parametrize("kwargs", FORMATS)
+def test_json_identical(mode, kwargs):
+    data = dict(logs=LOGS, receipt=LOGS[0], raw=b"\x00\xff")
+    expected = reference_dumps(data, mode, **kwargs)
+    assert dumps(data, **{mode: True}, **kwargs) == expected
+
+
+@pytest.mark.parametrize("mode", ["hex_bytes", "humanize"])
+@pytest.mark.parametrize("kwargs", FORMATS)
+def test_json_dump_iter(mode, kwargs):
+    expected = reference_dumps(LOGS, mode, **kwargs)
+    chunks = list(dump_iter(iter(LOGS), **{mode: True}, **kwargs))
+    assert len(chunks) > 1
+    assert "".join(chunks) == expected
+    assert "".join(dump_iter(iter([]), **kwargs)) == json.dumps([])
+
+
+@pytest.mark.parametrize("mode", ["hex_bytes", "humanize"])
+def test_json_mapping(mode):
+    data = dict(logs=[AttributeDict(log) for log in LOGS[:3]])
+    expected = reference_dumps(dict(logs=LOGS[:3]), mode)
+    assert dumps(data, **{mode: True}) == expected
@@ -0,0 +1,83 @@
+# instrumentation tests
+
+import pytest
+
+from ape_apeman.light import LightAPE
+from ape_apeman.metrics import Metrics, metrics
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.enable(False)
+    metrics.reset()
+
+
+def test_metrics_disabled():
+    m = Metrics()
+
+    @m.timed("op")
+    def op():
+        return 1
+
+    assert op() == 1
+    m.count("event")
+    assert m.stats() == dict(timers={}, counters={})
+
+
+def test_metrics_timers():
+    m = Metrics(enabled=True)
+
+    @m.timed("op")
+    def op(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+
+    op()
+    with pytest.raises(ValueError):
+        op(fail=True)
+    with m.timer("block"):
+        pass
+    m.count("event", 3)
+    stats = m.stats()
+    assert stats["timers"]["op"]["count"] == 2
+    assert stats["timers"]["block"]["count"] == 1
+    assert stats["counters"] == dict(event=3)
+    text = m.prometheus()
+    assert 'apeman_operation_seconds_count{operation="op"} 2' in text
+    assert 'apeman_events_total{event="event"} 3' in text
+    report = m.report().splitlines()
+    assert report[0].split() == ["operation", "count", "total", "mean", "max"]
+    assert len(report) == 4
+
+
+def test_metrics_rpc(enabled, rpc_url):
+    with LightAPE(rpc_url) as ape:
+        ape.web3.eth.block_number
+        ape.web3.eth.block_number
+        ape.connect()
+        # as ape's provider sends eth_call, bypassing the middleware onion
+        ape.web3.provider.make_request("eth_call", [{}, "latest"])
+    timers = enabled.stats()["timers"]
+    assert timers["rpc.eth_blockNumber"]["count"] == 2
+    assert timers["rpc.eth_call"]["count"] == 1
+
+
+def test_metrics_cli_profile(rpc_url):
+    from click.testing import CliRunner
+
+    from ape_apeman.cli import cli
+
+    try:
+        result = CliRunner(mix_stderr=False).invoke(
+            cli, ["-L", "-u", rpc_url, "--profile", "eth", "get-block-number"]
+        )
+    finally:
+        metrics.enable(False)
+        metrics.reset()
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == "16"
+    assert "rpc.eth_blockNumber" in result.stderr
@@ -4,14 +4,17 @@ import logging
 from pathlib import Path
 from pprint import pformat
 from subprocess import run
+from types import SimpleNamespace
 
 import pytest
 from ape_ethereum.transactions import Receipt
 from eth_account import Account
+from eth_account.messages import encode_defunct
 from eth_utils import is_same_address
 
 import ape_apeman.json as json
 from ape_apeman import APE
+from ape_apeman.fees import dynamic_fee_type
 
 info = logging.info
 warning = logging.warning
@@ -49,6 +52,18 @@ def test_module_get_receipt(ape, txn_hash):
     assert isinstance(receipt, Receipt)
 
 
+def test_module_receipt_cache(ape, txn_hash):
+    receipt = ape.get_receipt(txn_hash)
+    assert isinstance(receipt, Receipt)
+    logs = ape.get_receipt_logs(txn_hash)
+    stats = ape.receipt_cache.stats()
+    assert stats["stores"] >= 1
+    cached = ape.get_receipt(txn_hash)
+    assert cached.dict() == receipt.dict()
+    assert ape.get_receipt_logs(txn_hash) == logs
+    assert ape.receipt_cache.hits == stats["hits"] + 2
+
+
 def test_module_web3_get_block_number(ape):
     block_number = ape.web3.eth.get_block_number()
     assert isinstance(block_number, int)
@@ -92,6 +107,26 @@ def test_module_sign_and_send(
     assert nonce_before != nonce_after
 
 
+@pytest.mark.uses_gas
+def test_module_pipeline(ape, contract_address, owner_private_key):
+    # re-set the current royalty so the contract state is unchanged
+    prices = ape.call_contract(contract_address, "getPrices").ret
+    with ape.pipeline(owner_private_key, poll_interval=2) as pipeline:
+        futures = [
+            pipeline.submit(
+                contract_address,
+                "setMintRoyalty",
+                prices.mintRoyalty,
+                max_priority_fee="10 gwei",
+            )
+            for _ in range(2)
+        ]
+        results = [future.result(timeout=600) for future in futures]
+    assert [r.status for r in results] == [1, 1]
+    nonces = [r.receipt.transaction.nonce for r in results]
+    assert nonces[1] == nonces[0] + 1
+
+
 def pdebug(object):
     logging.debug(pformat(object))
 
@@ -151,3 +186,155 @@ def test_module_account_call(
 
     info(pformat(components))
     info(pformat(prices))
+
+
+def test_module_contract_cache(ape, contract_address):
+    ape.get_contract(contract_address)
+    stats = ape.contract_cache.stats()
+    contract = ape.get_contract(contract_address)
+    assert ape.contract_cache.hits == stats["hits"] + 1
+    assert ape.contract_cache.misses == stats["misses"]
+    assert contract.symbol() == "ETHERSIEVE"
+
+
+def test_module_contract_cache_abi(ape, contract_address, contract_abi):
+    ape.get_contract(contract_address)
+    stats = ape.contract_cache.stats()
+    contract = ape.get_contract(contract_address, abi=contract_abi)
+    assert ape.contract_cache.stats() == stats
+    assert contract.symbol() == "ETHERSIEVE"
+
+
+def test_module_contract_cache_local(ape, contract_address):
+    ape.network = SimpleNamespace(name="local")
+    stats = ape.contract_cache.stats()
+    ape.get_contract(contract_address)
+    assert ape.contract_cache.stats() == stats
+
+
+def test_module_contract_cache_no_chain_id(ape, contract_address):
+    ape.chain_id = None
+    stats = ape.contract_cache.stats()
+    ape.get_contract(contract_address)
+    assert ape.contract_cache.stats() == stats
+    assert not (ape.contract_cache.index_dir / "None").exists()
+
+
+def test_module_registry_reuse(patched_env_ape_dirs):
+    first = APE()
+    second = APE()
+    assert first.context_manager is second.context_manager
+    reloaded = APE(reload=True)
+    assert reloaded.context_manager is not first.context_manager
+
+
+def test_module_key_accounts(ape, owner_address, owner_private_key):
+    account = ape.account(private_key=owner_private_key)
+    assert account.keyfile is None
+    assert is_same_address(account.ape_account.address, owner_address)
+    assert ape.account(private_key=owner_private_key) is account
+    with account as ape_account:
+        message = encode_defunct(text="apeman")
+        signature = ape_account.sign_message(message)
+        assert ape_account.check_signature(message, signature)
+
+    keyfile_account = ape.account(private_key=owner_private_key, keyfile=True)
+    assert keyfile_account is not account
+    assert keyfile_account.keyfile.is_file()
+    assert is_same_address(keyfile_account.address, owner_address)
+
+
+def test_module_metrics(patched_env_ape_dirs, contract_address):
+    from ape_apeman.metrics import metrics
+
+    metrics.reset()
+    metrics.enable()
+    try:
+        with APE() as ape:
+            result = ape.call_contract(contract_address, "symbol")
+        timers = metrics.stats()["timers"]
+        assert result.ret == "ETHERSIEVE"
+    finally:
+        metrics.enable(False)
+    for name in [
+        "ape.init",
+        "ape.connect",
+        "ape.get_contract",
+        "ape.call_contract.call",
+        "rpc.eth_call",
+    ]:
+        assert timers[name]["count"] >= 1, name
+
+
+def test_module_transaction_type(ape):
+    assert dynamic_fee_type(ape.transaction_type({}))
+    assert not dynamic_fee_type(ape.transaction_type(dict(type=0)))
+
+
+def test_module_oracle_fees_failure(ape, monkeypatch):
+    oracle = ape.get_fee_oracle()
+    oracle.estimate = None
+    monkeypatch.setattr(oracle, "refresh", lambda: 1 / 0)
+    assert ape.oracle_fees() == {}
+
+
+def test_module_fee_oracle(ape):
+    oracle = ape.get_fee_oracle()
+    assert ape.get_fee_oracle() is oracle
+    fees = oracle.fees()
+    assert fees["max_fee"] > fees["max_priority_fee"] >= 0
+    ape.disconnect()
+    assert ape.fee_oracle is None
+    assert oracle.thread is None
+
+
+def test_module_block_tracker(ape):
+    block_number = ape.get_block_number()
+    tracker = ape.get_block_tracker()
+    assert ape.get_block_tracker() is tracker
+    assert tracker.running
+    assert ape.get_block_number() >= block_number
+    ape.disconnect()
+    assert ape.block_tracker is None
+    assert not tracker.running
+
+
+def test_module_abi_index(
+    patched_env_ape_dirs, patched_env_abi_file, abi_map_file, contract_address
+):
+    from ape_apeman.abi import store_path
+
+    ape = APE()
+    assert contract_address in ape.abi_index
+    assert store_path(abi_map_file).is_file()
+    assert contract_address.lower() in ape.contract_abi
+    contract_type = ape.get_contract_type(contract_address)
+    assert contract_type == APE().get_contract_type(contract_address)
+    assert ape.get_contract_type(contract_address) is contract_type
+    with pytest.raises(ape.exceptions.UnknownContractABI):
+        ape.get_contract_type("0x" + "00" * 20)
+
+
+def test_module_rpc_cache(ape):
+    block_number = ape.web3.eth.block_number - 100
+    block = ape.web3.eth.get_block(block_number)
+    hits = ape.rpc_cache.stats()["hits"]
+    assert ape.web3.eth.get_block(block_number) == block
+    assert ape.rpc_cache.stats()["hits"] == hits + 1
+
+
+def test_module_rpc_cache_contract_call(ape, contract_address):
+    block_number = ape.web3.eth.block_number - 100
+    contract = ape.get_contract(contract_address)
+    symbol = contract.symbol(block_identifier=block_number)
+    hits = ape.rpc_cache.stats()["hits"]
+    assert contract.symbol(block_identifier=block_number) == symbol
+    assert ape.rpc_cache.stats()["hits"] == hits + 1
+
+
+def test_module_shared_connection(patched_env_ape_dirs):
+    with APE() as first:
+        with APE() as second:
+            assert second.context_manager is first.context_manager
+        assert first.provider.is_connected
+        assert first.get_block_number() > 0
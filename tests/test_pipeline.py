@@ -0,0 +1,133 @@
+# transaction pipeline tests
+
+import threading
+
+import pytest
+from box import Box
+from eth_utils import keccak, to_checksum_address
+
+from ape_apeman.exceptions import PipelineClosed
+from ape_apeman.light import LightAPE
+from ape_apeman.pipeline import TransactionPipeline
+
+PRIVATE_KEY = "0x" + "42" * 32
+RECEIVER = to_checksum_address("0x" + "ab" * 20)
+TXN = dict(to=RECEIVER, value=1, gas=21000, maxFeePerGas=100)
+TXN["maxPriorityFeePerGas"] = 2
+
+
+class StubAPE(LightAPE):
+    def get_receipt(self, txn_hash):
+        return Box(
+            txn_hash=txn_hash,
+            block_number=16,
+            status=1,
+            gas_used=21000,
+            logs=[],
+        )
+
+    def get_contract(self, contract_address, abi=None):
+        raise ValueError("no such contract")
+
+
+class Chain:
+    """stub node holding sent transactions, mining when told to"""
+
+    def __init__(self, rpc_server, mine=True):
+        self.mine = mine
+        self.sent = []
+        self.lock = threading.Lock()
+        rpc_server.results.update(
+            eth_getTransactionCount=lambda address, block: "0x5",
+            eth_sendRawTransaction=self.send,
+            eth_getTransactionReceipt=self.receipt,
+            eth_maxPriorityFeePerGas="0x2",
+            eth_getBlockByNumber=lambda block, full: dict(baseFeePerGas="0x7"),
+        )
+
+    def send(self, raw):
+        txn_hash = "0x" + keccak(hexstr=raw).hex()
+        with self.lock:
+            self.sent.append(txn_hash)
+        return txn_hash
+
+    def receipt(self, txn_hash):
+        if not self.mine(txn_hash) if callable(self.mine) else not self.mine:
+            return None
+        return dict(
+            transactionHash=txn_hash, blockNumber="0x10", status="0x1", logs=[]
+        )
+
+
+@pytest.fixture
+def pipeline(rpc_server):
+    signed = []
+    with StubAPE(rpc_server.url) as ape:
+        pipeline = TransactionPipeline(
+            ape, PRIVATE_KEY, max_pending=4, poll_interval=0.01
+        )
+        sign = pipeline.key.sign_transaction
+
+        def record(txn):
+            signed.append(txn)
+            return sign(txn)
+
+        pipeline.key = Box(sign_transaction=record, address=pipeline.address)
+        pipeline.signed = signed
+        yield pipeline
+        pipeline.close(wait=False)
+
+
+def test_pipeline_send(rpc_server, pipeline):
+    chain = Chain(rpc_server)
+    futures = [pipeline.send(TXN) for _ in range(10)]
+    results = [f.result(timeout=10) for f in futures]
+    assert sorted(t["nonce"] for t in pipeline.signed) == list(range(5, 15))
+    assert all(t["chainId"] == 5 for t in pipeline.signed)
+    assert sorted(r.receipt.txn_hash for r in results) == sorted(chain.sent)
+    assert pipeline.pending == {}
+    count = [r for r in rpc_server.requests if "Count" in r["method"]]
+    assert len(count) == 1
+
+
+def test_pipeline_replace(rpc_server, pipeline):
+    chain = Chain(rpc_server)
+    chain.mine = lambda txn_hash: len(chain.sent) > 1
+    pipeline.replace_after = 0.05
+    result = pipeline.send(TXN).result(timeout=10)
+    first, second = pipeline.signed[:2]
+    assert first["nonce"] == second["nonce"] == 5
+    assert second["maxFeePerGas"] > first["maxFeePerGas"] * 1.1
+    assert result.receipt.txn_hash in chain.sent
+
+
+def test_pipeline_gap_fill(rpc_server, pipeline):
+    Chain(rpc_server)
+    failed = pipeline.submit(RECEIVER, "safeMint", RECEIVER)
+    with pytest.raises(ValueError):
+        failed.result(timeout=10)
+    assert pipeline.send(TXN).result(timeout=10)
+    gap, txn = pipeline.signed
+    assert (gap["nonce"], txn["nonce"]) == (5, 6)
+    assert gap["to"] == pipeline.address and gap["value"] == 0
+
+
+def test_pipeline_gap_fill_replace(rpc_server, pipeline):
+    chain = Chain(rpc_server)
+    chain.mine = lambda txn_hash: txn_hash == chain.sent[-1] != chain.sent[0]
+    pipeline.replace_after = 0.05
+    failed = pipeline.submit(RECEIVER, "safeMint", RECEIVER)
+    with pytest.raises(ValueError):
+        failed.result(timeout=10)
+    first, second = pipeline.signed[:2]
+    assert first["nonce"] == second["nonce"] == 5
+    assert second["to"] == pipeline.address
+    assert second["maxFeePerGas"] > first["maxFeePerGas"]
+    assert pipeline.pending == {}
+
+
+def test_pipeline_closed(rpc_server, pipeline):
+    Chain(rpc_server)
+    pipeline.close()
+    with pytest.raises(PipelineClosed):
+        pipeline.send(TXN)
@@ -0,0 +1,59 @@
+# connection pool tests
+
+import pytest
+
+from ape_apeman.exceptions import PoolTimeout
+from ape_apeman.pool import APEPool
+
+
+class StubAPE:
+    selector = "ethereum:local:test"
+
+    def __init__(self, url):
+        self.url = url
+
+    def connect(self):
+        return self
+
+
+@pytest.fixture
+def pool(rpc_url):
+    with APEPool(StubAPE(rpc_url), size=2, rpc_url=rpc_url) as pool:
+        yield pool
+
+
+def test_pool_checkout(pool):
+    with pool.connection() as connection:
+        assert connection.web3.eth.block_number == 16
+        assert connection.ape is pool.ape
+    with pool.connection() as again:
+        assert again is connection
+    assert pool.count == 1
+
+
+def test_pool_sessions(pool):
+    first = pool.checkout()
+    second = pool.checkout()
+    assert first.web3.provider.session is not second.web3.provider.session
+    with pytest.raises(PoolTimeout):
+        pool.checkout(timeout=0.1)
+    pool.checkin(first)
+    assert pool.checkout(timeout=0.1) is first
+
+
+def test_pool_evict(pool):
+    connection = pool.checkout()
+    pool.checkin(connection)
+    pool.max_idle = 0
+    assert pool.evict() == 1
+    assert pool.count == 0
+
+
+def test_pool_health_check(pool):
+    connection = pool.checkout()
+    pool.checkin(connection)
+    pool.health_interval = 0
+    connection.rpc_url = connection.web3.provider.endpoint_uri = "http://0:1"
+    replaced = pool.checkout()
+    assert replaced is not connection
+    assert pool.count == 1
@@ -0,0 +1,89 @@
+# receipt cache tests
+
+import json
+
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from ape_apeman.receipts import ReceiptCache
+
+CHAIN_ID = 5
+
+
+def receipt_data(i):
+    return AttributeDict(
+        dict(
+            hash=HexBytes(i.to_bytes(32, "big")),
+            blockNumber=100 + i,
+            status=1,
+            logs=[AttributeDict(dict(topics=[HexBytes(b"\x01" * 32)]))],
+        )
+    )
+
+
+def txn_hash(i):
+    return HexBytes(i.to_bytes(32, "big")).hex()
+
+
+def test_receipt_cache_final():
+    cache = ReceiptCache(confirmations=12)
+    assert cache.final(100, 112)
+    assert not cache.final(100, 111)
+    assert not cache.final(None, 112)
+
+
+def test_receipt_cache_lru():
+    cache = ReceiptCache(size=2)
+    for i in range(3):
+        cache.set(CHAIN_ID, txn_hash(i), receipt_data(i))
+    assert cache.get(CHAIN_ID, txn_hash(0)) is None
+    assert cache.get(CHAIN_ID, txn_hash(1))["data"] == receipt_data(1)
+    cache.set(CHAIN_ID, txn_hash(3), receipt_data(3))
+    assert cache.get(CHAIN_ID, txn_hash(2)) is None
+    assert cache.get(CHAIN_ID, txn_hash(1)) is not None
+    assert cache.get(1, txn_hash(1)) is None
+    assert cache.stats() == dict(hits=2, misses=3, stores=4, entries=2)
+
+
+def test_receipt_cache_logs():
+    cache = ReceiptCache()
+    assert not cache.set_logs(CHAIN_ID, txn_hash(0), ["log"])
+    cache.set(CHAIN_ID, txn_hash(0), receipt_data(0))
+    assert cache.get(CHAIN_ID, txn_hash(0))["logs"] is None
+    assert cache.set_logs(CHAIN_ID, txn_hash(0), ["log"])
+    assert cache.get(CHAIN_ID, txn_hash(0))["logs"] == ["log"]
+
+
+def test_receipt_cache_logs_copied():
+    cache = ReceiptCache()
+    logs = [{"a": [1]}]
+    cache.set(CHAIN_ID, txn_hash(0), receipt_data(0), logs=logs)
+    logs[0]["a"].append(2)
+    cached = cache.get(CHAIN_ID, txn_hash(0))["logs"]
+    assert cached == [{"a": [1]}]
+    cached[0]["a"].append(3)
+    assert cache.get(CHAIN_ID, txn_hash(0))["logs"] == [{"a": [1]}]
+
+
+def test_receipt_cache_sqlite(tmp_path):
+    path = tmp_path / "receipts.sqlite"
+    cache = ReceiptCache(path, size=1)
+    cache.set(CHAIN_ID, txn_hash(0), receipt_data(0))
+    cache.set(CHAIN_ID, txn_hash(1), receipt_data(1), logs=[{"a": 1}])
+    cache.set_logs(CHAIN_ID, txn_hash(0), [{"b": 2}])
+    cache.close()
+
+    cache = ReceiptCache(path, size=1)
+    entry = cache.get(CHAIN_ID, txn_hash(0))
+    assert entry["data"] == receipt_data(0)
+    assert isinstance(entry["data"].hash, HexBytes)
+    assert isinstance(entry["data"].logs[0].topics[0], HexBytes)
+    assert entry["data"].blockNumber == 100
+    assert entry["logs"] is None
+    assert cache.get(CHAIN_ID, txn_hash(1))["logs"] is None
+    (data,) = cache.db.execute(
+        "SELECT data FROM receipt_json WHERE txn_hash=?", (txn_hash(0),)
+    ).fetchone()
+    assert json.loads(data)["hash"] == txn_hash(0)
+    cache.clear()
+    assert cache.get(CHAIN_ID, txn_hash(1)) is None
@@ -0,0 +1,102 @@
+# ape config registry tests
+
+import pytest
+
+from ape_apeman.registry import Registry
+
+
+class StubConfig:
+    def __init__(self):
+        self.loads = 0
+
+    def load(self, force_reload=False):
+        self.loads += 1
+
+
+class StubContext:
+    def __init__(self):
+        self.entered = self.exited = 0
+
+    def __enter__(self):
+        self.entered += 1
+        return self
+
+    def __exit__(self, *args):
+        self.exited += 1
+
+
+class StubNetworks:
+    def parse_network_choice(self, selector):
+        return StubContext()
+
+
+class StubApe:
+    def __init__(self):
+        self.config = StubConfig()
+        self.networks = StubNetworks()
+        self.project = None
+
+    def Project(self, path):
+        return ("project", path)
+
+
+@pytest.fixture
+def ape():
+    return StubApe()
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_registry_reuse(ape, registry):
+    first = registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    second = registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    assert first is second
+    assert ape.config.loads == 1
+    other = registry.load(ape, "/p", "/d", "ethereum:mainnet:alchemy")
+    assert other is not first
+    assert ape.config.loads == 1
+
+
+def test_registry_switch_dirs(ape, registry):
+    registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    registry.load(ape, "/p2", "/d2", "ethereum:goerli:alchemy")
+    assert ape.config.loads == 2
+    assert ape.project == ("project", "/p2")
+    assert ape.config.DATA_FOLDER == "/d2"
+
+
+def test_registry_invalidate(ape, registry):
+    first = registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    registry.invalidate(selector="ethereum:goerli:alchemy")
+    second = registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    assert second is not first
+    assert ape.config.loads == 1
+    registry.invalidate(project_dir="/p")
+    registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    assert ape.config.loads == 2
+
+
+def test_registry_temp_dir(registry):
+    dir = registry.temp_dir("APE_DATA_DIR")
+    assert dir.is_dir()
+    assert registry.temp_dir("APE_DATA_DIR") == dir
+    assert registry.temp_dir("APE_PROJECT_DIR") != dir
+
+
+def test_registry_shared_connection(ape, registry):
+    context = registry.load(ape, "/p", "/d", "ethereum:goerli:alchemy")
+    assert registry.enter(context) is context
+    assert registry.enter(context) is context
+    assert (context.entered, registry.users(context)) == (1, 2)
+    registry.exit(context)
+    assert context.exited == 0
+    # invalidated while in use: still exited by its last user
+    registry.invalidate()
+    registry.exit(context)
+    assert context.exited == 1
+    assert registry.users(context) == 0
+    registry.exit(context)
+    assert context.exited == 1
@@ -0,0 +1,154 @@
+# record and replay tests
+
+import threading
+
+import pytest
+from eth_utils import to_checksum_address
+from hexbytes import HexBytes
+
+from ape_apeman.exceptions import CassetteMiss
+from ape_apeman.light import LightAPE
+from ape_apeman.replay import Cassette, get_cassette, intercepted
+
+ADDRESS = to_checksum_address("0x" + "ab" * 20)
+# nothing listens on port 9 (discard) here
+NO_NODE_URL = "http://127.0.0.1:9"
+CALL = [dict(to=ADDRESS, data="0x95d89b41"), "latest"]
+
+
+@pytest.fixture
+def cassette_path(tmp_path, monkeypatch):
+    path = tmp_path / "cassette.sqlite"
+    monkeypatch.setenv("APE_CASSETTE", str(path))
+    return path
+
+
+def block_numbers(rpc_server):
+    numbers = iter(range(100, 200))
+    rpc_server.results["eth_blockNumber"] = lambda: hex(next(numbers))
+
+
+def session(rpc_url, calls=3):
+    with LightAPE(rpc_url) as ape:
+        numbers = [ape.web3.eth.block_number for _ in range(calls)]
+        return numbers, ape.web3.eth.get_balance(ADDRESS)
+
+
+def node_requests(rpc_server):
+    return len(rpc_server.requests)
+
+
+def test_replay_record_and_replay(rpc_server, cassette_path, monkeypatch):
+    block_numbers(rpc_server)
+    monkeypatch.setenv("APE_CASSETTE_MODE", "record")
+    recorded = session(rpc_server.url)
+    assert recorded == ([100, 101, 102], 10**18)
+    assert node_requests(rpc_server) == 4
+    assert cassette_path.is_file()
+
+    monkeypatch.setenv("APE_CASSETTE_MODE", "replay")
+    assert session(rpc_server.url) == recorded
+    assert node_requests(rpc_server) == 4
+    # replays past the recording repeat its last response
+    assert session(rpc_server.url, calls=1)[0] == [102]
+    assert get_cassette().stats()["hits"] == 6
+
+
+def test_replay_miss(rpc_server, cassette_path, monkeypatch):
+    monkeypatch.setenv("APE_CASSETTE_MODE", "replay")
+    with pytest.raises(CassetteMiss):
+        session(rpc_server.url)
+    assert node_requests(rpc_server) == 0
+
+
+def test_replay_auto(rpc_server, cassette_path):
+    block_numbers(rpc_server)
+    first = session(rpc_server.url, calls=1)
+    with LightAPE(rpc_server.url) as ape:
+        assert ape.web3.eth.block_number == first[0][0]
+        assert ape.web3.eth.chain_id == 5
+    methods = [r["method"] for r in rpc_server.requests]
+    assert methods == ["eth_blockNumber", "eth_getBalance", "eth_chainId"]
+
+
+def test_replay_rerecord(rpc_server, tmp_path):
+    block_numbers(rpc_server)
+    path = tmp_path / "cassette.sqlite"
+    for _ in range(2):
+        cassette = Cassette(path, "record")
+        with LightAPE(rpc_server.url) as ape:
+            cassette.install(ape.web3)
+            ape.web3.eth.block_number
+        cassette.close()
+    cassette = Cassette(path, "replay")
+    with LightAPE(rpc_server.url) as ape:
+        cassette.install(ape.web3)
+        assert ape.web3.eth.block_number == 101
+        assert ape.web3.eth.block_number == 101
+    assert cassette.stats()["requests"] == 1
+
+
+def test_replay_mode():
+    with pytest.raises(ValueError):
+        Cassette(":memory:", "rewind")
+
+
+def test_replay_intercept(rpc_server, tmp_path):
+    from web3 import HTTPProvider, Web3
+
+    path = tmp_path / "cassette.sqlite"
+    with Cassette(path, "record").intercept():
+        assert Web3(HTTPProvider(rpc_server.url)).eth.chain_id == 5
+    assert len(rpc_server.requests) == 1
+
+    cassette = Cassette(path, "replay")
+    with cassette.intercept():
+        web3 = Web3(HTTPProvider(rpc_server.url))
+        cassette.install(web3)
+        assert web3.eth.chain_id == 5
+    assert web3.eth.chain_id == 5
+    assert len(rpc_server.requests) == 1
+    assert cassette.stats()["hits"] == 2
+
+
+def provider_call(web3):
+    """eth_call sent the way ape's provider sends it, bypassing the
+    middleware onion"""
+    return web3.provider.make_request("eth_call", CALL)["result"]
+
+
+def test_replay_provider_call(rpc_server, tmp_path):
+    rpc_server.results["eth_call"] = "0x" + "00" * 31 + "2a"
+    path = tmp_path / "cassette.sqlite"
+    with LightAPE(rpc_server.url) as ape:
+        Cassette(path, "record").install(ape.web3)
+        recorded = provider_call(ape.web3)
+        ape.web3.eth.call(CALL[0])
+    requests = len(rpc_server.requests)
+
+    cassette = Cassette(path, "replay")
+    with LightAPE(NO_NODE_URL) as ape:
+        cassette.install(ape.web3)
+        assert provider_call(ape.web3) == recorded
+        assert ape.web3.eth.call(CALL[0]) == HexBytes(recorded)
+    assert len(rpc_server.requests) == requests
+    assert cassette.stats()["misses"] == 0
+
+
+def test_replay_intercept_thread(rpc_server, tmp_path):
+    from web3 import HTTPProvider, Web3
+
+    cassette = Cassette(tmp_path / "cassette.sqlite", "replay")
+    calls = []
+
+    def other_thread():
+        calls.append(Web3(HTTPProvider(rpc_server.url)).eth.chain_id)
+
+    with cassette.intercept():
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        with pytest.raises(CassetteMiss):
+            Web3(HTTPProvider(rpc_server.url)).eth.chain_id
+    assert calls == [5]
+    assert HTTPProvider.make_request is not intercepted
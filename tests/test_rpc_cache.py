@@ -0,0 +1,161 @@
+# immutable JSON-RPC response cache tests
+
+import pytest
+from eth_utils import to_checksum_address
+
+from ape_apeman.light import LightAPE
+from ape_apeman.rpc_cache import RPCCache, block_number
+
+ADDRESS = to_checksum_address("0x" + "ab" * 20)
+TXN_HASH = "0x" + "99" * 32
+
+
+@pytest.fixture
+def web3(rpc_server):
+    rpc_server.results.update(
+        eth_getCode="0x6000",
+        eth_getLogs=[],
+        eth_getTransactionReceipt=lambda txn_hash: None,
+    )
+    with LightAPE(rpc_server.url) as ape:
+        yield ape.web3
+
+
+@pytest.fixture
+def cache(web3):
+    cache = RPCCache(confirmations=4)
+    cache.install(web3)
+    return cache
+
+
+def node_requests(rpc_server, method):
+    return len([r for r in rpc_server.requests if r["method"] == method])
+
+
+@pytest.mark.parametrize(
+    "block, expected",
+    [
+        ("latest", None),
+        ("pending", None),
+        ("safe", None),
+        ("earliest", 0),
+        ("0x10", 16),
+        (7, 7),
+        ("0x" + "ab" * 32, True),
+        (dict(blockNumber="0x3"), 3),
+        (dict(blockHash="0x" + "ab" * 32), True),
+    ],
+)
+def test_rpc_cache_block_number(block, expected):
+    assert block_number(block) == expected
+
+
+def test_rpc_cache_blocks(web3, rpc_server, cache):
+    for _ in range(3):
+        web3.eth.get_block(3)
+    assert node_requests(rpc_server, "eth_getBlockByNumber") == 1
+    # within confirmations of the head at 0x10
+    for _ in range(2):
+        web3.eth.get_block(15)
+    assert node_requests(rpc_server, "eth_getBlockByNumber") == 3
+    for block in ["latest", "pending", "latest"]:
+        web3.eth.get_block(block)
+    assert node_requests(rpc_server, "eth_getBlockByNumber") == 6
+    assert node_requests(rpc_server, "eth_blockNumber") == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_rpc_cache_code(web3, rpc_server, cache):
+    for _ in range(2):
+        web3.eth.get_code(ADDRESS, 3)
+        web3.eth.get_code(ADDRESS)
+    assert node_requests(rpc_server, "eth_getCode") == 3
+
+
+def test_rpc_cache_receipt(web3, rpc_server, cache):
+    receipt = dict(
+        transactionHash=TXN_HASH,
+        blockNumber="0xf",
+        blockHash="0x" + "11" * 32,
+        status="0x1",
+        logs=[],
+    )
+    results = iter([None, receipt, dict(receipt, blockNumber="0x2")])
+    rpc_server.results["eth_getTransactionReceipt"] = lambda h: next(results)
+
+    def fetch():
+        return web3.manager.request_blocking(
+            "eth_getTransactionReceipt", [TXN_HASH]
+        )
+
+    assert fetch() is None
+    assert fetch()["blockNumber"] == 15
+    assert fetch()["blockNumber"] == 2
+    assert fetch()["blockNumber"] == 2
+    assert node_requests(rpc_server, "eth_getTransactionReceipt") == 3
+
+
+def test_rpc_cache_logs(web3, rpc_server, cache):
+    for _ in range(2):
+        web3.eth.get_logs(dict(fromBlock=1, toBlock=3))
+        web3.eth.get_logs(dict(fromBlock=1))
+        web3.eth.get_logs(dict(fromBlock=1, toBlock="latest"))
+    assert node_requests(rpc_server, "eth_getLogs") == 5
+
+
+def test_rpc_cache_provider_call(web3, rpc_server, cache):
+    """eth_call at a fixed block sent the way ape's provider sends it,
+    bypassing the middleware onion"""
+    rpc_server.results["eth_call"] = "0x" + "00" * 31 + "2a"
+    call = dict(to=ADDRESS, data="0x95d89b41")
+    for _ in range(2):
+        response = web3.provider.make_request("eth_call", [call, "0x3"])
+        assert response["result"] == rpc_server.results["eth_call"]
+        web3.provider.make_request("eth_call", [call, "latest"])
+    web3.eth.call(call, 3)
+    assert node_requests(rpc_server, "eth_call") == 3
+
+
+def test_rpc_cache_chain_id(web3, rpc_server, cache):
+    for _ in range(3):
+        assert web3.eth.chain_id == 5
+    assert node_requests(rpc_server, "eth_chainId") == 1
+
+
+def test_rpc_cache_head(web3, rpc_server):
+    cache = RPCCache(confirmations=4, head_ttl=0)
+    cache.install(web3)
+    web3.eth.get_block(15)
+    rpc_server.results["eth_blockNumber"] = "0x20"
+    web3.eth.get_block(15)
+    web3.eth.get_block(15)
+    assert node_requests(rpc_server, "eth_getBlockByNumber") == 2
+    assert cache.heads[5][0] == 32
+
+
+def test_rpc_cache_persistent(web3, rpc_server, tmp_path):
+    path = tmp_path / "rpc_cache.sqlite"
+    RPCCache(path, confirmations=4).install(web3)
+    web3.eth.get_block(3)
+    with LightAPE(rpc_server.url) as ape:
+        cache = RPCCache(path, size=1, confirmations=4)
+        cache.install(ape.web3)
+        ape.web3.eth.get_block(3)
+        ape.web3.eth.get_block(2)
+        ape.web3.eth.get_block(3)
+    assert node_requests(rpc_server, "eth_getBlockByNumber") == 2
+    assert cache.stats() == dict(hits=2, misses=1, stores=1, entries=1)
+
+
+def test_rpc_cache_eth_tester():
+    pytest.importorskip("eth_tester")
+    from web3 import EthereumTesterProvider, Web3
+
+    web3 = Web3(EthereumTesterProvider())
+    cache = RPCCache(confirmations=0)
+    cache.install(web3)
+    block = web3.eth.get_block(0)
+    assert web3.eth.block_number == 0
+    assert web3.eth.get_block(0) == block
+    assert cache.stats()["hits"] >= 1
+    assert isinstance(web3.eth.chain_id, int)
@@ -0,0 +1,112 @@
+# apeman daemon tests
+
+import socket
+import threading
+
+import pytest
+from box import Box
+
+from ape_apeman.exceptions import (
+    DaemonError,
+    DaemonRunning,
+    DaemonUnavailable,
+    ExplorerNotAvailable,
+)
+from ape_apeman.server import APEServer, call
+
+SELECTOR = "ethereum:local:test"
+
+
+class CustomError(Exception):
+    pass
+
+
+class StubEth:
+    def get_block(self, block):
+        if block == "missing":
+            raise ValueError("block not found")
+        if block == "explorer":
+            raise ExplorerNotAvailable("no explorer")
+        if block == "custom":
+            raise CustomError("not mapped")
+        return dict(number=block, hash=b"\x01\x02")
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = tmp_path / "apeman.sock"
+    ape = Box(
+        selector=SELECTOR,
+        web3=Box(eth=StubEth()),
+        get_block_number=lambda: 1234,
+    )
+    server = APEServer(path, ape)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    assert not path.exists()
+
+
+def test_server_call(socket_path):
+    assert call(socket_path, SELECTOR, "get_block_number") == 1234
+    block = call(socket_path, SELECTOR, "get_block", dict(block="12"))
+    assert block == dict(number=12, hash="0x0102")
+
+
+def test_server_unavailable(socket_path, tmp_path):
+    with pytest.raises(DaemonUnavailable):
+        call(tmp_path / "nonexistent.sock", SELECTOR, "get_block_number")
+    with pytest.raises(DaemonUnavailable):
+        call(socket_path, "ethereum:goerli:alchemy", "get_block_number")
+
+
+def test_server_error(socket_path):
+    with pytest.raises(ValueError) as exc:
+        call(socket_path, SELECTOR, "get_block", dict(block="missing"))
+    assert "block not found" in str(exc.value)
+    with pytest.raises(KeyError):
+        call(socket_path, SELECTOR, "no_such_command")
+    with pytest.raises(ExplorerNotAvailable):
+        call(socket_path, SELECTOR, "get_block", dict(block="explorer"))
+    with pytest.raises(DaemonError) as exc:
+        call(socket_path, SELECTOR, "get_block", dict(block="custom"))
+    assert str(exc.value) == "CustomError: not mapped"
+
+
+def test_server_running(socket_path):
+    with pytest.raises(DaemonRunning):
+        APEServer(socket_path, None)
+    assert call(socket_path, SELECTOR, "get_block_number") == 1234
+
+
+def test_server_stale_socket(tmp_path):
+    path = tmp_path / "apeman.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(path))
+    server = APEServer(path, None)
+    server.server_close()
+
+
+@pytest.mark.parametrize("reply", [None, b"", b'{"result": 1', b"{]\n"])
+def test_server_bad_daemon(tmp_path, reply):
+    path = tmp_path / "apeman.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(str(path))
+        listener.listen()
+
+        def respond():
+            conn, _ = listener.accept()
+            with conn:
+                conn.recv(4096)
+                if reply is None:
+                    # never answers
+                    conn.recv(4096)
+                else:
+                    conn.sendall(reply)
+
+        thread = threading.Thread(target=respond, daemon=True)
+        thread.start()
+        with pytest.raises(DaemonUnavailable):
+            call(path, SELECTOR, "get_block_number", timeout=0.2)
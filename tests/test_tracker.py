@@ -0,0 +1,170 @@
+# head block tracker tests
+
+import threading
+
+import pytest
+from hexbytes import HexBytes
+
+from ape_apeman.exceptions import BlockTimeout
+from ape_apeman.light import LightAPE
+from ape_apeman.tracker import BlockTracker
+
+
+class Chain:
+    """stub chain served as eth_getBlockByNumber results"""
+
+    def __init__(self, height):
+        self.branch = 0
+        self.hashes = [self.make_hash(n) for n in range(height + 1)]
+
+    def make_hash(self, number):
+        return f"0x{self.branch:032x}{number:032x}"
+
+    def mine(self, count=1):
+        for _ in range(count):
+            self.hashes.append(self.make_hash(len(self.hashes)))
+
+    def fork(self, ancestor, height):
+        """replace the blocks above ancestor with a branch up to height"""
+        self.branch += 1
+        while len(self.hashes) > ancestor + 1:
+            self.hashes.pop()
+        self.mine(height - ancestor)
+
+    def get_block(self, block, full=False):
+        number = len(self.hashes) - 1 if block == "latest" else int(block, 16)
+        return dict(
+            number=hex(number),
+            hash=self.hashes[number],
+            parentHash=self.hashes[number - 1] if number else "0x" + "00" * 32,
+            timestamp=hex(number),
+            transactions=[],
+        )
+
+
+@pytest.fixture
+def chain(rpc_server):
+    chain = Chain(16)
+    rpc_server.results["eth_getBlockByNumber"] = chain.get_block
+    return chain
+
+
+@pytest.fixture
+def tracker(rpc_server, chain):
+    with LightAPE(rpc_server.url) as ape:
+        tracker = BlockTracker(ape.web3, poll_interval=60)
+        yield tracker
+        tracker.stop()
+
+
+def node_requests(rpc_server):
+    return len(rpc_server.requests)
+
+
+def test_tracker_head(tracker, rpc_server, chain):
+    assert tracker.head == 16
+    requests = node_requests(rpc_server)
+    for _ in range(5):
+        assert tracker.head == 16
+    assert tracker.confirmations(10) == 6
+    assert node_requests(rpc_server) == requests
+    chain.mine()
+    tracker.poll()
+    assert tracker.head == 17
+    assert tracker.polls == 2
+
+
+def test_tracker_callbacks(tracker, chain):
+    tracker.poll()
+    blocks = tracker.on_block(lambda block: None)
+    numbers = []
+
+    @tracker.on_block
+    def record(block):
+        numbers.append(block["number"])
+
+    tracker.remove(blocks)
+    assert tracker.block_callbacks == [record]
+    chain.mine(4)
+    tracker.poll()
+    tracker.poll()
+    assert numbers == [17, 18, 19, 20]
+
+
+def test_tracker_callback_error(tracker, chain):
+    numbers = []
+    tracker.on_block(lambda block: 1 / 0)
+    tracker.on_block(lambda block: numbers.append(block["number"]))
+    tracker.poll()
+    assert numbers == [16]
+
+
+def test_tracker_callback_reads_head(tracker, chain):
+    confirmations = []
+    tracker.on_block(
+        lambda block: confirmations.append(tracker.confirmations(14))
+    )
+    thread = threading.Thread(target=tracker.poll, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    chain.mine(2)
+    tracker.updated = 0
+    assert tracker.confirmations(14) == 4
+    assert confirmations == [2, 4, 4]
+
+
+def test_tracker_reorg(tracker, chain):
+    tracker.poll()
+    chain.mine(4)
+    tracker.poll()
+    old = {n: tracker.blocks[n]["hash"] for n in range(16, 21)}
+    numbers = []
+    reorgs = []
+    tracker.on_block(lambda block: numbers.append(block["number"]))
+    tracker.on_reorg(
+        lambda ancestor, removed: reorgs.append(
+            (ancestor, [block["number"] for block in removed])
+        )
+    )
+    chain.fork(17, 21)
+    tracker.poll()
+    assert reorgs == [(17, [18, 19, 20])]
+    assert numbers == [18, 19, 20, 21]
+    assert tracker.reorgs == 1
+    assert tracker.head == 21
+    assert tracker.blocks[17]["hash"] == old[17]
+    assert tracker.blocks[18]["hash"] != old[18]
+    assert tracker.blocks[21]["parentHash"] == tracker.blocks[20]["hash"]
+
+
+def test_tracker_reorg_same_height(tracker, chain):
+    tracker.poll()
+    reorgs = []
+    tracker.on_reorg(lambda ancestor, removed: reorgs.append(ancestor))
+    chain.fork(15, 16)
+    tracker.poll()
+    assert reorgs == [15]
+    assert tracker.head == 16
+    assert tracker.block["hash"] == HexBytes(chain.hashes[16])
+
+
+def test_tracker_history(rpc_server, chain):
+    with LightAPE(rpc_server.url) as ape:
+        tracker = BlockTracker(ape.web3, history=4)
+        tracker.poll()
+        chain.mine(10)
+        tracker.poll()
+    assert sorted(tracker.blocks) == [23, 24, 25, 26]
+
+
+def test_tracker_wait_for(tracker, chain):
+    tracker.poll_interval = 0.01
+    timer = threading.Timer(0.1, chain.mine, [3])
+    timer.start()
+    block = tracker.wait_for(19, timeout=10)
+    assert block["number"] >= 19
+    with pytest.raises(BlockTimeout):
+        tracker.wait_for(100, timeout=0.05)
+    tracker.stop()
+    assert not tracker.running